@@ -1,71 +1,53 @@
 import keyboard
 
+from macros import compile_macro
 from utils import *
 
 # Determine screen coordinates, set add_determination=True if you want to automate determination entries
 SA = ScreenAutomation(add_determination=True, verbose=True)
 
-def perform_combined_example_action():
-    """
-    This function demonstrates how to combine multiple actions into a single function.
-
-    Let's say you want to perform the following actions:
-    1. Click the 'Collection' button
-    2. Type the collection name 'Weber, Paul (1881-1968)'
-    3. Click the 'Add Collector' button
-    4. Type the collector name 'Weber, Paul (1881-1968)'
-    5. Click the 'Numbers More' button
-    6. Type the number '12093' and select 'Collection Number'
-    7. Type the date 'V.1934' and '1934/05'
-    8. Type the taxon name 'Laboulbenia (Baumgartner)'
-    9. Type the height '350' and '400'
-    10. Type the notes 'Pink dot\n'
-    11. Save the changes
-
-    This function combines all the above actions into a single function and allows you to perform them with a single hotkey.
-    """
-
-    # Fill in the collection name
-    SA.perform_collection("Weber, Paul (1881-1968)")
-    # Fill in the collector name
-    SA.perform_collector("Weber, Paul (1881-1968)")
-    # Fill in the numbers & more
-    SA.perform_numbers_more(12093, 'Collection Number')
-    # Fill in the date (verbatim & interpreted (yyyy/mm/dd))
-    SA.perform_date("V.1934", "1934/05")
-    # Fill in the specimen notes
-    SA.perform_notes("Pink dot\n")
-
-    # Save the changes
-    SA.perform_save()
+# MACROS
+# A macro is a list of steps performed by one hotkey, see STEP_KINDS in macros.py for all steps. To add a macro, add
+# its hotkey and steps here, no new function is needed. The macros are checked and compiled once at startup, when run
+# they print how long every step took.
+MACROS = {
+    # Fill in the collection, collector, numbers & more, date and notes, then save the changes
+    'ctrl+p': [
+        ('paste', 'collection', "Weber, Paul (1881-1968)"), ('key', 'enter'),
+        ('click', 'collector_add'), ('paste', 'collector_name', "Weber, Paul (1881-1968)"), ('key', 'enter'),
+        ('click', 'numbers_more_button'), ('type', 'numbers_more_number', '12093'),
+        ('paste', 'numbers_more_type', 'Collection Number'), ('key', 'enter'),
+        ('paste', 'date_verbatim', "V.1934"), ('paste', 'date_interpreted', "1934/05"),
+        ('paste', 'specimen_notes', "Pink dot\n"),
+        ('click', 'save'),
+    ],
+    # Add a determination (the dialog fields are double-clicked to replace their content), then save the changes
+    'ctrl+g': [
+        ('click', 'det_button'), ('wait', DETERMINATION_LABEL_IMAGES), ('click', 'det_add_button'),
+        ('paste', 'det_genus', "Sunira", 2),
+        ('paste', 'det_species', "circellaris", 2),
+        ('paste', 'det_author', "H.", 2),
+        ('paste', 'det_determiner', "H-U. Grunder", 2),
+        ('paste', 'det_date', "1985", 2),
+        ('paste', 'det_verbatim', "9978", 2),
+        ('click', 'det_done_button'),
+        ('click', 'save'),
+    ],
+}
 
 def paul_born_collection_collector():
-    SA.perform_collection("Weber, Paul (1881-1968)")
-    SA.perform_collector("Weber, Paul (1881-1968)")
-    SA.perform_save()
-
-def perform_determination1():
-    SA.perform_determination(
-        genus="Sunira",
-        species="circellaris",
-        subspecies=None,
-        infraspecific=None,
-        infrarank=None,
-        author="H.",
-        determiner="H-U. Grunder",
-        date="1985",
-        verbatim="9978"
-    )
-    SA.perform_save()
+    with SA.clipboard:
+        SA.perform_collection("Weber, Paul (1881-1968)")
+        SA.perform_collector("Weber, Paul (1881-1968)")
+        SA.perform_save()
 
 # --------------------------------------------------
 # HOTKEYS
 keyboard.add_hotkey('alt+left', SA.perform_previous)
 keyboard.add_hotkey('alt+right', SA.perform_next)
 
-keyboard.add_hotkey('ctrl+p', perform_combined_example_action)
-
-keyboard.add_hotkey('ctrl+g', perform_determination1)
+for hotkey, steps in MACROS.items():
+    keyboard.add_hotkey(hotkey, compile_macro(SA, steps, name=hotkey).run)
 
 # --------------------------------------------------
 # HOTKEY EXAMPLES
@@ -0,0 +1,318 @@
+"""
+Read the collection numbers of exported specimen images in the background, without Data Shot and the screen.
+
+Every image is searched for the collection number tag with the digit templates, the tag is read with Tesseract
+(adaptive sampling; with --fast-path, a confident read of the digit template reader is taken without Tesseract), and
+the result is written to a CSV or JSONL file (by its extension) as soon as it is known. The images are read by a pool
+of processes using all processor cores. If the output file already exists, the images in it are skipped, so an
+interrupted run continues where it stopped (rows with an error are removed from the file and the images read again).
+
+Run from the repository root:
+
+    python batch_ocr.py D:/exports/born --output born_numbers.csv
+    python batch_ocr.py manifest.txt --output born_numbers.jsonl --image-scale 0.5 --workers 6
+    python batch_ocr.py D:/exports/born --output born_numbers.csv --username jdoe
+
+A manifest is a text file with one image path per line (relative paths are relative to the manifest).
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from PIL import Image
+
+import capture
+from digit_reader import get_digit_reader
+from ocr import (ADAPTIVE_CERTAINTY, FAST_PATH_CONFIDENCE, FAST_PATH_DIGITS, adaptive_posteriors,
+                 capture_jitter_region, clean_text, jittered_samples, locate_and_average_centers)
+from ocr_backends import get_ocr_backend
+from preprocessing import Preprocessor
+from utils import set_tesseract_path
+
+# File extensions of the images read from a directory
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+# Columns of the output, 'review' is set if the number is missing or less certain than --certainty
+FIELDS = ['image', 'number', 'confidence', 'method', 'tag_x', 'tag_y', 'review', 'error']
+
+# Size of the area read around the tag center and its jitter (as for a middle click in paul_born_ocr.py)
+TAG_WIDTH, TAG_HEIGHT, JITTER_SIZE = 200, 80, 15
+
+# Confidence threshold of the digit templates when locating the tag
+LOCATE_CONFIDENCE = 0.5
+
+# Number of images submitted per worker process before waiting for results (bounds the memory in flight)
+IN_FLIGHT_PER_WORKER = 2
+
+
+def iter_images(source):
+    """
+    List the images of a directory (recursively, sorted) or a manifest, one at a time.
+
+    Parameters
+    ----------
+    source : str
+        The directory or the manifest file.
+
+    Yields
+    ------
+    str
+        The path of an image.
+    """
+    if os.path.isdir(source):
+        for directory, subdirectories, files in os.walk(source):
+            subdirectories.sort()
+            for file in sorted(files):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(directory, file)
+    else:
+        base = os.path.dirname(source)
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line if os.path.isabs(line) else os.path.join(base, line)
+
+
+def drop_partial_line(path):
+    """
+    Remove an incomplete last line (written when a run was killed) from an output file.
+    """
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            print(f"Dropping the incomplete last line of {path}.")
+            f.truncate(end)
+
+
+def read_done_images(path):
+    """
+    Read the images already in an output file, to resume an interrupted run.
+
+    Rows with an error are removed from the file (it is rewritten), so the image is read again and the file does not
+    end up with two rows for it.
+
+    Parameters
+    ----------
+    path : str
+        The CSV or JSONL output file.
+
+    Returns
+    -------
+    set
+        The image paths with a result.
+    """
+    if not os.path.exists(path):
+        return set()
+    drop_partial_line(path)
+    jsonl = path.endswith('.jsonl')
+    with open(path, newline='', encoding='utf-8') as f:
+        if jsonl:
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    done = [row for row in rows if not row.get('error')]
+    if len(done) < len(rows):
+        print(f"Removing {len(rows) - len(done)} rows with an error from {path}, these images are read again.")
+        # Written to a temporary file first, so a crash while rewriting does not lose the results
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w', newline='', encoding='utf-8') as f:
+            if jsonl:
+                f.writelines(json.dumps(row) + '\n' for row in done)
+            else:
+                writer = csv.DictWriter(f, FIELDS)
+                writer.writeheader()
+                writer.writerows(done)
+        os.replace(temporary_path, path)
+    return {row['image'] for row in done}
+
+
+class ResultWriter:
+    """
+    Appends result rows to a CSV or JSONL file and flushes every row, so no finished result is lost.
+    """
+
+    def __init__(self, path):
+        self.jsonl = path.endswith('.jsonl')
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, FIELDS)
+            if new_file:
+                self._writer.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self._file.write(json.dumps(row) + '\n')
+        else:
+            self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def init_worker(quiet, username=None):
+    # Every worker reads one image at a time, Tesseract must not start threads of its own
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+    set_tesseract_path(username=username)
+    get_ocr_backend('auto')
+
+
+def read_image(path, image_scale=1.0, num_samples=10, certainty=ADAPTIVE_CERTAINTY, fast_path=False):
+    """
+    Locate and read the collection number tag of an image.
+
+    The image is served as screen (see capture.ReplayCapture), so the tag is located and read exactly as on the
+    screen. The jitter of the samples depends only on the image path, a second run gives the same result.
+
+    Parameters
+    ----------
+    path : str
+        The image.
+    image_scale : float
+        The factor the image is resized by, so the digits have the size they have on the screen.
+    num_samples : int
+        The maximum number of Tesseract samples.
+    certainty : float
+        The probability at which the adaptive sampling stops, less certain results are marked for review.
+    fast_path : bool
+        Whether to take a confident read of the digit template reader without running Tesseract.
+
+    Returns
+    -------
+    dict
+        The result row (see FIELDS).
+    """
+    row = dict.fromkeys(FIELDS)
+    row.update(image=path, review=True)
+    try:
+        image = Image.open(path).convert('RGB')
+        if image_scale != 1:
+            image = image.resize((round(image.width * image_scale), round(image.height * image_scale)),
+                                 Image.LANCZOS)
+        capture.set_capture_backend(capture.ReplayCapture(image))
+        random.seed(path)
+
+        center = locate_and_average_centers(confidence=LOCATE_CONFIDENCE, verbose=False)
+        if center is None:
+            row['error'] = 'no tag found'
+            return row
+        x, y = int(round(center[0])), int(round(center[1]))
+        row.update(tag_x=x, tag_y=y)
+
+        region = capture_jitter_region(x, y, TAG_WIDTH, TAG_HEIGHT, JITTER_SIZE)
+        if fast_path:
+            text, confidence = get_digit_reader().read(region[0])
+            number = clean_text(text)
+            if number is not None and confidence >= FAST_PATH_CONFIDENCE and len(text) in FAST_PATH_DIGITS:
+                row.update(number=number, confidence=round(confidence, 3), method='digits', review=False)
+                return row
+
+        samples = map(Preprocessor(), jittered_samples(x, y, TAG_WIDTH, TAG_HEIGHT, JITTER_SIZE, num_samples,
+                                                       region=region))
+        posteriors = adaptive_posteriors(samples, get_ocr_backend('auto'), certainty)
+        if posteriors:
+            number = max(posteriors, key=posteriors.get)
+            row.update(number=number, confidence=round(posteriors[number], 3), method='tesseract',
+                       review=posteriors[number] < certainty)
+        else:
+            row.update(method='tesseract', error='no valid OCR result')
+    except Exception as e:
+        row['error'] = repr(e)
+    return row
+
+
+def run_batch(source, output, workers=None, image_scale=1.0, num_samples=10, certainty=ADAPTIVE_CERTAINTY,
+              quiet=True, username=None, fast_path=False):
+    """
+    Read all images of a directory or manifest into an output file, skipping the images already in it.
+
+    Parameters
+    ----------
+    source : str
+        The directory or manifest file.
+    output : str
+        The CSV or JSONL output file.
+    workers : int
+        The number of worker processes (default: number of cores).
+    image_scale, num_samples, certainty, fast_path
+        See `read_image`.
+    quiet : bool
+        Whether to hide the output of the OCR in the workers.
+    username : str
+        The username used to locate the tesseract installation (default: the current user).
+
+    Returns
+    -------
+    dict
+        The number of images read, marked for review and skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = read_done_images(output)
+    if done:
+        print(f"Resuming, {len(done)} images are already in {output}.")
+
+    stats = {'read': 0, 'review': 0, 'skipped': 0}
+    writer = ResultWriter(output)
+    in_flight = set()
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(quiet, username)) as executor:
+            for path in iter_images(source):
+                if path in done:
+                    stats['skipped'] += 1
+                    continue
+                if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    write_results(writer, finished, stats)
+                in_flight.add(executor.submit(read_image, path, image_scale, num_samples, certainty, fast_path))
+            write_results(writer, wait(in_flight).done, stats)
+    finally:
+        writer.close()
+    return stats
+
+
+def write_results(writer, futures, stats):
+    for future in futures:
+        row = future.result()
+        writer.write(row)
+        stats['read'] += 1
+        stats['review'] += bool(row['review'])
+        if stats['read'] % 100 == 0:
+            print(f"{stats['read']} images read, {stats['review']} marked for review.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="Directory of images or manifest file with one image path per line.")
+    parser.add_argument('--output', required=True, help="Result file, .csv or .jsonl.")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: number of cores).")
+    parser.add_argument('--image-scale', type=float, default=1.0,
+                        help="Factor the images are resized by, so the digits have their size on the screen.")
+    parser.add_argument('--num-samples', type=int, default=10, help="Maximum number of Tesseract samples per tag.")
+    parser.add_argument('--certainty', type=float, default=ADAPTIVE_CERTAINTY,
+                        help="Certainty at which sampling stops, less certain numbers are marked for review.")
+    parser.add_argument('--fast-path', action='store_true',
+                        help="Take confident reads of the digit template reader without running Tesseract.")
+    parser.add_argument('--verbose', action='store_true', help="Show the OCR output of the workers.")
+    parser.add_argument('--username', default=None,
+                        help="Username used to locate the tesseract installation on Windows.")
+    args = parser.parse_args()
+
+    stats = run_batch(args.source, args.output, args.workers, args.image_scale, args.num_samples, args.certainty,
+                      quiet=not args.verbose, username=args.username,
+                      fast_path=args.fast_path)
+    print(f"Done: {stats['read']} images read, {stats['review']} marked for review, "
+          f"{stats['skipped']} already in {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
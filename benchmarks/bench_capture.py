@@ -0,0 +1,133 @@
+"""
+Compare the per-sample and the single-grab capture modes of `perform_ocr`.
+
+Run from the repository root while Data Shot (or any other static content) is visible on the primary monitor:
+
+    python -m benchmarks.bench_capture
+    python -m benchmarks.bench_capture --ocr  # also time the complete perform_ocr call
+
+Without a display, the screen can be replayed from an image (the capture backends are then not compared):
+
+    python -m benchmarks.bench_capture --replay imgs/test_image_1.png --position 693 462
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+from PIL import ImageGrab
+
+import capture
+from ocr import capture_jitter_region, crop_jitter_sample, perform_ocr
+
+# The call made by the middle-click handler in paul_born_ocr.py
+WIDTH, HEIGHT, JITTER_SIZE, MIN_SAMPLES, NUM_SAMPLES = 200, 80, 15, 3, 5
+
+
+def jittered_top_lefts(x, y, rng):
+    top_lefts = []
+    for _ in range(NUM_SAMPLES):
+        jitter_x = rng.randint(-JITTER_SIZE, JITTER_SIZE)
+        jitter_y = rng.randint(-JITTER_SIZE, JITTER_SIZE)
+        top_lefts.append((x + jitter_x - (WIDTH // 2), y + jitter_y - (HEIGHT // 2)))
+    return top_lefts
+
+
+def capture_per_sample(x, y, top_lefts):
+    return [capture.grab((left, top, WIDTH, HEIGHT)) for left, top in top_lefts]
+
+
+def capture_single_grab(x, y, top_lefts):
+    region, region_origin = capture_jitter_region(x, y, WIDTH, HEIGHT, JITTER_SIZE)
+    return [crop_jitter_sample(region, region_origin, left, top, WIDTH, HEIGHT) for left, top in top_lefts]
+
+
+def report(name, timings):
+    timings_ms = [t * 1000 for t in timings]
+    print(f"{name:<24} mean {statistics.mean(timings_ms):8.2f} ms   "
+          f"median {statistics.median(timings_ms):8.2f} ms   min {min(timings_ms):8.2f} ms")
+    return statistics.median(timings_ms)
+
+
+def compare_backends(repeats):
+    import pyautogui
+
+    # Time one jitter region grab (the capture of every perform_ocr call) with every available live backend
+    region = (*pyautogui.position(), WIDTH + 2 * JITTER_SIZE, HEIGHT + 2 * JITTER_SIZE)
+    timings = {'ImageGrab (new context)': lambda: np.asarray(ImageGrab.grab(bbox=capture.region_bbox(region)))}
+    for name in capture.CAPTURE_BACKENDS:
+        try:
+            backend = capture.create_capture_backend(name)
+        except ImportError as e:
+            print(f"Capture backend {name} not available ({e}).")
+            continue
+        timings[f"backend {name}"] = lambda backend=backend: backend.grab(region)
+
+    for name, grab in timings.items():
+        grab()  # Warm up
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            grab()
+            durations.append(time.perf_counter() - start)
+        report(name, durations)
+    print('-' * 40)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=50, help="Number of timed repetitions per mode.")
+    parser.add_argument('--ocr', action='store_true', help="Also time the complete perform_ocr call.")
+    parser.add_argument('--replay', help="Image served as screen instead of capturing the display.")
+    parser.add_argument('--position', type=int, nargs=2, help="Position to capture around (default: the mouse).")
+    args = parser.parse_args()
+
+    if args.replay:
+        capture.set_capture_backend(capture.ReplayCapture(args.replay))
+    else:
+        compare_backends(args.repeats)
+
+    if args.position is None:
+        import pyautogui
+        args.position = pyautogui.position()
+    x, y = args.position
+    print(f"Capturing around position: {x}, {y}")
+
+    # Both modes must see exactly the same pixels for the same jitter offsets
+    top_lefts = jittered_top_lefts(x, y, random.Random(0))
+    for reference, sample in zip(capture_per_sample(x, y, top_lefts), capture_single_grab(x, y, top_lefts)):
+        if not np.array_equal(reference, sample):
+            print("Warning: single-grab sample differs from per-sample capture (is the screen static?)")
+            break
+    else:
+        print("Single-grab samples match the per-sample captures.")
+
+    print('-' * 40)
+    medians = {}
+    modes = (('per-sample capture', capture_per_sample), ('single-grab capture', capture_single_grab))
+    for name, capture_samples in modes:
+        rng = random.Random(0)
+        timings = []
+        for _ in range(args.repeats):
+            top_lefts = jittered_top_lefts(x, y, rng)
+            start = time.perf_counter()
+            capture_samples(x, y, top_lefts)
+            timings.append(time.perf_counter() - start)
+        medians[name] = report(name, timings)
+    print(f"Capture speedup: {medians['per-sample capture'] / medians['single-grab capture']:.1f}x")
+
+    if args.ocr:
+        print('-' * 40)
+        for single_grab in (False, True):
+            timings = []
+            for _ in range(max(1, args.repeats // 10)):
+                start = time.perf_counter()
+                perform_ocr((x, y), WIDTH, HEIGHT, JITTER_SIZE, MIN_SAMPLES, NUM_SAMPLES, single_grab=single_grab,
+                            copy=False)
+                timings.append(time.perf_counter() - start)
+            report(f"perform_ocr single_grab={single_grab}", timings)
+
+
+if __name__ == '__main__':
+    main()
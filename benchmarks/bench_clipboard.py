@@ -0,0 +1,134 @@
+"""
+Count and time the clipboard operations of the ScreenAutomation macros with and without a clipboard session.
+
+Every field written by `ScreenAutomation.write_with_clipboard` goes through `ClipboardSession.paste_text`. This
+benchmark writes the fields of the macros in auto.py and paul_born_ocr.py into a stub clipboard, which waits a fixed
+time per operation like a round-trip to the operating system, so it runs without a screen or a real clipboard.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_clipboard
+    python -m benchmarks.bench_clipboard --latency 0.02 --records 20
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from clipboard import ClipboardSession
+
+# The fields pasted through the clipboard by each macro (typed and clicked fields do not use the clipboard)
+MACROS = {
+    'paul_born_ocr perform_paul_born': ['Collection Number', 'Born-Moser, Paul (1859-1928)'],
+    'auto perform_combined_example_action': ['Weber, Paul (1881-1968)', 'Weber, Paul (1881-1968)',
+                                             'Collection Number', 'V.1934', '1934/05', 'Pink dot\n'],
+    'auto perform_determination1': ['Sunira', 'circellaris', 'H.', 'H-U. Grunder', '1985', '9978'],
+    'perform_determination (all fields)': ['Sunira', 'circellaris', 'circellaris', 'forma', 'f.', 'H.',
+                                           'H-U. Grunder', '1985', '9978'],
+}
+
+# Text on the operator's clipboard before every macro
+OPERATOR_CLIPBOARD = '36714'
+
+# Number put on the clipboard by the prefetch while a macro runs
+PREFETCHED_NUMBER = '28355'
+
+
+class StubClipboard:
+    """
+    Clipboard in memory that counts its operations and waits `latency` seconds for each of them.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.text = ''
+        self.operations = 0
+
+    def copy(self, text):
+        time.sleep(self.latency)
+        self.operations += 1
+        self.text = text
+
+    def paste(self):
+        time.sleep(self.latency)
+        self.operations += 1
+        return self.text
+
+
+def run_macro(session, fields, batched):
+    pasted = []
+    if batched:
+        with session:
+            for field in fields:
+                session.paste_text(field, lambda: pasted.append(session.backend.text))
+    else:
+        for field in fields:
+            session.paste_text(field, lambda: pasted.append(session.backend.text))
+    return pasted
+
+
+def check_background_put(latency):
+    """
+    Put a text on the clipboard from another thread while a macro pastes its fields, as the prefetch of the next
+    number does. Every field must still receive its own text and the text put must stay on the clipboard.
+    """
+    fields = MACROS['paul_born_ocr perform_paul_born']
+    backend = StubClipboard(latency)
+    backend.text = OPERATOR_CLIPBOARD
+    session = ClipboardSession(backend)
+    pasted = []
+    thread = threading.Thread(target=session.put, args=(PREFETCHED_NUMBER,))
+    with session:
+        for index, field in enumerate(fields):
+            session.paste_text(field, lambda: pasted.append(session.backend.text))
+            if index == 0:
+                # The number is put while the macro still has fields to paste
+                thread.start()
+                time.sleep(latency)
+    thread.join()
+    return pasted == fields and backend.text == PREFETCHED_NUMBER, pasted, backend.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.005, help="Seconds per stub clipboard operation.")
+    parser.add_argument('--records', type=int, default=10, help="Number of records timed per macro and mode.")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'macro':<38} {'mode':<10} {'ops/record':>10} {'ms/record':>10}")
+    for name, fields in MACROS.items():
+        for batched in (False, True):
+            backend = StubClipboard(args.latency)
+            session = ClipboardSession(backend)
+            timings, operations = [], []
+            for _ in range(args.records):
+                backend.text = OPERATOR_CLIPBOARD
+                backend.operations = 0
+                start = time.perf_counter()
+                pasted = run_macro(session, fields, batched)
+                timings.append(time.perf_counter() - start)
+                operations.append(backend.operations)
+
+                # Every field must receive its own text and the operator's clipboard must survive the macro
+                if pasted != fields or backend.text != OPERATOR_CLIPBOARD:
+                    print(f"FAILED: {name} ({'session' if batched else 'per field'}) pasted {pasted!r}, "
+                          f"clipboard afterwards {backend.text!r}")
+                    failed = True
+            print(f"{name:<38} {'session' if batched else 'per field':<10} {statistics.mean(operations):>10.1f} "
+                  f"{statistics.median(timings) * 1000:>10.1f}")
+
+    passed, pasted, clipboard = check_background_put(args.latency)
+    if not passed:
+        print(f"FAILED: with a number put in the background the macro pasted {pasted!r}, clipboard afterwards "
+              f"{clipboard!r}")
+        failed = True
+    else:
+        print("A number put in the background waits for the macro and stays on the clipboard.")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure the digit template reader used as fast path of perform_ocr against Tesseract.
+
+For every tag image in imgs/tags/, the region perform_ocr captures around the tag is read with the digit template
+reader and its read is accepted the same way perform_ocr accepts it (FAST_PATH_CONFIDENCE, FAST_PATH_DIGITS),
+otherwise perform_ocr falls back to Tesseract. The same region is read by the OCR backend for comparison.
+The script exits with status 1 if an accepted read is not the number printed on the tag.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_digit_reader
+    python -m benchmarks.bench_digit_reader --backend pytesseract
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.fixtures import TAG_NUMBERS, tag_image_paths, tag_jitter_region
+from digit_reader import get_digit_reader
+from ocr import FAST_PATH_CONFIDENCE, FAST_PATH_DIGITS, clean_text
+from ocr_backends import BACKENDS, create_ocr_backend
+from utils import set_tesseract_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=10, help="Number of reads per tag for the timing.")
+    parser.add_argument('--backend', default='auto', choices=['auto'] + list(BACKENDS), help="The OCR backend.")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    set_tesseract_path(username=args.username)
+    reader = get_digit_reader()
+    try:
+        backend = create_ocr_backend(args.backend)
+        print(f"Using OCR backend: {backend.name}")
+    except Exception as e:
+        print(f"OCR backend {args.backend} not available ({e}), only timing the digit template reader.")
+        backend = None
+
+    reader_time = backend_time = 0
+    accepted = failures = 0
+
+    for path in tag_image_paths():
+        expected = TAG_NUMBERS.get(os.path.basename(path))
+        region = tag_jitter_region(path)
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            text, confidence = reader.read(region)
+        reader_time += time.perf_counter() - start
+
+        result = clean_text(text)
+        if result is not None and confidence >= FAST_PATH_CONFIDENCE and len(text) in FAST_PATH_DIGITS:
+            accepted += 1
+            if result == expected:
+                status = 'fast'
+            else:
+                status = 'FAILED'
+                failures += 1
+        else:
+            status = 'fallback'
+
+        backend_result = None
+        if backend is not None:
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                backend_result = clean_text(backend.image_to_string(region))
+            backend_time += time.perf_counter() - start
+
+        print(f"{os.path.basename(path):<10} {status:<8} expected {expected}   "
+              f"template reader {text or None} (confidence {confidence:.2f})   OCR backend {backend_result}")
+
+    reads = len(tag_image_paths()) * args.repeats
+    print('-' * 40)
+    print(f"digit template reader: {reader_time / reads * 1000:8.2f} ms per read   "
+          f"{accepted} tag(s) read without Tesseract")
+    if backend is not None:
+        print(f"OCR backend:           {backend_time / reads * 1000:8.2f} ms per read")
+
+    if failures:
+        print(f"{failures} tag(s) read wrongly by the digit template reader.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
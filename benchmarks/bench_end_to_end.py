@@ -0,0 +1,222 @@
+"""
+Drive the real shortcuts against the simulated Data Shot form and measure the time per record.
+
+The simulator (datashot_simulator.py) is started in its own process and shows the tag images in imgs/tags/ as
+specimens. The script then does what an operator does with paul_born_ocr.py for every record: go to the next
+specimen (Alt + 1, with the number read in the background), take the number read from the tag (middle click) and enter
+it with the Paul Born macro (§). The simulator logs every saved record, from which the script reports the time from
+the navigation until the record was saved, the records per hour, and whether the number read and the record saved
+are correct. It exits with status 1 if a saved record is not correct.
+
+Needs a display: on Linux without a monitor, run it in a virtual display (apt install xvfb xclip):
+
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmarks.bench_end_to_end
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmarks.bench_end_to_end --records 60 --jitter 0.5
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pyperclip
+
+import instrumentation
+from benchmarks.fixtures import TAG_NUMBERS, tag_image_paths
+from datashot_simulator import DEFAULT_DELAYS
+from macros import PAUL_BORN_COLLECTION, PAUL_BORN_STEPS, compile_macro
+from ocr import perform_ocr, pinlabels_region
+from ocr_backends import get_ocr_backend
+from prefetch import OCRPrefetcher, tag_watch_region
+from utils import ScreenAutomation, capture_settle_frame, set_tesseract_path, wait_until_settled
+
+# OCR settings of a middle click in paul_born_ocr.py, without skipping entered numbers as the specimens repeat
+OCR_OPTIONS = dict(width=200, height=80, jitter_size=15, min_samples=3, num_samples=10, adaptive=True,
+                   preprocess=True, skip_used=False)
+
+# Seconds to wait for the simulator window, for the number read in the background and for a saved record
+SIMULATOR_TIMEOUT = 30
+PREFETCH_TIMEOUT = 5
+RECORD_TIMEOUT = 5
+
+
+def start_simulator(specimens, log_path, args):
+    """
+    Start the simulator in its own process and wait until its window is shown.
+    """
+    command = [sys.executable, 'datashot_simulator.py', *specimens, '--log', log_path, '--jitter', str(args.jitter),
+               '--seed', str(args.seed)]
+    for name in DEFAULT_DELAYS:
+        command += [f'--{name}-delay', str(getattr(args, f'{name}_delay'))]
+    simulator = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    deadline = time.time() + SIMULATOR_TIMEOUT
+    while time.time() < deadline:
+        line = simulator.stdout.readline()
+        if not line:
+            break
+        if line.startswith("Simulator ready"):
+            return simulator
+        print(f"Simulator: {line.rstrip()}")
+    simulator.kill()
+    raise SystemExit("The simulator did not start, is a display (e.g. xvfb-run) available?")
+
+
+def saved_records(log_path):
+    with open(log_path, encoding='utf-8') as f:
+        return [entry for entry in map(json.loads, f) if entry['event'] == 'save']
+
+
+def wait_for_record(log_path, count, timeout=RECORD_TIMEOUT):
+    """
+    Wait until the simulator saved the count-th record and return it (None on timeout).
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        records = saved_records(log_path)
+        if len(records) >= count:
+            return records[count - 1]
+        time.sleep(0.01)
+    return None
+
+
+def wait_for_prefetch(prefetcher, position, timeout=PREFETCH_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        number = prefetcher.result_at(position, OCR_OPTIONS['width'], OCR_OPTIONS['height'])
+        if number is not None:
+            return number
+        time.sleep(0.01)
+    return None
+
+
+def enter_record(sa, macro, prefetcher, expected):
+    """
+    Go to the next specimen, read its number and enter it, as with Alt + 1, a middle click and §.
+
+    Returns
+    -------
+    dict
+        The number read and how it was read.
+    """
+    tag = sa.coordinates['tag_approximate']
+    if prefetcher is not None:
+        prefetcher.navigate(sa.perform_next, 'tag_approximate', True)
+        number, method = wait_for_prefetch(prefetcher, tag), 'prefetch'
+        if number is not None:
+            pyperclip.copy(str(number))
+    else:
+        watch_region = tag_watch_region(tag)
+        baseline = capture_settle_frame(watch_region)
+        sa.perform_next('tag_approximate', True)
+        wait_until_settled(watch_region, baseline)
+        number, method = None, 'click'
+    if number is None:
+        number = perform_ocr(tag, **OCR_OPTIONS)
+        method = 'click' if prefetcher is None else 'click after prefetch'
+
+    macro.run(verbose=False, number=pyperclip.paste())
+    return {'read': number, 'method': method, 'read_correct': number == expected}
+
+
+def check_record(record, entered):
+    """
+    Return whether a saved record contains exactly the entered number, its type and the collection.
+    """
+    if record is None:
+        return False
+    values = record['values']
+    return (values.get('numbers_more_number') == entered and values.get('numbers_more_type') == "Collection Number"
+            and values.get('collection') == PAUL_BORN_COLLECTION)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=20, help="Number of records entered.")
+    parser.add_argument('--no-prefetch', action='store_true', help="Read every tag on click, not in the background.")
+    parser.add_argument('--log', help="Simulator log file (default: a temporary file).")
+    parser.add_argument('--output', help="JSON file the result of every record is written to.")
+    for name, delay in DEFAULT_DELAYS.items():
+        parser.add_argument(f'--{name}-delay', type=float, default=delay,
+                            help=f"Seconds until the simulator reacts to a {name} (default: {delay}).")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum random lengthening of every delay.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the delay jitter.")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    # Every record is entered on a new specimen, the tag images are shown again and again
+    tags = [path for path in tag_image_paths() if os.path.basename(path) in TAG_NUMBERS]
+    specimens = [tags[i % len(tags)] for i in range(args.records + 1)]
+    log_path = args.log or os.path.join(tempfile.mkdtemp(), 'datashot_log.jsonl')
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    simulator = start_simulator(specimens, log_path, args)
+
+    prefetcher = None
+    try:
+        set_tesseract_path(username=args.username)
+        get_ocr_backend('auto')  # Loaded before timing, so no stage pays for it
+        instrumentation.enable()
+
+        sa = ScreenAutomation(cache_path=None)
+        pinlabels = sa.coordinates['pinlabels']
+        sa.coordinates['tag_approximate'] = (pinlabels[0] + 250, pinlabels[1] + 260)
+        macro = compile_macro(sa, PAUL_BORN_STEPS, name='Paul Born')
+        if not args.no_prefetch:
+            prefetcher = OCRPrefetcher(tag_watch_region(sa.coordinates['tag_approximate']),
+                                       pinlabels_region(sa.coordinates['pinlabels']), copy=False, **OCR_OPTIONS)
+
+        results = []
+        print('-' * 40)
+        print(f"{'record':>6} {'image':<12} {'expected':>8} {'read':>8} {'saved':>8} {'seconds':>8}  method")
+        for i in range(args.records):
+            # The simulator starts on the first specimen, every record is entered on the next one
+            image = os.path.basename(specimens[i + 1])
+            expected = TAG_NUMBERS[image]
+            start = time.time()
+            result = enter_record(sa, macro, prefetcher, expected)
+            record = wait_for_record(log_path, i + 1)
+
+            saved = record['values'].get('numbers_more_number') if record is not None else None
+            result.update(record=i + 1, image=image, expected=expected, saved=saved,
+                          entry_correct=check_record(record, str(result['read'])) and record['image'] == image,
+                          correct=check_record(record, str(expected)) and record['image'] == image,
+                          seconds=round(record['time'] - start, 3) if record is not None else None)
+            results.append(result)
+            seconds = f"{result['seconds']:8.2f}" if result['seconds'] is not None else f"{'-':>8}"
+            print(f"{i + 1:>6} {image:<12} {expected:>8} {str(result['read']):>8} {str(saved):>8} {seconds}  "
+                  f"{result['method']}{'' if result['correct'] else '  WRONG'}")
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+        simulator.terminate()
+
+    durations = [result['seconds'] for result in results if result['seconds'] is not None]
+    print('-' * 40)
+    if durations:
+        print(f"Seconds per record: p50 {percentile(durations, 50):.2f}, p95 {percentile(durations, 95):.2f}, "
+              f"max {max(durations):.2f}, {3600 / statistics.mean(durations):.0f} records per hour")
+    print(f"Numbers read correctly: {sum(result['read_correct'] for result in results)}/{len(results)}, "
+          f"entered as read: {sum(result['entry_correct'] for result in results)}/{len(results)}, "
+          f"records correct: {sum(result['correct'] for result in results)}/{len(results)}")
+    instrumentation.print_summary()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}.")
+
+    if not all(result['correct'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
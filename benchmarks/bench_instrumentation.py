@@ -0,0 +1,93 @@
+"""
+Measure the overhead of the timing spans (instrumentation.py) and time the stages of perform_ocr with them.
+
+The overhead of an empty span is measured with the instrumentation switched off and on. Then every tag image in
+imgs/tags/ is served as screen (see capture.ReplayCapture) and read with perform_ocr with the instrumentation on,
+once with the digit fast path and once with Tesseract only, and the summary of the recorded spans is printed. The
+script exits with status 1 if the trace file does not contain every recorded span.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_instrumentation
+    python -m benchmarks.bench_instrumentation --calls 1000000 --trace trace.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import capture
+import instrumentation
+from benchmarks.fixtures import TAG_NUMBERS, synthetic_tag_screen, tag_image_paths
+from ocr import perform_ocr
+from ocr_backends import get_ocr_backend
+from utils import set_tesseract_path
+
+
+def time_spans(calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        pass
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        with instrumentation.span('bench.empty'):
+            pass
+    return (time.perf_counter() - start - loop) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000, help="Number of empty spans timed per setting.")
+    parser.add_argument('--repeats', type=int, default=3, help="Number of reads per tag and mode.")
+    parser.add_argument('--trace', help="Trace file to write (default: a temporary file).")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    instrumentation.disable()
+    print(f"Span switched off: {time_spans(args.calls) * 1e9:8.0f} ns per span")
+    instrumentation.enable()
+    print(f"Span switched on:  {time_spans(args.calls) * 1e9:8.0f} ns per span")
+    instrumentation.disable()
+    instrumentation.reset()
+
+    set_tesseract_path(username=args.username)
+    get_ocr_backend('auto')  # Loaded before timing, so no stage pays for it
+    trace_path = args.trace or os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+    if os.path.exists(trace_path):
+        os.remove(trace_path)
+
+    instrumentation.enable(trace_path)
+    for path in tag_image_paths():
+        if os.path.basename(path) not in TAG_NUMBERS:
+            continue
+        screen, center = synthetic_tag_screen(path)
+        capture.set_capture_backend(capture.ReplayCapture(screen))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for fast_path in (True, False):
+                for _ in range(args.repeats):
+                    perform_ocr(center, cache=False, copy=False, fast_path=fast_path, adaptive=not fast_path,
+                                preprocess=True, num_samples=10)
+    summary = instrumentation.summary()
+    recorded = sum(row['count'] for row in instrumentation.stats().values())
+    instrumentation.disable()
+
+    print('-' * 40)
+    print(summary)
+    print('-' * 40)
+
+    with open(trace_path, encoding='utf-8') as f:
+        spans = [json.loads(line) for line in f]
+    print(f"{len(spans)} spans written to {trace_path}, {recorded} recorded.")
+    if len(spans) != recorded:
+        print("The trace file does not contain every recorded span.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
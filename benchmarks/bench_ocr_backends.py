@@ -0,0 +1,62 @@
+"""
+Compare the per-sample latency of the OCR backends on the bundled images.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ocr_backends
+    python -m benchmarks.bench_ocr_backends --username <YourUsername>  # if tesseract is not found automatically
+"""
+import argparse
+import os
+import statistics
+import time
+
+import pytesseract
+
+from benchmarks.fixtures import load_rgb, tag_image_paths
+from ocr import clean_text
+from ocr_backends import BACKENDS
+from utils import set_tesseract_path
+
+
+def load_images():
+    paths = [os.path.join('imgs', 'test_image_1.png')] + tag_image_paths()
+    return [(os.path.basename(path), load_rgb(path)) for path in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=10, help="Number of timed reads per image and backend.")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    set_tesseract_path(username=args.username)
+    images = load_images()
+
+    for name, backend_class in BACKENDS.items():
+        print('-' * 40)
+        try:
+            start = time.perf_counter()
+            backend = backend_class()
+            backend.image_to_string(images[0][1])
+            print(f"{name}: startup and first read {(time.perf_counter() - start) * 1000:.1f} ms")
+        except (ImportError, RuntimeError, pytesseract.TesseractNotFoundError) as e:
+            print(f"{name}: not available ({e})")
+            continue
+
+        timings = []
+        for image_name, image in images:
+            image_timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                text = backend.image_to_string(image)
+                image_timings.append(time.perf_counter() - start)
+            timings.extend(image_timings)
+            print(f"  {image_name:<16} {statistics.median(image_timings) * 1000:8.1f} ms   "
+                  f"read {text.strip()!r} -> {clean_text(text)}")
+        print(f"  {'all images':<16} {statistics.median(timings) * 1000:8.1f} ms per sample (median)")
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
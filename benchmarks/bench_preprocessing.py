@@ -0,0 +1,95 @@
+"""
+Compare the OCR accuracy and latency of the preprocessing steps in front of Tesseract (perform_ocr(..., preprocess=...)).
+
+For every configuration, jittered samples of the tag images in imgs/tags/ are preprocessed and read by the OCR
+backend. Reported are the share of single samples read correctly, the share of tags whose most common result over
+--num-samples samples is correct, and the time per sample spent on preprocessing and on OCR. The screenshots can be
+reduced with --scale to see how the steps cope with a smaller zoom level in Data Shot, and --background places the
+tags on a uniform gray background (0-255) that the jittered samples partly show, as on the screen.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_preprocessing
+    python -m benchmarks.bench_preprocessing --num-samples 3 --scale 0.5 --background 255
+"""
+import argparse
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.fixtures import TAG_NUMBERS, jittered_tag_samples, tag_image_paths
+from ocr import clean_text
+from ocr_backends import BACKENDS, create_ocr_backend
+from preprocessing import Preprocessor, to_grayscale
+from utils import set_tesseract_path
+
+CONFIGURATIONS = {
+    'none': None,
+    'grayscale': to_grayscale,
+    'contrast': Preprocessor(deskew=False),
+    'default': Preprocessor(),
+    'default+upscale': Preprocessor(upscale=True),
+    'default+binarize': Preprocessor(binarize=True),
+}
+
+
+def most_common(votes):
+    valid_votes = [vote for vote in votes if vote is not None]
+    if not valid_votes:
+        return None
+    return max(set(valid_votes), key=valid_votes.count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-samples', type=int, default=5, help="Number of jittered samples per tag.")
+    parser.add_argument('--rounds', type=int, default=4, help="Number of times every tag is sampled.")
+    parser.add_argument('--scale', type=float, default=1.0, help="Factor the screenshots are resized by.")
+    parser.add_argument('--background', type=int, default=None,
+                        help="Gray value around the tags (default: the border pixels of the tags).")
+    parser.add_argument('--backend', default='auto', choices=['auto'] + list(BACKENDS), help="The OCR backend.")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    set_tesseract_path(username=args.username)
+    backend = create_ocr_backend(args.backend)
+    print(f"Using OCR backend: {backend.name}")
+    print(f"{'configuration':<18} {'samples':>9} {'tags':>9} {'preprocess':>12} {'OCR':>10}")
+
+    for name, preprocess in CONFIGURATIONS.items():
+        rng = random.Random(0)  # The same samples for every configuration
+        correct_samples = correct_tags = total_samples = total_tags = 0
+        preprocess_time = ocr_time = 0
+
+        for path in tag_image_paths():
+            expected = TAG_NUMBERS.get(os.path.basename(path))
+            for _ in range(args.rounds):
+                votes = []
+                for sample in jittered_tag_samples(path, args.num_samples, rng, background=args.background):
+                    if args.scale != 1:
+                        sample = cv2.resize(np.asarray(sample), None, fx=args.scale, fy=args.scale,
+                                            interpolation=cv2.INTER_AREA)
+
+                    start = time.perf_counter()
+                    if preprocess is not None:
+                        sample = preprocess(sample)
+                    preprocess_time += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    votes.append(clean_text(backend.image_to_string(sample)))
+                    ocr_time += time.perf_counter() - start
+
+                correct_samples += sum(vote == expected for vote in votes)
+                correct_tags += most_common(votes) == expected
+                total_samples += len(votes)
+                total_tags += 1
+
+        print(f"{name:<18} {correct_samples / total_samples:>9.0%} {correct_tags / total_tags:>9.0%} "
+              f"{preprocess_time / total_samples * 1000:>9.2f} ms {ocr_time / total_samples * 1000:>7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
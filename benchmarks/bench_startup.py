@@ -0,0 +1,95 @@
+"""
+Measure how long the imports of paul_born_ocr.py take before the hotkeys are registered, and after.
+
+Every group of modules is imported in a fresh interpreter, which reports the import time and the heavy modules it
+loaded. paul_born_ocr.py registers its hotkeys after importing only the modules of the 'hotkeys' group, the other
+groups are imported afterwards (OCR in the main thread, screen automation in a background thread). The script exits
+with status 1 if a group fails to import, the 'hotkeys' group loads a heavy module or the OCR modules load
+pytesseract.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeats 5
+"""
+import argparse
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules whose import takes long, none of them may be imported before the hotkeys are registered
+HEAVY_MODULES = ('numpy', 'cv2', 'pyautogui', 'pytesseract', 'tkinter', 'PIL', 'tesserocr')
+
+# The modules imported by paul_born_ocr.py, in the order they are loaded at startup
+IMPORT_GROUPS = {
+    'hotkeys': ['keyboard', 'mouse', 'pyperclip', 'instrumentation', 'dispatcher'],
+    'ocr': ['ocr_backends', 'ocr_cache', 'used_numbers', 'utils'],
+    'coordinates': ['journal', 'macros', 'ocr', 'prefetch'],
+}
+
+# Modules the groups must not load (the OCR only loads pytesseract if the in-process engine is not available)
+FORBIDDEN_MODULES = {
+    'hotkeys': HEAVY_MODULES,
+    'ocr': ('pytesseract', 'tkinter'),
+    'coordinates': ('pytesseract', 'tkinter'),
+}
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_group(modules):
+    """
+    Import modules in a fresh interpreter.
+
+    Returns
+    -------
+    dict
+        The import time in seconds and the heavy modules loaded.
+    """
+    code = MEASURE.format(modules=modules, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3, help="Number of fresh interpreters per group.")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'group':<12} {'median ms':>10}  heavy modules loaded")
+    for group, modules in IMPORT_GROUPS.items():
+        available = [name for name in modules if importlib.util.find_spec(name) is not None]
+        missing = sorted(set(modules) - set(available))
+        try:
+            results = [measure_group(available) for _ in range(args.repeats)]
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.strip().splitlines()[-1]
+            print(f"{group:<12} failed to import: {error}")
+            failures.append(f"{group} fails to import ({error})")
+            continue
+        loaded = results[-1]['loaded']
+        median = statistics.median(result['seconds'] for result in results) * 1000
+        note = f"  (not installed: {', '.join(missing)})" if missing else ''
+        print(f"{group:<12} {median:>10.1f}  {', '.join(loaded) or '-'}{note}")
+        forbidden = [name for name in loaded if name in FORBIDDEN_MODULES[group]]
+        if forbidden:
+            failures.append(f"{group} loads {', '.join(forbidden)}")
+
+    if failures:
+        print(f"Startup check failed: {'; '.join(failures)}.")
+        sys.exit(1)
+    print("The hotkeys are registered without loading a heavy module.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Check that the packed template file (see utils.TemplateBank) serves every template after a restart, and time loading it.
+
+The template bank is preloaded once by decoding the images in imgs/, imgs/tags/ and imgs/tags/digits/ and packed into a
+temporary file. A second bank, as created when the script is started again, loads the packed file and every image of
+the folders is requested from it. The script exits with status 1 if the packed file does not contain the key of every
+image or a request misses the bank (the image would be decoded from disk again on the hotkey path).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_templates
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from utils import TemplateBank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        npz_path = os.path.join(directory, 'templates.npz')
+        first = TemplateBank(npz_path=npz_path)
+        first.preload()
+        print(f"Decoding the images: {first.summary()}")
+
+        with np.load(npz_path) as packed:
+            missing = sorted(set(first.keys()) - set(packed.files))
+        if missing:
+            failures.append(f"{len(missing)} keys not in the packed file, e.g. {missing[0]!r}")
+
+        second = TemplateBank(npz_path=npz_path)
+        second.preload()
+        for folder in second.folders:
+            for image_name in second.names(folder):
+                second.get(image_name, folder=folder)
+        print(f"Loading the packed file: {second.summary()}")
+        if second.misses:
+            failures.append(f"{second.misses} of {second.hits + second.misses} templates missed after the restart")
+
+    if failures:
+        print(f"Template check failed: {'; '.join(failures)}.")
+        sys.exit(1)
+    print("Every template is served from the packed file.")
+
+
+if __name__ == '__main__':
+    main()
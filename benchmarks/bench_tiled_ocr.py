@@ -0,0 +1,182 @@
+"""
+Compare reading the jittered samples one by one with reading them as one tiled image (perform_ocr(..., tiled=True)).
+
+For every tag image in imgs/tags/, jittered samples are cropped the same way perform_ocr crops them from the screen
+and both paths vote on them. First both paths read the samples with a fake OCR backend (no Tesseract needed), which
+reads every sample as a text derived from its pixels wherever the sample is placed in the image: here every single
+vote of the tiled path must be identical to the vote of the per-sample path, otherwise tile_samples or
+split_tiled_words assigned a word to the wrong sample. Then both paths read the samples with Tesseract, where single
+votes can differ just like they differ between two jittered samples (Tesseract sees the neighbouring samples), their
+agreement is reported. The script exits with status 1 if a vote of the fake backend differs, or if the most common
+Tesseract result of the tiled path differs from the per-sample path and is not the number printed on the tag.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tiled_ocr
+    python -m benchmarks.bench_tiled_ocr --num-samples 15 --backend pytesseract
+    python -m benchmarks.bench_tiled_ocr --backend fake
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import TAG_NUMBERS, jittered_tag_samples, tag_image_paths
+from ocr import clean_text, split_tiled_words, tile_samples
+from ocr_backends import BACKENDS, create_ocr_backend
+from utils import set_tesseract_path
+
+
+class FakeTileBackend:
+    """
+    OCR backend reading every sample as a text derived from a hash of its pixels.
+
+    In a tiled image, the samples are found as the blocks of rows and columns that are not of the background color of
+    the image corners, and every sample gets the words it would get alone, at its position in the tiled image.
+    """
+
+    name = 'fake'
+
+    @staticmethod
+    def _words(sample):
+        # Some samples are read as no number, some as two words, to check the word order and the empty tiles
+        digest = hashlib.sha1(np.ascontiguousarray(np.asarray(sample)[:, :, :3]).tobytes()).digest()
+        number = int.from_bytes(digest[:4], 'little') % 90000 + 10000
+        kind = digest[4] % 4
+        if kind == 0:
+            return []
+        if kind == 1:
+            return ['No.', f"{number:,}"]
+        return [f"{number:,}"]
+
+    def image_to_string(self, image):
+        return ' '.join(self._words(image))
+
+    def image_to_words(self, image):
+        image = np.asarray(image)[:, :, :3]
+        is_background = (image == image[0, 0]).all(axis=2)
+        words = []
+        for top, bottom in self._blocks(~is_background.all(axis=1)):
+            for left, right in self._blocks(~is_background[top:bottom].all(axis=0)):
+                for i, text in enumerate(self._words(image[top:bottom, left:right])):
+                    words.append((text, left + i * 60, top, 50, bottom - top, 90.0))
+        return words
+
+    @staticmethod
+    def _blocks(mask):
+        # The (start, end) ranges of consecutive True values
+        edges = np.flatnonzero(np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8)))
+        return list(zip(edges[::2], edges[1::2]))
+
+
+def most_common(votes):
+    valid_votes = [vote for vote in votes if vote is not None]
+    if not valid_votes:
+        return None
+    return max(set(valid_votes), key=valid_votes.count)
+
+
+def compare_paths(backend, samples):
+    """
+    Read samples one by one and as one tiled image.
+
+    Returns
+    -------
+    tuple
+        The votes of the per-sample path and of the tiled path, and the seconds both took.
+    """
+    start = time.perf_counter()
+    per_sample_votes = [clean_text(backend.image_to_string(sample)) for sample in samples]
+    per_sample_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tiled, tile_spans = tile_samples(samples)
+    tiled_votes = [clean_text(text) for text in split_tiled_words(backend.image_to_words(tiled), tile_spans)]
+    return per_sample_votes, tiled_votes, per_sample_time, time.perf_counter() - start
+
+
+def check_fake_votes(tag_samples):
+    """
+    Check that every single vote of the tiled path is the vote of the per-sample path, with the fake backend.
+
+    Returns
+    -------
+    int
+        The number of tags with differing votes.
+    """
+    backend = FakeTileBackend()
+    failures = 0
+    for path, samples in tag_samples.items():
+        per_sample_votes, tiled_votes, _, _ = compare_paths(backend, samples)
+        if per_sample_votes != tiled_votes:
+            failures += 1
+            print(f"{os.path.basename(path):<10} FAILED with the fake backend")
+            print(f"  per-sample votes {per_sample_votes}")
+            print(f"  tiled votes      {tiled_votes}")
+    votes = sum(len(samples) for samples in tag_samples.values())
+    print(f"Fake backend: {len(tag_samples) - failures}/{len(tag_samples)} tag(s) with identical votes "
+          f"({votes} votes).")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--num-samples', type=int, default=5, help="Number of jittered samples per tag.")
+    parser.add_argument('--backend', default='auto', choices=['auto', 'fake'] + list(BACKENDS),
+                        help="The OCR backend compared after the fake backend ('fake': only the fake backend).")
+    parser.add_argument('--username', default=None, help="Username used to locate the tesseract installation.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    tag_samples = {path: jittered_tag_samples(path, args.num_samples, rng) for path in tag_image_paths()}
+    failures = check_fake_votes(tag_samples)
+    if args.backend == 'fake':
+        sys.exit(1 if failures else 0)
+
+    set_tesseract_path(username=args.username)
+    backend = create_ocr_backend(args.backend)
+    print('-' * 40)
+    print(f"Using OCR backend: {backend.name}")
+
+    per_sample_time = tiled_time = 0
+    agreeing_votes = total_votes = per_sample_correct = tiled_correct = 0
+    for path, samples in tag_samples.items():
+        expected = TAG_NUMBERS.get(os.path.basename(path))
+        per_sample_votes, tiled_votes, per_sample_seconds, tiled_seconds = compare_paths(backend, samples)
+        per_sample_time += per_sample_seconds
+        tiled_time += tiled_seconds
+
+        per_sample_result, tiled_result = most_common(per_sample_votes), most_common(tiled_votes)
+        per_sample_correct += per_sample_result == expected
+        tiled_correct += tiled_result == expected
+        if tiled_result == per_sample_result:
+            status = 'same'
+        elif tiled_result == expected:
+            status = 'better'
+        else:
+            status = 'FAILED'
+            failures += 1
+        agreeing_votes += sum(a == b for a, b in zip(per_sample_votes, tiled_votes))
+        total_votes += len(samples)
+
+        print(f"{os.path.basename(path):<10} {status:<7} expected {expected}   "
+              f"per-sample {per_sample_result}   tiled {tiled_result}")
+        print(f"  per-sample votes {per_sample_votes}")
+        print(f"  tiled votes      {tiled_votes}")
+
+    print('-' * 40)
+    print(f"per-sample OCR: {per_sample_time * 1000:8.1f} ms   {per_sample_correct} tag(s) read correctly")
+    print(f"tiled OCR:      {tiled_time * 1000:8.1f} ms   {tiled_correct} tag(s) read correctly")
+    print(f"identical single votes: {agreeing_votes}/{total_votes}")
+
+    if failures:
+        print(f"{failures} tag(s) voted differently.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Fixtures shared by the benchmarks, built from the images bundled in imgs/.
+"""
+import glob
+import os
+
+import numpy as np
+from PIL import Image
+
+from ocr import DIGIT_CONFUSIONS, crop_jitter_sample
+from utils import LABEL_IMAGES, template_path
+
+TAGS_FOLDER = os.path.join('imgs', 'tags')
+TEST_IMAGE = os.path.join('imgs', 'test_image_1.png')
+
+# Size and colours of the synthetic screens, the tags are shown on a dark area like the pin label image
+SCREEN_SIZE = (1920, 1080)
+SCREEN_BACKGROUND = (240, 240, 240)
+PINLABELS_BACKGROUND = (90, 80, 70)
+
+# Probabilities of the misreads in the synthetic OCR corpus (see `ocr_corpus`)
+CORPUS_NOISE = {
+    'punctuation': 0.3,  # Spaces, dots or dashes around the number
+    'parenthesis': 0.05,  # The leading 1 of a five-digit number read as "("
+    'border': 0.05,  # The left border of the tag read as an additional leading 1
+    'eight': 0.05,  # The leading 3 of a five-digit number read as 8
+    'confusion': 0.05,  # One digit misread as a digit it is often confused with (DIGIT_CONFUSIONS)
+    'garbage': 0.02,  # No number at all
+}
+
+# The collection number printed on every tag image in imgs/tags/
+TAG_NUMBERS = {
+    'tag3.PNG': 28355,
+    'tag4.PNG': 9047,
+    'tag6.PNG': 36774,
+    'tag7.PNG': 41943,
+    'tag11.PNG': 14655,
+    'tag12.PNG': 37421,
+}
+
+
+def tag_image_paths():
+    return sorted(glob.glob(os.path.join(TAGS_FOLDER, 'tag*.PNG')))
+
+
+def load_rgb(path):
+    return np.asarray(Image.open(path).convert('RGB'))
+
+
+def tag_jitter_region(path, jitter_size=15, background=None):
+    """
+    Build the region capture_jitter_region would capture around a tag image centred on the screen position.
+
+    The tag is extended by the jitter size on every side, with its border pixels or with a uniform gray background.
+    """
+    tag = load_rgb(path)
+    padding = ((jitter_size, jitter_size), (jitter_size, jitter_size), (0, 0))
+    if background is None:
+        return np.pad(tag, padding, mode='edge')
+    return np.pad(tag, padding, mode='constant', constant_values=background)
+
+
+def jittered_tag_samples(path, num_samples, rng, jitter_size=15, background=None):
+    """
+    Crop jittered samples from a tag image the same way perform_ocr crops them from the screen.
+
+    Every jittered crop (of the size of the tag) stays inside the region built by `tag_jitter_region`.
+    """
+    region = tag_jitter_region(path, jitter_size, background)
+    height = region.shape[0] - 2 * jitter_size
+    width = region.shape[1] - 2 * jitter_size
+
+    samples = []
+    for _ in range(num_samples):
+        left = jitter_size + rng.randint(-jitter_size, jitter_size)
+        top = jitter_size + rng.randint(-jitter_size, jitter_size)
+        samples.append(crop_jitter_sample(region, (0, 0), left, top, width, height))
+    return samples
+
+
+def synthetic_label_screen(label_images=None):
+    """
+    Build a screen showing every label image of the Data Shot form once, on a plain background.
+
+    The alternative images of deactivated buttons are left out, as Data Shot shows either of them.
+
+    Returns
+    -------
+    tuple
+        The screen (RGB) and the center (x, y) of every label image on it.
+    """
+    if label_images is None:
+        label_images = [name for name in LABEL_IMAGES if 'deactivated' not in name]
+    screen = np.full((SCREEN_SIZE[1], SCREEN_SIZE[0], 3), SCREEN_BACKGROUND, dtype=np.uint8)
+    centers = {}
+    column_width, row_height, margin = 260, 110, 40
+    columns = (SCREEN_SIZE[0] - margin) // column_width
+    for index, name in enumerate(label_images):
+        label = load_rgb(template_path(name))
+        left = margin + (index % columns) * column_width
+        top = margin + (index // columns) * row_height
+        screen[top:top + label.shape[0], left:left + label.shape[1]] = label
+        centers[name] = (left + label.shape[1] // 2, top + label.shape[0] // 2)
+    return screen, centers
+
+
+def synthetic_tag_screen(path, center=(960, 700)):
+    """
+    Build a screen showing a tag image on a dark pin label area.
+
+    Returns
+    -------
+    tuple
+        The screen (RGB) and the center (x, y) of the tag on it.
+    """
+    screen = np.full((SCREEN_SIZE[1], SCREEN_SIZE[0], 3), SCREEN_BACKGROUND, dtype=np.uint8)
+    screen[center[1] - 300:center[1] + 300, center[0] - 500:center[0] + 500] = PINLABELS_BACKGROUND
+    tag = load_rgb(path)
+    left, top = center[0] - tag.shape[1] // 2, center[1] - tag.shape[0] // 2
+    screen[top:top + tag.shape[0], left:left + tag.shape[1]] = tag
+    return screen, (left + tag.shape[1] // 2, top + tag.shape[0] // 2)
+
+
+def ocr_corpus(size, rng):
+    """
+    Generate raw OCR reads of random collection numbers with the typical misreads of the Paul Born tags.
+
+    Parameters
+    ----------
+    size : int
+        The number of reads.
+    rng : random.Random
+        The random generator (seeded, so the corpus is the same in every run).
+
+    Returns
+    -------
+    list
+        Tuples (text read, true collection number or None if the read is garbage).
+    """
+    corpus = []
+    for _ in range(size):
+        if rng.random() < CORPUS_NOISE['garbage']:
+            corpus.append((rng.choice(['', '-', '..', 'Born', 'l|', '(((']), None))
+            continue
+
+        number = rng.randint(1, 63000)
+        text = str(number)
+        if rng.random() < CORPUS_NOISE['confusion']:
+            position = rng.randrange(1, len(text)) if len(text) > 1 else 0
+            text = text[:position] + rng.choice(DIGIT_CONFUSIONS[text[position]]) + text[position + 1:]
+        if len(text) == 5 and text[0] == '3' and rng.random() < CORPUS_NOISE['eight']:
+            text = '8' + text[1:]
+        if len(text) == 5 and text[0] == '1' and rng.random() < CORPUS_NOISE['parenthesis']:
+            text = '(' + text[1:]
+        elif len(text) == 5 and rng.random() < CORPUS_NOISE['border']:
+            text = '1' + text
+        if rng.random() < CORPUS_NOISE['punctuation']:
+            text = rng.choice([' ', '.', '-', '\n']) + text + rng.choice(['', ' ', '.', ',', '\n'])
+        corpus.append((text, number))
+    return corpus
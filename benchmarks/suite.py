@@ -0,0 +1,288 @@
+"""
+Measure the latency, throughput, peak memory and accuracy of the OCR and matching hot paths, headless.
+
+The screen is replayed from synthetic screens built from the label images in imgs/ and the tag images in
+imgs/tags/ (see capture.ReplayCapture), and from imgs/test_image_1.png, so no display and no Data Shot is needed.
+The results can be written as JSON and compared against a stored baseline, the comparison fails (exit code 1) if a
+stage got slower than the tolerance or less accurate. A stage that raises an error is reported as failed, the other
+stages still run and are compared, and the exit code is 1.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output benchmark_results.json
+    python -m benchmarks.suite --baseline benchmark_baseline.json --tolerance 0.2
+    python -m benchmarks.suite --stages clean_text clean_text_corpus --corpus-size 100000
+    python -m benchmarks.suite --username jdoe
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import capture
+from ocr import clean_text, locate_and_average_centers, perform_ocr
+from ocr_backends import get_ocr_backend
+from used_numbers import UsedNumberIndex
+from utils import ScreenAutomation, set_tesseract_path
+
+from .fixtures import (TAG_NUMBERS, TEST_IMAGE, ocr_corpus, synthetic_label_screen, synthetic_tag_screen,
+                       tag_image_paths)
+
+# Distance (in pixels) within which a located tag or label counts as found at the right position
+POSITION_TOLERANCE = 20
+
+# Share of the collection numbers marked as entered in the clean_text_corpus_used stage
+USED_SHARE = 0.3
+
+
+class Stage:
+    """
+    A benchmarked operation: `run(i)` performs the i-th operation and returns whether its result was correct, the
+    numbers (correct, total) of correct results of a batch, or None if there is no expected result. Every operation
+    handles `items` items (e.g. OCR reads).
+    """
+
+    def __init__(self, name, run, operations, items=1, setup=None):
+        self.name = name
+        self.run = run
+        self.operations = operations
+        self.items = items
+        self.setup = setup
+
+
+def percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def measure(stage, repeats):
+    """
+    Time every operation of a stage `repeats` times, then measure its peak memory in one traced pass.
+    """
+    timings, correct, total = [], 0, 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        if stage.setup is not None:
+            stage.setup()
+        stage.run(0)  # Warm up (loads templates, OCR engine, ...)
+
+        for _ in range(repeats):
+            for i in range(stage.operations):
+                start = time.perf_counter()
+                result = stage.run(i)
+                timings.append(time.perf_counter() - start)
+                if isinstance(result, tuple):
+                    correct, total = correct + result[0], total + result[1]
+                elif result is not None:
+                    correct, total = correct + bool(result), total + 1
+
+        tracemalloc.start()
+        try:
+            for i in range(stage.operations):
+                stage.run(i)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p95_ms': round(percentile(timings, 95) * 1000, 4),
+        'mean_ms': round(statistics.mean(timings) * 1000, 4),
+        'throughput_per_s': round(stage.items * len(timings) / sum(timings), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'accuracy': round(correct / total, 4) if total else None,
+        'operations': len(timings),
+    }
+
+
+def near(position, expected):
+    return position is not None and math.dist(position, expected) <= POSITION_TOLERANCE
+
+
+def build_stages(args):
+    rng = random.Random(args.seed)
+    stages = []
+
+    # clean_text on single reads and on a large corpus, with and without the index of entered numbers
+    corpus = ocr_corpus(args.corpus_size, rng)
+    reads = corpus[:1000]
+    stages.append(Stage('clean_text', lambda i: clean_text(reads[i][0]) == reads[i][1], len(reads)))
+    stages.append(Stage('clean_text_corpus', lambda i: corpus_accuracy(corpus), 1, len(corpus)))
+    used = UsedNumberIndex()
+    truths = {number for _, number in corpus}
+    for number in rng.sample(range(1, 63001), int(63000 * USED_SHARE)):
+        if number not in truths:
+            used.add(number)
+    stages.append(Stage('clean_text_corpus_used', lambda i: corpus_accuracy(corpus, used), 1, len(corpus)))
+
+    # Tag localisation and OCR on a synthetic screen per tag
+    tag_paths = [path for path in tag_image_paths() if os.path.basename(path) in TAG_NUMBERS]
+    screens = [synthetic_tag_screen(path) for path in tag_paths]
+    numbers = [TAG_NUMBERS[os.path.basename(path)] for path in tag_paths]
+    tag_replay = capture.ReplayCapture([screen for screen, _ in screens])
+
+    def on_tag_screen(i):
+        tag_replay.index = i
+        return screens[i][1]
+
+    def use_tag_screens():
+        capture.set_capture_backend(tag_replay)
+
+    def locate_tag(i):
+        center = on_tag_screen(i)
+        return near(locate_and_average_centers(verbose=False, region=(0, 0) + tag_replay.size), center)
+
+    def ocr_tag(i, **kwargs):
+        center = on_tag_screen(i)
+        return perform_ocr(center, cache=False, copy=False, **kwargs) == numbers[i]
+
+    stages.append(Stage('locate_and_average_centers', locate_tag, len(screens), setup=use_tag_screens))
+    stages.append(Stage('perform_ocr', lambda i: ocr_tag(i, fast_path=True), len(screens), setup=use_tag_screens))
+    stages.append(Stage('perform_ocr_tesseract',
+                        lambda i: ocr_tag(i, fast_path=False, adaptive=True, preprocess=True, num_samples=10),
+                        len(screens), setup=use_tag_screens))
+
+    # Tag localisation on the bundled screenshot (no expected position)
+    test_replay = capture.ReplayCapture(TEST_IMAGE)
+    stages.append(Stage('locate_test_image', lambda i: locate_and_average_centers(verbose=False) and None, 1,
+                        setup=lambda: capture.set_capture_backend(test_replay)))
+
+    # Label matching of the screen automation on a screen showing every label image
+    label_screen, label_centers = synthetic_label_screen()
+    label_replay = capture.ReplayCapture(label_screen)
+    automation = {}
+
+    def use_label_screen():
+        capture.set_capture_backend(label_replay)
+        if 'sa' not in automation:
+            with contextlib.redirect_stdout(io.StringIO()):
+                automation['sa'] = ScreenAutomation(cache_path=None)
+
+    label_names = sorted(label_centers)
+
+    def input_field(i):
+        name = label_names[i]
+        return near(automation['sa'].input_field_from_label(name), label_centers[name])
+
+    def determine_coordinates(i):
+        # All labels are located in one screenshot, without the layout cache
+        coordinates = ScreenAutomation(cache_path=None).coordinates
+        names = ('save.png', 'pinlabels.png', 'numbers_more_button.png')
+        return sum(near(coordinates[name.split('.')[0]], label_centers[name]) for name in names), len(names)
+
+    stages.append(Stage('input_field_from_label', input_field, len(label_names), setup=use_label_screen))
+    stages.append(Stage('determine_coordinates', determine_coordinates, 1, setup=use_label_screen))
+
+    if args.stages:
+        unknown = set(args.stages) - {stage.name for stage in stages}
+        if unknown:
+            raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}.")
+        stages = [stage for stage in stages if stage.name in args.stages]
+    return stages
+
+
+def corpus_accuracy(corpus, used_numbers=None):
+    correct = sum(clean_text(text, used_numbers) == number for text, number in corpus)
+    return correct, len(corpus)
+
+
+def compare(results, baseline, tolerance, accuracy_tolerance):
+    """
+    Print the change of every stage against the baseline and return the stages that regressed.
+    """
+    regressions = []
+    print(f"{'stage':<28} {'p50 ms':>10} {'baseline':>10} {'change':>8} {'accuracy':>9} {'baseline':>9}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<28} {result['p50_ms']:>10.3f} {'-':>10}")
+            continue
+        change = result['p50_ms'] / reference['p50_ms'] - 1 if reference['p50_ms'] else 0.0
+        accuracy = result.get('accuracy')
+        reference_accuracy = reference.get('accuracy')
+        slower = change > tolerance
+        less_accurate = (accuracy is not None and reference_accuracy is not None
+                         and accuracy < reference_accuracy - accuracy_tolerance)
+        flag = '  SLOWER' if slower else ''
+        flag += '  LESS ACCURATE' if less_accurate else ''
+        print(f"{name:<28} {result['p50_ms']:>10.3f} {reference['p50_ms']:>10.3f} {change:>+8.0%} "
+              f"{format_accuracy(accuracy):>9} {format_accuracy(reference_accuracy):>9}{flag}")
+        if slower or less_accurate:
+            regressions.append(name)
+    return regressions
+
+
+def format_accuracy(accuracy):
+    return '-' if accuracy is None else f"{accuracy:.2%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', help="Only run these stages.")
+    parser.add_argument('--repeats', type=int, default=5, help="Number of timed passes over every stage.")
+    parser.add_argument('--corpus-size', type=int, default=20000, help="Number of reads in the clean_text corpus.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the corpus and the OCR jitter.")
+    parser.add_argument('--output', help="JSON file the results are written to.")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare with.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Relative p50 slowdown against the baseline that counts as a regression.")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.0,
+                        help="Drop of the accuracy against the baseline that counts as a regression.")
+    parser.add_argument('--username', default=None,
+                        help="Username used to locate the tesseract installation on Windows.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    set_tesseract_path(username=args.username)
+    try:
+        get_ocr_backend('auto')  # Loaded before timing, so no stage pays for it
+    except Exception as e:
+        print(f"No OCR backend available ({e!r}), the OCR stages will fail.")
+    results = {}
+    failed = {}
+    print(f"{'stage':<28} {'p50 ms':>10} {'p95 ms':>10} {'items/s':>12} {'peak KB':>10} {'accuracy':>9}")
+    for stage in build_stages(args):
+        try:
+            result = measure(stage, args.repeats)
+        except Exception as e:
+            failed[stage.name] = repr(e)
+            print(f"{stage.name:<28} FAILED: {e!r}")
+            continue
+        results[stage.name] = result
+        print(f"{stage.name:<28} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['throughput_per_s']:>12.1f} {result['peak_memory_kb']:>10.1f} "
+              f"{format_accuracy(result['accuracy']):>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'stages': results, 'failed': failed}, f,
+                      indent=2)
+        print(f"Results written to {args.output}.")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['stages']
+        print('-' * 40)
+        regressions = compare(results, baseline, args.tolerance, args.accuracy_tolerance)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+        else:
+            print("No regressions.")
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+    if regressions or failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
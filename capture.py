@@ -0,0 +1,330 @@
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageGrab
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def region_bbox(region):
+    """
+    Convert a region (left, top, width, height) to a bounding box (left, top, right, bottom).
+    """
+    left, top, width, height = (int(value) for value in region)
+    return left, top, left + width, top + height
+
+
+class ImageGrabCapture:
+    """
+    Screen capture through PIL.ImageGrab, which sets up a new capture context for every screenshot.
+    """
+    name = 'imagegrab'
+
+    def grab(self, region=None, grayscale: bool = False):
+        """
+        Capture the screen.
+
+        Parameters
+        ----------
+        region : tuple
+            The region (left, top, width, height) to capture, default: the primary monitor.
+        grayscale : bool
+            Whether to return the screenshot in grayscale (RGB otherwise).
+
+        Returns
+        -------
+        numpy.ndarray
+            The screenshot (uint8).
+        """
+        image = ImageGrab.grab(bbox=None if region is None else region_bbox(region))
+        frame = np.asarray(image.convert('L' if grayscale else 'RGB'))
+        return frame
+
+    def close(self):
+        pass
+
+
+class MssCapture:
+    """
+    Screen capture through mss, which keeps its capture context (device context and bitmap buffers on Windows) open
+    between screenshots instead of setting it up again for every screenshot.
+
+    mss is not thread safe, so every thread capturing the screen gets its own context.
+    """
+    name = 'mss'
+
+    def __init__(self):
+        import mss
+
+        self._mss = mss
+        self._local = threading.local()
+        self._contexts = []
+        self._lock = threading.Lock()
+        self._context()
+
+    def _context(self):
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._local.context = self._mss.mss()
+            with self._lock:
+                self._contexts.append(context)
+        return context
+
+    def grab(self, region=None, grayscale: bool = False):
+        """
+        Capture the screen.
+
+        Parameters
+        ----------
+        region : tuple
+            The region (left, top, width, height) to capture, default: the primary monitor.
+        grayscale : bool
+            Whether to return the screenshot in grayscale (RGB otherwise).
+
+        Returns
+        -------
+        numpy.ndarray
+            The screenshot (uint8).
+        """
+        context = self._context()
+        if region is None:
+            monitor = context.monitors[1]
+        else:
+            left, top, width, height = (int(value) for value in region)
+            monitor = {'left': left, 'top': top, 'width': width, 'height': height}
+        # The BGRA pixels are converted straight from the buffer of mss
+        bgra = np.asarray(context.grab(monitor))
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY if grayscale else cv2.COLOR_BGRA2RGB)
+
+    def close(self):
+        with self._lock:
+            for context in self._contexts:
+                context.close()
+            self._contexts.clear()
+
+
+class ReplayCapture:
+    """
+    Serves screenshots from image files instead of the screen, so the OCR and the screen automation can be run and
+    benchmarked without a display (e.g. on imgs/test_image_1.png).
+
+    The images take the place of the screen with their top-left corner at `origin`, areas of a region outside of the
+    image are black (like areas outside of all monitors). `next_frame` switches to the next image, e.g. to simulate
+    navigating to the next specimen.
+    """
+    name = 'replay'
+
+    def __init__(self, images, origin=(0, 0), loop: bool = True):
+        """
+        Parameters
+        ----------
+        images : str, numpy.ndarray or list
+            The image file(s) or RGB image array(s) served as screen.
+        origin : tuple
+            The screen coordinates (x, y) of the top-left corner of the images.
+        loop : bool
+            Whether `next_frame` starts over after the last image.
+        """
+        if isinstance(images, (str, np.ndarray, Image.Image)):
+            images = [images]
+        self.frames = [self._load(image) for image in images]
+        if not self.frames:
+            raise ValueError("ReplayCapture needs at least one image.")
+        self.origin = tuple(origin)
+        self.loop = loop
+        self.index = 0
+        self._gray = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(image):
+        if isinstance(image, str):
+            image = Image.open(image)
+        if isinstance(image, Image.Image):
+            image = image.convert('RGB')
+        return np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+
+    @property
+    def size(self):
+        """
+        The size (width, height) of the current image.
+        """
+        height, width = self.frames[self.index].shape[:2]
+        return width, height
+
+    def next_frame(self) -> bool:
+        """
+        Switch to the next image.
+
+        Returns
+        -------
+        bool
+            Whether there was a next image (always True with `loop`).
+        """
+        with self._lock:
+            if self.index + 1 < len(self.frames):
+                self.index += 1
+            elif self.loop:
+                self.index = 0
+            else:
+                return False
+            return True
+
+    def grab(self, region=None, grayscale: bool = False):
+        """
+        Cut a region out of the current image.
+
+        Parameters
+        ----------
+        region : tuple
+            The region (left, top, width, height) in screen coordinates, default: the whole image.
+        grayscale : bool
+            Whether to return the screenshot in grayscale (RGB otherwise).
+
+        Returns
+        -------
+        numpy.ndarray
+            The screenshot (uint8, a new array).
+        """
+        with self._lock:
+            index = self.index
+            frame = self.frames[index]
+            if grayscale:
+                if index not in self._gray:
+                    self._gray[index] = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+                frame = self._gray[index]
+
+        if region is None:
+            return frame.copy()
+
+        left, top, right, bottom = region_bbox(region)
+        left, right = left - self.origin[0], right - self.origin[0]
+        top, bottom = top - self.origin[1], bottom - self.origin[1]
+        shot = np.zeros((bottom - top, right - left) + frame.shape[2:], dtype=np.uint8)
+
+        # Copy the part of the region that lies on the image
+        src_left, src_top = max(left, 0), max(top, 0)
+        src_right, src_bottom = min(right, frame.shape[1]), min(bottom, frame.shape[0])
+        if src_left < src_right and src_top < src_bottom:
+            shot[src_top - top:src_bottom - top, src_left - left:src_right - left] = \
+                frame[src_top:src_bottom, src_left:src_right]
+        return shot
+
+    def close(self):
+        pass
+
+
+CAPTURE_BACKENDS = {
+    ImageGrabCapture.name: ImageGrabCapture,
+    MssCapture.name: MssCapture,
+}
+
+
+def create_capture_backend(name: str = 'auto'):
+    """
+    Create a new live screen capture backend.
+
+    Parameters
+    ----------
+    name : str
+        'mss', 'imagegrab' or 'auto' (mss if it is installed, PIL.ImageGrab otherwise).
+
+    Returns
+    -------
+    MssCapture or ImageGrabCapture
+        The capture backend.
+    """
+    if name == 'auto':
+        try:
+            return MssCapture()
+        except ImportError:
+            return ImageGrabCapture()
+    if name in CAPTURE_BACKENDS:
+        return CAPTURE_BACKENDS[name]()
+    raise ValueError(f"Unknown capture backend {name}, choose from {['auto'] + list(CAPTURE_BACKENDS)}.")
+
+
+def get_capture_backend(verbose: bool = False):
+    """
+    Return the screen capture backend used by the OCR and the screen automation, creating the live backend ('auto')
+    on first use.
+
+    Parameters
+    ----------
+    verbose : bool
+        Whether to print which backend is used when it is created.
+
+    Returns
+    -------
+    MssCapture, ImageGrabCapture or ReplayCapture
+        The capture backend.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_capture_backend('auto')
+            if verbose:
+                print(f"Using screen capture backend: {_backend.name}")
+        return _backend
+
+
+def set_capture_backend(backend):
+    """
+    Replace the screen capture backend, e.g. by a ReplayCapture to run without a display.
+
+    Parameters
+    ----------
+    backend : str or object
+        A backend name (see `create_capture_backend`) or a backend with the method `grab(region, grayscale)`.
+
+    Returns
+    -------
+    object
+        The new capture backend.
+    """
+    global _backend
+    if isinstance(backend, str):
+        backend = create_capture_backend(backend)
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+    return backend
+
+
+def screen_size():
+    """
+    Determine the size of the screen served by the current capture backend.
+
+    Returns
+    -------
+    tuple
+        The size (width, height) of the replayed screen for a ReplayCapture, of the primary screen otherwise.
+    """
+    backend = _backend
+    if isinstance(backend, ReplayCapture):
+        width, height = backend.size
+        return backend.origin[0] + width, backend.origin[1] + height
+    import pyautogui
+    return pyautogui.size()
+
+
+def grab(region=None, grayscale: bool = False):
+    """
+    Capture the screen with the current capture backend.
+
+    Parameters
+    ----------
+    region : tuple
+        The region (left, top, width, height) to capture, default: the primary monitor.
+    grayscale : bool
+        Whether to return the screenshot in grayscale (RGB otherwise).
+
+    Returns
+    -------
+    numpy.ndarray
+        The screenshot (uint8).
+    """
+    return get_capture_backend().grab(region, grayscale)
@@ -0,0 +1,106 @@
+import threading
+
+import pyperclip
+
+from instrumentation import span
+
+
+class ClipboardSession:
+    """
+    Shares the clipboard between all fields written by one macro.
+
+    Writing a field through the clipboard used to save the operator's clipboard, copy the text, paste it and restore
+    the clipboard again, so every field took three slow round-trips to the operating system. Within a session (a
+    `with` block, sessions can be nested) the operator's clipboard is saved once when the outermost session starts and
+    restored once when it ends, and a text is only copied if it is not already on the clipboard. Outside of a session
+    every `paste_text` call opens its own session, which gives the old behaviour.
+
+    The lock of the session is held for the whole `with` block, so two macros started by hotkeys at the same time do
+    not overwrite each other's clipboard.
+    """
+
+    def __init__(self, backend=pyperclip):
+        """
+        Parameters
+        ----------
+        backend : object
+            The clipboard with the methods `copy(text)` and `paste()` (default: pyperclip).
+        """
+        self.backend = backend
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._saved = None
+        self._current = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            with span('clipboard.save'):
+                self._saved = self.backend.paste()
+            self._current = self._saved
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._depth -= 1
+            if self._depth == 0 and self._current != self._saved:
+                with span('clipboard.restore'):
+                    self.backend.copy(self._saved)
+        finally:
+            if self._depth == 0:
+                self._saved = self._current = None
+            self._lock.release()
+
+    def copy(self, text):
+        """
+        Put a text on the clipboard, unless it is already there.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+        """
+        text = str(text)
+        with self:
+            if text != self._current:
+                with span('clipboard.copy'):
+                    self.backend.copy(text)
+                self._current = text
+
+    def paste_text(self, text, paste):
+        """
+        Put a text on the clipboard and paste it.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+        paste : callable
+            Pastes the clipboard into the focused field (e.g. presses ctrl+v). The clipboard is only restored after
+            it returned.
+        """
+        with self:
+            self.copy(text)
+            paste()
+
+    def put(self, text):
+        """
+        Put a text on the operator's clipboard, where it stays (e.g. a number read in the background).
+
+        The text waits until a session of another thread has ended, so it neither replaces the text a macro is about to
+        paste nor is overwritten when the macro restores the clipboard. Within a session of the same thread, it is put
+        on the clipboard when the session ends.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+        """
+        text = str(text)
+        with self._lock:
+            if self._depth == 0:
+                with span('clipboard.copy'):
+                    self.backend.copy(text)
+            else:
+                self._saved = text
@@ -0,0 +1,441 @@
+"""
+A stand-in for the Data Shot form, to run and time the shortcuts without Data Shot.
+
+The form shows the label images of imgs/ that ScreenAutomation locates (previous/next, save, images, pin labels,
+numbers & more, collection and the other fields) with an input field next to every label, and a pin label image area
+showing the tag of the current specimen. It reacts to clicks, key presses and ctrl+v like Data Shot: clicking a field
+focuses it, typed and pasted text appears in it, Enter confirms it, next/previous show another specimen and 'pin
+labels' zooms in on its tag. Every reaction appears only after a configurable delay, and every input and every saved
+record is written to a JSON lines log.
+
+The form is drawn into one full-screen window, so it needs a display. On Linux without a monitor, run it in a virtual
+display (apt install xvfb xclip), e.g. through the end-to-end benchmark:
+
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmarks.bench_end_to_end
+
+or on its own:
+
+    python datashot_simulator.py --log datashot_log.jsonl --navigate-delay 0.5
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+# Size of the simulated screen, the form fills all of it
+SCREEN_SIZE = (1920, 1080)
+
+# Colours of the form (RGB)
+BACKGROUND = (240, 240, 240)
+FIELD_BACKGROUND = (255, 255, 255)
+FIELD_BORDER = (160, 160, 160)
+FOCUS_BORDER = (0, 120, 215)
+PRESSED_BORDER = (60, 60, 60)
+TEXT_COLOR = (0, 0, 0)
+PINLABELS_BACKGROUND = (90, 80, 70)
+SPECIMEN_BACKGROUND = (200, 190, 170)
+
+# Default delays (in seconds) between an input and the visible reaction of the form
+DEFAULT_DELAYS = {
+    'click': 0.03,  # Focusing a field or pressing a button
+    'key': 0.02,  # Showing a typed character, a pasted text or a confirmed field
+    'navigate': 0.4,  # Showing the next or previous specimen
+    'zoom': 0.2,  # Zooming in on the pin labels
+    'save': 0.25,  # Saving the record
+}
+
+# Seconds a pressed button is shown pressed
+PRESSED_DURATION = 0.15
+
+# Label images and the centers (x, y) they are drawn at, the toolbar on top and the form fields on the right
+LABEL_CENTERS = {
+    'previous.png': (60, 40),
+    'next.png': (110, 40),
+    'save.png': (170, 40),
+    'images.png': (260, 40),
+    'pinlabels.png': (400, 40),
+    'workflow_status.png': (1200, 120),
+    'collection.png': (1200, 170),
+    'date_verbatim.png': (1200, 220),
+    'date_interpreted.png': (1200, 270),
+    'associated_taxon.png': (1200, 320),
+    'elevation_from.png': (1200, 370),
+    'elevation_to.png': (1200, 420),
+    'notes.png': (1200, 490),
+    'sex.png': (1200, 560),
+    'collector.png': (1200, 660),
+    'numbers_more_button.png': (1100, 800),
+}
+
+# Buttons: coordinate name and label image (the button is the label itself)
+BUTTONS = {
+    'previous': 'previous.png',
+    'next': 'next.png',
+    'save': 'save.png',
+    'pinlabels': 'pinlabels.png',
+    'collector_add': 'collector.png',
+    'numbers_more_button': 'numbers_more_button.png',
+}
+
+# Input fields: coordinate name, label image and offset of the field from the label center (as in
+# ScreenAutomation._determine_coordinates), in the order Tab moves through them
+FIELDS = [
+    ('workflow_status', 'workflow_status.png', (100, 0)),
+    ('collection', 'collection.png', (100, 0)),
+    ('date_verbatim', 'date_verbatim.png', (100, 0)),
+    ('date_interpreted', 'date_interpreted.png', (100, 0)),
+    ('taxon', 'associated_taxon.png', (100, 0)),
+    ('elevation_from', 'elevation_from.png', (100, 0)),
+    ('elevation_to', 'elevation_to.png', (100, 0)),
+    ('specimen_notes', 'notes.png', (100, 0)),
+    ('sex', 'sex.png', (100, 0)),
+    ('collector_name', 'collector.png', (65, 0)),
+    ('numbers_more_number', 'numbers_more_button.png', (100, 0)),
+    ('numbers_more_type', 'numbers_more_button.png', (600, 0)),
+]
+
+# Extent of an input field around its coordinates: left, top, right, bottom
+FIELD_EXTENT = (-30, -12, 190, 12)
+
+# Region (left, top, right, bottom) of the pin label image and the position of the tag center in it, the tag is where
+# paul_born_ocr.py expects it (250, 260 from the 'pin labels' button, see ocr.PINLABELS_IMAGE_REGION)
+PINLABELS_AREA = (50, 60, 1050, 1060)
+TAG_CENTER = (650, 300)
+
+# Specimen images shown by default: the tag images bundled in imgs/tags/
+DEFAULT_SPECIMENS = os.path.join('imgs', 'tags', 'tag*.PNG')
+
+# Key names of pyautogui and the matching key names of Tk
+KEY_NAMES = {'Return': 'enter', 'KP_Enter': 'enter', 'Tab': 'tab', 'BackSpace': 'backspace', 'Escape': 'esc'}
+
+
+class DataShotForm:
+    """
+    The state and drawing of the simulated Data Shot form, independent of the window that shows it.
+
+    Inputs (`click`, `key`, `type_text`, `paste`) are logged right away and take effect after their delay, in the
+    order they were received, when `update` is called. The form is drawn by `render`.
+    """
+
+    def __init__(self, specimens, delays=None, jitter: float = 0.0, log_path: str = None, seed: int = 0):
+        """
+        Parameters
+        ----------
+        specimens : list
+            The image files shown as tag of the specimens, one after the other.
+        delays : dict
+            The delays of the reactions, see DEFAULT_DELAYS (missing entries use the defaults).
+        jitter : float
+            The maximum share by which every delay is randomly lengthened (e.g. 0.5 for up to 50%).
+        log_path : str
+            The JSON lines file the inputs and the saved records are appended to.
+        seed : int
+            The seed of the delay jitter.
+        """
+        if not specimens:
+            raise ValueError("The simulator needs at least one specimen image.")
+        self.specimens = list(specimens)
+        self.delays = dict(DEFAULT_DELAYS, **(delays or {}))
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.log_path = log_path
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+        self.records = []
+
+        self.labels = {name: Image.open(label_path(name)).convert('RGB') for name in LABEL_CENTERS}
+        self.tags = [Image.open(path).convert('RGB') for path in self.specimens]
+        self.buttons = {name: label_box(image_name, self.labels[image_name]) for name, image_name in BUTTONS.items()}
+        self.fields = {}
+        for name, image_name, (x_offset, y_offset) in FIELDS:
+            x, y = LABEL_CENTERS[image_name]
+            self.fields[name] = (x + x_offset + FIELD_EXTENT[0], y + y_offset + FIELD_EXTENT[1],
+                                 x + x_offset + FIELD_EXTENT[2], y + y_offset + FIELD_EXTENT[3])
+
+        self.index = 0
+        self.zoomed = True
+        self.values = [{} for _ in self.specimens]
+        self.number_rows = [0 for _ in self.specimens]
+        self.focus = None
+        self.pressed = {}  # Button name: time until which it is shown pressed
+        self.changed = True
+        self._pending = []  # (due time, effect, arguments), in the order of the inputs
+        self._lock = threading.Lock()
+        self._base = self._render_base()
+
+    # Inputs
+
+    def click(self, x, y):
+        self._receive('click', {'x': x, 'y': y}, self._apply_click, x, y)
+
+    def key(self, key):
+        self._receive('key', {'key': key}, self._apply_key, key)
+
+    def type_text(self, text):
+        self._receive('text', {'text': text}, self._apply_text, text)
+
+    def paste(self, text):
+        self._receive('paste', {'text': text}, self._apply_text, text)
+
+    def _receive(self, kind, details, effect, *args):
+        now = time.time()
+        self._write(dict(event=kind, time=round(now, 4), **details))
+        delay = self._delay(kind, *args)
+        with self._lock:
+            # Like the event queue of a real window, a fast reaction does not overtake a slow one
+            due = max([now + delay] + [pending[0] for pending in self._pending])
+            self._pending.append((due, effect, args))
+
+    def _delay(self, kind, *args):
+        name = 'key' if kind in ('text', 'paste') else kind
+        if kind == 'click':
+            button = self.button_at(*args)
+            name = {'next': 'navigate', 'previous': 'navigate', 'pinlabels': 'zoom', 'save': 'save'}.get(button,
+                                                                                                        'click')
+        return self.delays[name] * (1 + self.rng.uniform(0, self.jitter))
+
+    def update(self, now=None) -> bool:
+        """
+        Apply the reactions that are due.
+
+        Returns
+        -------
+        bool
+            Whether the form has to be drawn again.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [pending for pending in self._pending if pending[0] <= now]
+            self._pending = self._pending[len(due):]
+        for _, effect, args in due:
+            effect(*args)
+        for name, until in list(self.pressed.items()):
+            if until <= now:
+                del self.pressed[name]
+                self.changed = True
+        changed, self.changed = self.changed, False
+        return changed
+
+    def idle(self) -> bool:
+        """
+        Return whether all inputs have taken effect.
+        """
+        with self._lock:
+            return not self._pending
+
+    # Reactions
+
+    def button_at(self, x, y):
+        return next((name for name, box in self.buttons.items() if inside(box, x, y)), None)
+
+    def field_at(self, x, y):
+        return next((name for name, box in self.fields.items() if inside(box, x, y)), None)
+
+    def _apply_click(self, x, y):
+        self.changed = True
+        button = self.button_at(x, y)
+        if button is not None:
+            self.pressed[button] = time.time() + PRESSED_DURATION
+            self.focus = None
+            if button in ('next', 'previous'):
+                self.index = (self.index + (1 if button == 'next' else -1)) % len(self.specimens)
+                self.zoomed = False
+            elif button == 'pinlabels':
+                self.zoomed = True
+            elif button == 'numbers_more_button':
+                # A new row of numbers & more, its fields are empty
+                self.number_rows[self.index] += 1
+                self.values[self.index].pop('numbers_more_number', None)
+                self.values[self.index].pop('numbers_more_type', None)
+            elif button == 'save':
+                self._save()
+            return
+        self.focus = self.field_at(x, y)
+
+    def _apply_key(self, key):
+        if self.focus is None:
+            return
+        self.changed = True
+        values = self.values[self.index]
+        if key == 'enter':
+            self.focus = None
+        elif key == 'tab':
+            names = [name for name, _, _ in FIELDS]
+            self.focus = names[(names.index(self.focus) + 1) % len(names)]
+        elif key == 'backspace':
+            values[self.focus] = values.get(self.focus, '')[:-1]
+
+    def _apply_text(self, text):
+        if self.focus is None:
+            return
+        self.changed = True
+        values = self.values[self.index]
+        values[self.focus] = values.get(self.focus, '') + text
+
+    def _save(self):
+        record = {
+            'event': 'save',
+            'time': round(time.time(), 4),
+            'specimen': self.index,
+            'image': os.path.basename(self.specimens[self.index]),
+            'number_rows': self.number_rows[self.index],
+            'values': dict(self.values[self.index]),
+        }
+        self.records.append(record)
+        self._write(record)
+
+    def _write(self, entry):
+        if self._log is not None:
+            self._log.write(json.dumps(entry) + '\n')
+            self._log.flush()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # Drawing
+
+    def _render_base(self):
+        screen = Image.new('RGB', SCREEN_SIZE, BACKGROUND)
+        for name, image in self.labels.items():
+            screen.paste(image, label_box(name, image)[:2])
+        return screen
+
+    def render(self) -> Image.Image:
+        """
+        Draw the form in its current state.
+
+        Returns
+        -------
+        PIL.Image.Image
+            The screen (RGB, SCREEN_SIZE).
+        """
+        screen = self._base.copy()
+        draw = ImageDraw.Draw(screen)
+
+        # The pin label image: the tag of the current specimen, or the whole specimen before zooming in
+        if self.zoomed:
+            draw.rectangle(PINLABELS_AREA, fill=PINLABELS_BACKGROUND)
+            tag = self.tags[self.index]
+            screen.paste(tag, (TAG_CENTER[0] - tag.width // 2, TAG_CENTER[1] - tag.height // 2))
+        else:
+            draw.rectangle(PINLABELS_AREA, fill=SPECIMEN_BACKGROUND)
+            draw.text((PINLABELS_AREA[0] + 20, PINLABELS_AREA[1] + 20), f"Specimen {self.index + 1}", fill=TEXT_COLOR)
+
+        for name, box in self.buttons.items():
+            if name in self.pressed:
+                draw.rectangle((box[0] - 4, box[1] - 4, box[2] + 3, box[3] + 3), outline=PRESSED_BORDER, width=2)
+
+        values = self.values[self.index]
+        for name, box in self.fields.items():
+            border = FOCUS_BORDER if name == self.focus else FIELD_BORDER
+            draw.rectangle(box, fill=FIELD_BACKGROUND, outline=border, width=2 if name == self.focus else 1)
+            text = values.get(name, '')
+            if text:
+                draw.text((box[0] + 5, box[1] + 6), text, fill=TEXT_COLOR)
+        return screen
+
+
+def label_path(image_name):
+    # The label images are looked up ignoring the case of their file names, as in utils.template_path
+    matches = [path for path in glob.glob(os.path.join('imgs', '*'))
+               if os.path.basename(path).lower() == image_name.lower()]
+    if not matches:
+        raise FileNotFoundError(f"Label image {image_name} not found in imgs/.")
+    return matches[0]
+
+
+def label_box(image_name, image):
+    x, y = LABEL_CENTERS[image_name]
+    left, top = x - image.width // 2, y - image.height // 2
+    return left, top, left + image.width, top + image.height
+
+
+def inside(box, x, y) -> bool:
+    return box[0] <= x < box[2] and box[1] <= y < box[3]
+
+
+def run_window(form, ready_message: str = "Simulator ready."):
+    """
+    Show the form in a full-screen window and feed the mouse clicks and key presses of the window to it.
+
+    Parameters
+    ----------
+    form : DataShotForm
+        The form.
+    ready_message : str
+        Printed (and flushed) once the form is shown, e.g. for a harness waiting for the simulator.
+    """
+    import tkinter as tk
+
+    from PIL import ImageTk
+
+    root = tk.Tk()
+    root.overrideredirect(True)
+    root.geometry(f"{SCREEN_SIZE[0]}x{SCREEN_SIZE[1]}+0+0")
+    photo = ImageTk.PhotoImage(form.render())
+    canvas = tk.Label(root, image=photo, borderwidth=0)
+    canvas.pack()
+
+    def on_click(event):
+        form.click(event.x_root, event.y_root)
+
+    def on_key(event):
+        if event.state & 0x4:  # Control
+            if event.keysym.lower() == 'v':
+                try:
+                    form.paste(root.clipboard_get())
+                except tk.TclError:
+                    form.paste('')
+            return
+        if event.keysym in KEY_NAMES:
+            form.key(KEY_NAMES[event.keysym])
+        elif event.char and event.char.isprintable():
+            form.type_text(event.char)
+
+    def refresh():
+        if form.update():
+            photo.paste(form.render())
+        root.after(5, refresh)
+
+    root.bind('<Button-1>', on_click)
+    root.bind('<KeyPress>', on_key)
+    root.focus_force()
+    root.after(5, refresh)
+    root.update()
+    print(ready_message, flush=True)
+    try:
+        root.mainloop()
+    finally:
+        form.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('specimens', nargs='*', help=f"Images shown as tags (default: {DEFAULT_SPECIMENS}).")
+    parser.add_argument('--log', default='datashot_log.jsonl', help="JSON lines file of the inputs and records.")
+    for name, delay in DEFAULT_DELAYS.items():
+        parser.add_argument(f'--{name}-delay', type=float, default=delay,
+                            help=f"Seconds until the form reacts to a {name} (default: {delay}).")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum random lengthening of every delay.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the delay jitter.")
+    args = parser.parse_args()
+
+    specimens = args.specimens or sorted(glob.glob(DEFAULT_SPECIMENS))
+    delays = {name: getattr(args, f'{name}_delay') for name in DEFAULT_DELAYS}
+    form = DataShotForm(specimens, delays, args.jitter, args.log, args.seed)
+    try:
+        run_window(form)
+    except Exception as e:
+        print(f"Cannot show the simulator ({e!r}), is a display (e.g. xvfb-run) available?")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import threading
+
+import cv2
+import numpy as np
+
+from utils import DIGITS_FOLDER, TAGS_FOLDER, get_template_bank
+
+# Matches of a digit template scoring below this are not considered as glyphs at all
+MIN_GLYPH_SCORE = 0.5
+
+# Fraction of the narrower of two glyphs they may overlap horizontally and still both be kept
+MAX_GLYPH_OVERLAP = 0.3
+
+# Maximum vertical distance of a digit from the strongest digit, as fraction of the template height
+MAX_BASELINE_SHIFT = 0.3
+
+# Range of the vertical distance of the separator from the strongest digit, as fraction of the template height
+SEPARATOR_SHIFT_RANGE = (-0.15, 0.6)
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+class DigitTemplateReader:
+    """
+    Reads printed numbers by matching the glyph templates in imgs/tags/digits (digit0..9) against an image.
+
+    Every glyph template is matched over the whole image at once (no OCR process is involved). The strongest
+    non-overlapping matches on the row of the best match are the glyphs of the number, read from left to right.
+    The thousands separator has its own template (imgs/tags/comma.PNG), otherwise it is matched as a weak '1'.
+    The confidence of a read is the score of its weakest digit.
+    """
+
+    def __init__(self, folder: str = DIGITS_FOLDER, separator_folder: str = TAGS_FOLDER):
+        """
+        Parameters
+        ----------
+        folder : str
+            The folder containing the digit templates digit0..digit9.
+        separator_folder : str
+            The folder containing the template of the thousands separator comma.PNG.
+        """
+        bank = get_template_bank()
+        self.templates = {str(digit): bank.get(f'digit{digit}.PNG', grayscale=True, folder=folder)
+                          for digit in range(10)}
+        self.templates[','] = bank.get('comma.PNG', grayscale=True, folder=separator_folder)
+
+    @staticmethod
+    def _to_gray(image):
+        image = np.asarray(image)
+        if image.ndim == 3:
+            image = cv2.cvtColor(np.ascontiguousarray(image[:, :, :3]), cv2.COLOR_RGB2GRAY)
+        return image
+
+    def _candidates(self, gray):
+        """
+        Find all local maxima of the glyph template matches scoring at least MIN_GLYPH_SCORE.
+
+        Returns
+        -------
+        list
+            Tuples (score, left, top, width, height, glyph) of the candidate glyphs.
+        """
+        candidates = []
+        for glyph, template in self.templates.items():
+            height, width = template.shape
+            if gray.shape[0] < height or gray.shape[1] < width:
+                continue
+
+            result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+
+            # A local maximum is the highest score within half a glyph around it
+            kernel = np.ones((max(1, height // 2), max(1, width // 2)), np.uint8)
+            peaks = (result >= cv2.dilate(result, kernel)) & (result >= MIN_GLYPH_SCORE)
+            for top, left in zip(*np.nonzero(peaks)):
+                candidates.append((float(result[top, left]), int(left), int(top), width, height, glyph))
+        return candidates
+
+    def read(self, image):
+        """
+        Read the number in an image.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image (RGB or grayscale) containing the number.
+
+        Returns
+        -------
+        tuple
+            The digits read from left to right (str) and the confidence of the read (0 if nothing was found).
+        """
+        gray = self._to_gray(image)
+        candidates = sorted(self._candidates(gray), reverse=True)
+        if not candidates:
+            return '', 0.0
+
+        # The strongest digit defines the row the number is printed on (the separator reaches below it)
+        _, _, row_top, _, row_height, _ = next(
+            (candidate for candidate in candidates if candidate[5].isdigit()), candidates[0])
+
+        glyphs = []
+        for score, left, top, width, height, glyph in candidates:
+            shift = (top - row_top) / row_height
+            if glyph.isdigit() and abs(shift) > MAX_BASELINE_SHIFT:
+                continue
+            if not glyph.isdigit() and not SEPARATOR_SHIFT_RANGE[0] <= shift <= SEPARATOR_SHIFT_RANGE[1]:
+                continue
+            overlaps = any(
+                min(left + width, other_left + other_width) - max(left, other_left)
+                > MAX_GLYPH_OVERLAP * min(width, other_width)
+                for _, other_left, _, other_width, _, _ in glyphs
+            )
+            if not overlaps:
+                glyphs.append((score, left, top, width, height, glyph))
+
+        digits = sorted((left, score, width, glyph) for score, left, _, width, _, glyph in glyphs if glyph.isdigit())
+        if not digits:
+            return '', 0.0
+        text = ''.join(glyph for _, _, _, glyph in digits)
+        confidence = min(score for _, score, _, _ in digits)
+
+        # A glyph at the border of the image may belong to a number that is cut off
+        if digits[0][0] <= 0 or digits[-1][0] + digits[-1][2] >= gray.shape[1]:
+            confidence = 0.0
+
+        return text, confidence
+
+
+def get_digit_reader() -> DigitTemplateReader:
+    """
+    Return the shared digit template reader, creating it on first use.
+
+    Returns
+    -------
+    DigitTemplateReader
+        The digit reader.
+    """
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = DigitTemplateReader()
+        return _reader
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+
+import instrumentation
+
+# Kinds of hotkey jobs:
+#   JOB_OCR: reads the screen, a newer OCR request replaces a waiting one and a navigation cancels it
+#   JOB_NAVIGATION: shows another specimen, which makes every OCR of the current one out of date
+#   JOB_MACRO: clicks and types in Data Shot
+JOB_OCR = 'ocr'
+JOB_NAVIGATION = 'navigation'
+JOB_MACRO = 'macro'
+JOB_KINDS = (JOB_OCR, JOB_NAVIGATION, JOB_MACRO)
+
+# Maximum number of jobs waiting to run, further hotkey presses are ignored until the worker caught up
+MAX_PENDING_JOBS = 8
+
+
+class Job:
+    """
+    A hotkey action waiting in or run by a HotkeyDispatcher.
+    """
+
+    def __init__(self, dispatcher, kind, function, args, kwargs, generation):
+        self.dispatcher = dispatcher
+        self.kind = kind
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.generation = generation
+        self.submitted = time.perf_counter()
+
+    def __repr__(self):
+        return f"Job({self.kind}, {getattr(self.function, '__name__', self.function)})"
+
+    def cancelled(self) -> bool:
+        """
+        Return whether a navigation made the job out of date since it was submitted (only OCR jobs are cancelled).
+        """
+        return self.kind == JOB_OCR and self.generation != self.dispatcher.generation
+
+
+class HotkeyDispatcher:
+    """
+    Runs the actions of hotkeys and mouse clicks one after the other on a worker thread.
+
+    The handlers of the `keyboard` and `mouse` packages are called on their input hook thread, so an action that
+    reads the screen or clicks through Data Shot for seconds blocks all further input events, and a second press runs
+    it again at the same time. The handlers returned by `handler` only put a job into the queue of the dispatcher and
+    return immediately. The jobs run one at a time, so two macros never click into each other. A new OCR request
+    replaces an OCR request that is still waiting, and a navigation drops the waiting OCR requests and marks a running
+    one as cancelled: the OCR function receives the callable `cancelled` and should not copy its result once it
+    returns True.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_JOBS, verbose: bool = False):
+        """
+        Parameters
+        ----------
+        max_pending : int
+            The maximum number of jobs waiting to run.
+        verbose : bool
+            Whether to print dropped and replaced jobs.
+        """
+        self.max_pending = max_pending
+        self.verbose = verbose
+        self.generation = 0
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='hotkey-dispatcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, kind, function, *args, **kwargs):
+        """
+        Queue an action.
+
+        Parameters
+        ----------
+        kind : str
+            JOB_OCR, JOB_NAVIGATION or JOB_MACRO.
+        function : callable
+            The action. The function of an OCR job is called with the additional keyword argument `cancelled`.
+        *args, **kwargs
+            The arguments of the action.
+
+        Returns
+        -------
+        Job or None
+            The queued job, None if the queue is full.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}', use one of: {', '.join(JOB_KINDS)}.")
+
+        with self._condition:
+            if self._closed:
+                return None
+            if kind == JOB_NAVIGATION:
+                self.generation += 1
+            if kind in (JOB_OCR, JOB_NAVIGATION):
+                # A newer OCR request or another specimen makes the waiting OCR requests obsolete
+                obsolete = [job for job in self._pending if job.kind == JOB_OCR]
+                for job in obsolete:
+                    self._pending.remove(job)
+                if self.verbose and obsolete:
+                    print(f"Dropped {len(obsolete)} waiting OCR request(s).")
+            if len(self._pending) >= self.max_pending:
+                print(f"Too many waiting actions, ignoring {getattr(function, '__name__', function)}.")
+                return None
+
+            job = Job(self, kind, function, args, kwargs, self.generation)
+            self._pending.append(job)
+            self._condition.notify()
+        return job
+
+    def handler(self, kind, function, *args, **kwargs):
+        """
+        Create a handler for keyboard.add_hotkey or mouse.on_click that queues the action instead of running it.
+
+        Parameters
+        ----------
+        kind : str
+            JOB_OCR, JOB_NAVIGATION or JOB_MACRO.
+        function : callable
+            The action.
+        *args, **kwargs
+            The arguments of the action. Callable keyword arguments ending in `_at_press` are called when the key is
+            pressed and passed on without the suffix, e.g. `position_at_press=pyautogui.position`.
+
+        Returns
+        -------
+        callable
+            The handler.
+        """
+        def queue_action(*_):
+            job_kwargs = {}
+            for name, value in kwargs.items():
+                if name.endswith('_at_press'):
+                    job_kwargs[name[:-len('_at_press')]] = value()
+                else:
+                    job_kwargs[name] = value
+            self.submit(kind, function, *args, **job_kwargs)
+        return queue_action
+
+    def pending(self) -> int:
+        """
+        Return the number of jobs waiting to run.
+        """
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                job = self._pending.popleft()
+
+            if job.cancelled():
+                continue
+            if instrumentation.is_enabled():
+                # Time from the hotkey press to the start of its action
+                instrumentation.record(f'dispatcher.{job.kind}.queued', time.perf_counter() - job.submitted)
+            kwargs = dict(job.kwargs, cancelled=job.cancelled) if job.kind == JOB_OCR else job.kwargs
+            # An exception would otherwise end the worker and with it all hotkeys
+            try:
+                job.function(*job.args, **kwargs)
+            except Exception as e:
+                print(f"{job!r} failed: {e!r}")
+
+    def close(self):
+        """
+        Stop the worker after the running job, waiting jobs are dropped.
+        """
+        with self._condition:
+            self._closed = True
+            self.generation += 1
+            self._pending.clear()
+            self._condition.notify_all()
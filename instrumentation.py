@@ -0,0 +1,261 @@
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Number of most recent durations per span name the percentiles are computed from
+ROLLING_WINDOW = 1000
+
+# Number of trace records buffered before they are written to the trace file
+TRACE_BUFFER_SIZE = 100
+
+_enabled = False
+_histograms = {}
+_lock = threading.Lock()
+_trace = None
+
+# Returned by `span` while the instrumentation is disabled, so a disabled span costs one check and no allocation
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Histogram:
+    """
+    Rolling statistics of the durations of one span: the count and maximum of all durations, the percentiles of
+    the last ROLLING_WINDOW durations.
+    """
+
+    def __init__(self, window: int = ROLLING_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, q) -> float:
+        """
+        Return the q-th percentile (0-100) of the recent durations in seconds (0 if there are none).
+        """
+        if not self.recent:
+            return 0.0
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+
+class TraceFile:
+    """
+    Appends one JSON line per finished span (name, thread, start time and duration) to a file, to analyse a session
+    afterwards.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, name, start, seconds):
+        record = {'name': name, 'thread': threading.current_thread().name, 'start': round(start, 6),
+                  'ms': round(seconds * 1000, 3)}
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= TRACE_BUFFER_SIZE:
+                self._flush()
+
+    def _flush(self):
+        self._file.writelines(json.dumps(record) + '\n' for record in self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+
+def enable(trace_path: str = None):
+    """
+    Start recording the durations of all spans.
+
+    Parameters
+    ----------
+    trace_path : str
+        Optional JSON lines file every finished span is appended to.
+    """
+    global _enabled, _trace
+    with _lock:
+        if trace_path is not None and (_trace is None or _trace.path != trace_path):
+            if _trace is not None:
+                _trace.close()
+            _trace = TraceFile(trace_path)
+        _enabled = True
+
+
+def disable():
+    """
+    Stop recording spans and close the trace file (the statistics recorded so far are kept).
+    """
+    global _enabled, _trace
+    with _lock:
+        _enabled = False
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def record(name, seconds, start=None):
+    """
+    Add a duration to the statistics of a span.
+
+    Parameters
+    ----------
+    name : str
+        The name of the span.
+    seconds : float
+        The duration.
+    start : float
+        The start time (time.time()) written to the trace file (default: now minus the duration).
+    """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds)
+        trace = _trace
+    if trace is not None:
+        trace.write(name, time.time() - seconds if start is None else start, seconds)
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self.start)
+
+
+def span(name):
+    """
+    Time a block of code as a named span, e.g. `with span('perform_ocr.capture'): ...`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the span, stages of an operation are named '<operation>.<stage>'.
+
+    Returns
+    -------
+    context manager
+        The span (a shared no-op context while the instrumentation is disabled).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a span.
+
+    Parameters
+    ----------
+    name : str
+        The name of the span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def stats() -> dict:
+    """
+    Return the statistics of all spans.
+
+    Returns
+    -------
+    dict
+        The count, p50, p95 and maximum (in seconds) of every span name.
+    """
+    with _lock:
+        return {name: {'count': histogram.count, 'p50': histogram.percentile(50), 'p95': histogram.percentile(95),
+                       'max': histogram.max}
+                for name, histogram in sorted(_histograms.items())}
+
+
+def summary() -> str:
+    """
+    Format the statistics of all spans as a table (count, p50, p95 and maximum in milliseconds).
+    """
+    rows = stats()
+    if not rows:
+        return "No spans recorded."
+    width = max(len(name) for name in rows)
+    lines = [f"{'span':<{width}} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for name, row in rows.items():
+        lines.append(f"{name:<{width}} {row['count']:>7} {row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} "
+                     f"{row['max'] * 1000:>9.1f}")
+    return '\n'.join(lines)
+
+
+def print_summary():
+    print('-' * 40)
+    print(summary())
+
+
+def reset():
+    """
+    Forget the statistics of all spans.
+    """
+    with _lock:
+        _histograms.clear()
+
+
+def start_periodic_summary(interval: float):
+    """
+    Print the summary every `interval` seconds on a background thread.
+
+    Returns
+    -------
+    threading.Event
+        Set it to stop printing.
+    """
+    stop = threading.Event()
+
+    def print_periodically():
+        while not stop.wait(interval):
+            print_summary()
+
+    threading.Thread(target=print_periodically, name='instrumentation-summary', daemon=True).start()
+    return stop
+
+
+# Enable the instrumentation from the environment, e.g. PAULBORN_TRACE=trace.jsonl to also write a trace file
+if os.environ.get('PAULBORN_STATS') or os.environ.get('PAULBORN_TRACE'):
+    enable(os.environ.get('PAULBORN_TRACE') or None)
@@ -0,0 +1,248 @@
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from used_numbers import MAX_COLLECTION_NUMBER
+
+# Sources of an entered collection number
+SOURCE_OCR = 'ocr'
+SOURCE_MANUAL = 'manual'
+SOURCES = (SOURCE_OCR, SOURCE_MANUAL)
+
+# Record layout: timestamp (float64), crop hash (uint64), collection number (uint32), source (uint8), padding
+RECORD = struct.Struct('<dQIB3x')
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('crop_hash', '<u8'), ('number', '<u4'), ('source', 'u1'),
+                         ('padding', 'V3')])
+
+# Number of records and seconds after which appended records are synced to the disk
+SYNC_EVERY = 10
+SYNC_INTERVAL = 5.0
+
+_journal = None
+_journal_lock = threading.Lock()
+
+JournalRecord = namedtuple('JournalRecord', ['position', 'number', 'timestamp', 'source', 'crop_hash'])
+
+
+class Journal:
+    """
+    Append-only journal of every collection number entered in Data Shot.
+
+    The journal is a file of fixed-size records (see RECORD), so a record is found by its position alone and a record
+    cut off by a crash is detected and dropped when the journal is opened. Records are written to the file immediately,
+    so they survive a crash of the script, but only synced to the disk every SYNC_EVERY records or SYNC_INTERVAL
+    seconds.
+
+    Next to the journal, a memory-mapped index stores for every collection number the position of its last record.
+    Its first entry is the number of records it covers, if it does not match the journal or an entry points past the
+    end of the journal (records lost before they were synced), it is rebuilt.
+    """
+
+    def __init__(self, path: str = 'journal.bin', index_path: str = None, sync_every: int = SYNC_EVERY,
+                 sync_interval: float = SYNC_INTERVAL):
+        """
+        Parameters
+        ----------
+        path : str
+            The journal file.
+        index_path : str
+            The index file (default: the journal file with the extension .idx).
+        sync_every : int
+            The number of appended records after which the journal is synced to the disk.
+        sync_interval : float
+            The seconds after which appended records are synced to the disk at the latest (checked on every append).
+        """
+        self.path = path
+        self.index_path = index_path or os.path.splitext(path)[0] + '.idx'
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self._file = open(path, 'a+b')
+        self._count = self._drop_partial_record()
+        self._index = self._open_index()
+
+    def _drop_partial_record(self) -> int:
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD.size:
+            print(f"Dropping the incomplete last record of the journal {self.path}.")
+            self._file.truncate(size - size % RECORD.size)
+        return size // RECORD.size
+
+    def _open_index(self):
+        shape = (MAX_COLLECTION_NUMBER + 1,)
+        mode = 'r+' if os.path.exists(self.index_path) else 'w+'
+        try:
+            index = np.memmap(self.index_path, dtype='<u4', mode=mode, shape=shape)
+        except ValueError:  # Index file of a different size
+            index = np.memmap(self.index_path, dtype='<u4', mode='w+', shape=shape)
+
+        if index[0] != self._count or index[1:].max(initial=0) > self._count:
+            index[:] = 0
+            records = self.records()
+            # Position + 1 of the last record of every number, 0 if the number was not entered
+            np.maximum.at(index, records['number'].astype(np.intp), np.arange(1, len(records) + 1, dtype='<u4'))
+            index[0] = self._count
+            index.flush()
+        return index
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, number) -> bool:
+        return 1 <= number <= MAX_COLLECTION_NUMBER and 0 < self._index[number] <= self._count
+
+    def numbers(self) -> list:
+        """
+        List the collection numbers entered at least once.
+
+        Returns
+        -------
+        list
+            The collection numbers, in ascending order.
+        """
+        with self._lock:
+            entered = (self._index > 0) & (self._index <= self._count)
+            entered[0] = False  # The first entry is the number of records
+            return np.flatnonzero(entered).tolist()
+
+    def records(self):
+        """
+        Read all records of the journal.
+
+        Returns
+        -------
+        numpy.ndarray
+            The records as structured array (see RECORD_DTYPE).
+        """
+        with self._lock:
+            self._file.flush()
+            return np.fromfile(self.path, dtype=RECORD_DTYPE, count=self._count)
+
+    def record(self, position) -> JournalRecord:
+        """
+        Read the record at a position of the journal.
+
+        Parameters
+        ----------
+        position : int
+            The position of the record (negative positions count from the end).
+
+        Returns
+        -------
+        JournalRecord
+            The record.
+        """
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError(f"The journal has no record {position}.")
+        with self._lock:
+            # Appending always writes at the end of the file, wherever reading left the position
+            self._file.flush()
+            self._file.seek(position * RECORD.size)
+            timestamp, crop_hash, number, source = RECORD.unpack(self._file.read(RECORD.size))
+        return JournalRecord(position, number, timestamp, SOURCES[source], crop_hash)
+
+    def last(self):
+        """
+        Return the last record of the journal, None if it is empty.
+        """
+        return self.record(-1) if self._count else None
+
+    def find(self, number):
+        """
+        Return the last record of a collection number, None if it was not entered.
+
+        Parameters
+        ----------
+        number : int
+            The collection number.
+        """
+        if number not in self:
+            return None
+        return self.record(int(self._index[number]) - 1)
+
+    def append(self, number, source=SOURCE_OCR, crop_hash=0, timestamp=None) -> JournalRecord:
+        """
+        Record an entered collection number.
+
+        Parameters
+        ----------
+        number : int
+            The collection number.
+        source : str
+            Where the number came from, SOURCE_OCR or SOURCE_MANUAL.
+        crop_hash : int
+            The perceptual hash of the tag the number was read from (0 if unknown).
+        timestamp : float
+            The time of the entry (default: now).
+
+        Returns
+        -------
+        JournalRecord
+            The new record.
+        """
+        if not 1 <= number <= MAX_COLLECTION_NUMBER:
+            raise ValueError(f"Collection number {number} is not between 1 and {MAX_COLLECTION_NUMBER}.")
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            self._file.write(RECORD.pack(timestamp, crop_hash or 0, number, SOURCES.index(source)))
+            self._file.flush()  # Only the fsync is batched, a crash of the script must not lose the record
+            position = self._count
+            self._count += 1
+            self._index[number] = position + 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+        return JournalRecord(position, number, timestamp, source, crop_hash or 0)
+
+    def _sync(self):
+        # The journal is synced before the index claims to cover its records
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._index[0] = self._count
+        self._index.flush()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """
+        Sync all appended records to the disk.
+        """
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+
+def get_journal(path: str = 'journal.bin') -> Journal:
+    """
+    Return the shared journal, opening it on first use.
+
+    Parameters
+    ----------
+    path : str
+        The journal file (only used when the journal is opened).
+
+    Returns
+    -------
+    Journal
+        The journal.
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = Journal(path)
+        return _journal
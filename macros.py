@@ -0,0 +1,254 @@
+import re
+import time
+from collections import namedtuple
+
+import instrumentation
+from utils import QUIET_ACTION_TIMEOUT, region_around
+
+# Maximum number of Tab presses used to move to the next field instead of clicking it
+MAX_TAB_STEPS = 5
+
+# Steps of a macro and their arguments (optional arguments in brackets):
+#   ('click', target[, clicks])      click a button or field (coordinate name or (x, y))
+#   ('paste', field, text[, clicks]) click a field and paste a text into it through the clipboard
+#   ('type', field, text)            click a field and type a text key by key (e.g. numbers)
+#   ('key', key)                     press a key or a combination such as 'ctrl+a'
+#   ('wait', image_names[, timeout]) wait until all label images are shown (e.g. a dialog has opened)
+#   ('move', target)                 move the mouse without clicking
+# Texts may contain {placeholders} that are filled in by the keyword arguments of CompiledMacro.run, other braces are
+# kept as they are.
+STEP_KINDS = ('click', 'paste', 'type', 'key', 'wait', 'move')
+
+# A {placeholder} in the text of a step (not in double braces such as {{name}})
+PLACEHOLDER = re.compile(r'(?<!\{)\{([A-Za-z_]\w*)\}(?!\})')
+
+# The § hotkey of paul_born_ocr.py (also run by benchmarks/bench_end_to_end.py): enter the collection number as
+# number & more of the type "Collection Number", set the collection, then save
+PAUL_BORN_COLLECTION = "Born-Moser, Paul (1859-1928)"
+PAUL_BORN_STEPS = [
+    ('click', 'numbers_more_button'), ('type', 'numbers_more_number', '{number}'),
+    ('paste', 'numbers_more_type', "Collection Number"), ('key', 'enter'),
+    ('paste', 'collection', PAUL_BORN_COLLECTION), ('key', 'enter'),
+    ('click', 'save'),
+]
+
+# An event of the compiled plan: the action is performed at once and, if region is set, followed by a wait until the
+# region changed (AT_MOUSE: the region around the mouse when the event is performed) for at most timeout seconds
+# (None: the action timeout of the screen automation)
+AT_MOUSE = 'mouse'
+MacroEvent = namedtuple('MacroEvent', ['label', 'kind', 'args', 'kwargs', 'region', 'timeout'], defaults=[None])
+
+# The time one step of a macro took
+StepTiming = namedtuple('StepTiming', ['label', 'seconds'])
+
+
+class CompiledMacro:
+    """
+    A macro compiled into a flat plan of input events with all coordinates and watched regions resolved.
+
+    Compiling checks every step once (unknown coordinate names fail before anything is clicked), so running the plan
+    only performs the events: clicks and key presses without pyautogui's fixed pause, each followed by a wait until
+    Data Shot reacted (see ScreenAutomation.act). If a `tab_order` is given, a field that follows the previously
+    filled field in this order is reached by pressing Tab instead of moving the mouse to it. The whole macro runs in
+    one clipboard session, and the time of every step is kept in `timings`.
+    """
+
+    def __init__(self, screen_automation, events, name=None):
+        """
+        Parameters
+        ----------
+        screen_automation : ScreenAutomation
+            The screen automation the macro was compiled for.
+        events : list
+            The MacroEvent plan, see `compile_macro`.
+        name : str
+            The name printed with the timings.
+        """
+        self.screen_automation = screen_automation
+        self.events = events
+        self.name = name or 'macro'
+        self.timings = []
+
+        # The placeholders of every step with a text, checked before the macro clicks anything
+        self.placeholders = {}
+        for event in events:
+            if event.kind in ('copy', 'typewrite'):
+                for placeholder in PLACEHOLDER.findall(event.args[0]):
+                    self.placeholders.setdefault(placeholder, event.label)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __repr__(self):
+        return f"CompiledMacro({self.name!r}, {len(self.events)} events)"
+
+    def run(self, verbose=None, **values):
+        """
+        Perform the macro.
+
+        Parameters
+        ----------
+        verbose : bool
+            Whether to print the time of every step (default: the verbose setting of the screen automation).
+        **values
+            The values of the {placeholders} in the texts of the macro, a missing value raises a ValueError before
+            anything is clicked.
+
+        Returns
+        -------
+        list
+            The StepTiming of every event.
+        """
+        sa = self.screen_automation
+        if verbose is None:
+            verbose = sa.verbose
+
+        missing = [placeholder for placeholder in self.placeholders if placeholder not in values]
+        if missing:
+            raise ValueError(f"Macro {self.name}: no value for " + ', '.join(
+                f"{{{placeholder}}} (step {self.placeholders[placeholder]!r})" for placeholder in missing) + '.')
+
+        timings = []
+        start = time.perf_counter()
+        with sa.clipboard:
+            for event in self.events:
+                step_start = time.perf_counter()
+                self._perform(event, values)
+                timings.append(StepTiming(event.label, time.perf_counter() - step_start))
+        self.timings = timings
+
+        if instrumentation.is_enabled():
+            instrumentation.record(f'macro.{self.name}', time.perf_counter() - start)
+            for timing in timings:
+                instrumentation.record(f'macro.{self.name}.{timing.label}', timing.seconds)
+
+        if verbose:
+            print(f"{self.name}: {len(timings)} steps in {(time.perf_counter() - start) * 1000:.0f} ms")
+            for timing in timings:
+                print(f"  {timing.label:<40} {timing.seconds * 1000:7.1f} ms")
+        return timings
+
+    def _perform(self, event, values):
+        sa = self.screen_automation
+        kind, args, kwargs = event.kind, event.args, event.kwargs
+
+        if kind == 'copy':
+            sa.clipboard.copy(fill_placeholders(args[0], values))
+        elif kind == 'wait':
+            labels = sa.wait_for_labels(*args)
+            missing = [name for name, center in labels.items() if center is None]
+            if missing:
+                print(f"{self.name}: {', '.join(missing)} not shown, continuing.")
+        else:
+            import pyautogui
+
+            if kind == 'typewrite':
+                args = (fill_placeholders(args[0], values),)
+            action = getattr(pyautogui, kind)
+            if event.region is None:
+                action(*args, _pause=False, **kwargs)
+                return
+            region = region_around(pyautogui.position()) if event.region == AT_MOUSE else event.region
+            # The hover highlight of a clicked button is not taken for a reaction
+            hover = args[0] if kind == 'click' else None
+            sa.act(region, action, *args, timeout=event.timeout, hover=hover, **kwargs)
+
+
+def fill_placeholders(text, values):
+    """
+    Replace the {placeholders} of a text by their values, leaving other braces as they are.
+    """
+    if '{' not in text:
+        return text
+    return PLACEHOLDER.sub(lambda match: str(values[match.group(1)]), text)
+
+
+def compile_macro(screen_automation, steps, name=None, tab_order=None) -> CompiledMacro:
+    """
+    Compile a declarative sequence of steps (see STEP_KINDS) into a plan of input events.
+
+    Parameters
+    ----------
+    screen_automation : ScreenAutomation
+        The screen automation whose coordinates the steps refer to.
+    steps : list
+        The steps, e.g. [('paste', 'collection', 'Weber, Paul (1881-1968)'), ('key', 'enter'), ('click', 'save')].
+    name : str
+        The name printed with the timings.
+    tab_order : list
+        Coordinate names of fields in the order Tab moves through them in Data Shot. Leave it empty unless you checked
+        the order, as a wrong order pastes into the wrong field.
+
+    Returns
+    -------
+    CompiledMacro
+        The compiled macro.
+    """
+    coordinates = screen_automation.coordinates
+    tab_order = list(tab_order or [])
+
+    def resolve(target):
+        if isinstance(target, str):
+            if target not in coordinates:
+                raise ValueError(f"Unknown coordinates '{target}' in macro {name or steps!r}, known are: "
+                                 f"{', '.join(sorted(coordinates))}.")
+            return tuple(coordinates[target])
+        return tuple(target)
+
+    def tab_steps(focus, field):
+        if focus in tab_order and field in tab_order:
+            steps = tab_order.index(field) - tab_order.index(focus)
+            if 0 < steps <= MAX_TAB_STEPS:
+                return steps
+        return 0
+
+    events = []
+    focus = None  # The field that has the keyboard focus, if known
+    focus_region = AT_MOUSE  # The region watched after a key press: around the last clicked or filled field
+    for step in steps:
+        kind, *args = step
+        if kind not in STEP_KINDS:
+            raise ValueError(f"Unknown macro step '{kind}', use one of: {', '.join(STEP_KINDS)}.")
+
+        if kind in ('paste', 'type'):
+            field, text = args[0], str(args[1])
+            clicks = args[2] if len(args) > 2 else 1
+            region = region_around(resolve(field))
+            tabs = tab_steps(focus, field)
+            if tabs:
+                # Tab presses are not awaited, the paste or typing below waits until the field changed
+                events.append(MacroEvent(f"tab to {field}", 'press', ('tab',), {'presses': tabs}, None))
+            else:
+                # Clicking into the field only moves the caret, which is not awaited for long
+                events.append(MacroEvent(f"click {field}", 'click', (resolve(field),), {'clicks': clicks}, region,
+                                         QUIET_ACTION_TIMEOUT))
+            if kind == 'paste':
+                events.append(MacroEvent(f"copy '{text}'", 'copy', (text,), {}, None))
+                events.append(MacroEvent(f"paste into {field}", 'hotkey', ('ctrl', 'v'), {}, region))
+            else:
+                events.append(MacroEvent(f"type '{text}' into {field}", 'typewrite', (text,), {}, region))
+            focus, focus_region = field, region
+        elif kind == 'click':
+            target = args[0]
+            clicks = args[1] if len(args) > 1 else 1
+            point = resolve(target)
+            focus_region = region_around(point)
+            region, timeout = screen_automation.reaction(target if isinstance(target, str) else point)
+            events.append(MacroEvent(f"click {target}", 'click', (point,), {'clicks': clicks}, region, timeout))
+            focus = target if isinstance(target, str) else None
+        elif kind == 'key':
+            keys = tuple(args[0].split('+'))
+            # Keys such as enter often change nothing around the field, they are not awaited for long
+            action = 'press' if len(keys) == 1 else 'hotkey'
+            events.append(MacroEvent(f"key {args[0]}", action, keys, {}, focus_region, QUIET_ACTION_TIMEOUT))
+            # Keys such as enter may move the focus elsewhere
+            focus = None
+        elif kind == 'wait':
+            events.append(MacroEvent(f"wait for {', '.join(args[0])}", 'wait', tuple(args), {}, None))
+        elif kind == 'move':
+            events.append(MacroEvent(f"move to {args[0]}", 'moveTo', (resolve(args[0]),), {}, None))
+
+    # Nothing in the macro waits for the reaction to its last event (e.g. save)
+    if events and events[-1].region is not None:
+        events[-1] = events[-1]._replace(timeout=QUIET_ACTION_TIMEOUT)
+    return CompiledMacro(screen_automation, events, name)
@@ -0,0 +1,881 @@
+import bisect
+import itertools
+import math
+import os
+import random
+import re
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+import pyperclip
+
+import capture
+from digit_reader import get_digit_reader
+from instrumentation import span, timed
+from ocr_backends import get_ocr_backend, get_ocr_pool
+from ocr_cache import get_ocr_cache, perceptual_hash, to_gray
+from preprocessing import Preprocessor
+from used_numbers import get_used_numbers
+from utils import DIGITS_FOLDER, get_template_bank, locate_best_centers, screenshot_cv2
+
+# Region (left, top, width, height) showing the pin label image, relative to the 'pinlabels' button in Data Shot
+PINLABELS_IMAGE_REGION = (-350, 20, 1000, 1000)
+
+# Height of the band between the samples of a tiled image and width of the margin left and right of them
+TILE_SEPARATOR_HEIGHT = 10
+TILE_MARGIN = 20
+
+# Minimum confidence of the digit template reader to accept its read without running Tesseract
+FAST_PATH_CONFIDENCE = 0.7
+
+# Number of digits of a collection number the digit template reader may return without running Tesseract
+FAST_PATH_DIGITS = (4, 5)
+
+# Probability the most likely result must reach to stop sampling in adaptive mode
+ADAPTIVE_CERTAINTY = 0.95
+
+# Upper bound of the confidence of a single vote in adaptive mode, so one vote never counts as certain
+MAX_VOTE_CONFIDENCE = 0.99
+
+# Digits Tesseract misreads every digit as on the Paul Born labels, the most frequent confusion first
+DIGIT_CONFUSIONS = {
+    '0': '86',
+    '1': '74',
+    '2': '74',
+    '3': '89',
+    '4': '12',
+    '5': '96',
+    '6': '58',
+    '7': '1',
+    '8': '360',
+    '9': '53',
+}
+
+# Maximum number of digits replaced in a candidate and maximum number of candidates generated from one read
+MAX_CONFUSED_DIGITS = 2
+MAX_CANDIDATES = 50
+
+# Result of the last OCR read and perceptual hash of the tag it was read from
+_last_read = (None, 0)
+
+
+def candidate_numbers(text, max_candidates=MAX_CANDIDATES):
+    """
+    Generate the collection numbers an OCR read may stand for, the most likely one first.
+
+    The first candidate is the result of `clean_text`. The others replace up to MAX_CONFUSED_DIGITS of its digits by
+    digits they are often confused with (DIGIT_CONFUSIONS), ranked by how frequent the confusions are.
+
+    Parameters
+    ----------
+    text : str
+        The text read by OCR.
+    max_candidates : int
+        The maximum number of candidates.
+
+    Returns
+    -------
+    list
+        The candidate collection numbers (int).
+    """
+    number = clean_text(text)
+    if number is None:
+        return []
+
+    digits = str(number)
+    ranked = []
+    for count in range(1, MAX_CONFUSED_DIGITS + 1):
+        for positions in itertools.combinations(range(len(digits)), count):
+            alternatives = [enumerate(DIGIT_CONFUSIONS[digits[position]]) for position in positions]
+            for replacements in itertools.product(*(list(alternative) for alternative in alternatives)):
+                candidate = list(digits)
+                for position, (_, digit) in zip(positions, replacements):
+                    candidate[position] = digit
+                if candidate[0] == '0':
+                    continue
+                cost = sum(rank + 1 for rank, _ in replacements)
+                ranked.append((cost, count, int(''.join(candidate))))
+
+    candidates = [number]
+    for _, _, candidate in sorted(ranked):
+        if len(candidates) >= max_candidates:
+            break
+        if 1 <= candidate <= 63000 and candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+@timed('clean_text')
+def clean_text(text, used_numbers=None):
+    """
+    Turn the text read by OCR into a collection number, fixing the typical misreads of the first digits.
+
+    Parameters
+    ----------
+    text : str
+        The text read by OCR.
+    used_numbers : UsedNumberIndex, optional
+        The collection numbers already entered. If given, a read of an entered number is taken as a misread and the
+        most likely candidate (see `candidate_numbers`) that was not entered yet is returned.
+
+    Returns
+    -------
+    int or None
+        The collection number, None if the text is not a valid collection number.
+    """
+    if used_numbers is not None:
+        return next((number for number in candidate_numbers(text) if number not in used_numbers), None)
+
+    # Step 1: Remove all non-numeric characters except for "("
+    cleaned_text = re.sub(r'[^0-9(]', '', text)
+
+    # Check if the cleaned text is not empty
+    if not cleaned_text:
+        return None  # Return None for invalid input
+
+    # Step 2: If the number contains 5 digits and starts with "(", convert "(" to "1"
+    if len(cleaned_text) == 5 and cleaned_text.startswith('('):
+        cleaned_text = '1' + cleaned_text[1:]
+
+    # Step 3: If the number contains 6 digits and starts with "1", remove the "1"
+    if len(cleaned_text) == 6:
+        cleaned_text = cleaned_text[1:]
+
+    # Step 4: If the number contains 5 digits and starts with "8", convert "8" to "3"
+    if len(cleaned_text) == 5 and cleaned_text.startswith('8'):
+        cleaned_text = '3' + cleaned_text[1:]
+
+    # Convert to integer and ensure it is within the range 1 to 63000
+    try:
+        number = int(cleaned_text)
+        if 1 <= number <= 63000:
+            return number
+        else:
+            return None  # Return None for out-of-range numbers
+    except ValueError:
+        return None  # Return None for conversion failures
+
+def capture_jitter_region(x, y, width, height, jitter_size):
+    """
+    Capture the bounding box covering every possible jittered sample around a position in a single grab.
+
+    Parameters
+    ----------
+    x : int
+        The x-coordinate of the center point.
+    y : int
+        The y-coordinate of the center point.
+    width : int
+        Width of a single sample.
+    height : int
+        Height of a single sample.
+    jitter_size : int
+        The jitter range around the position.
+
+    Returns
+    -------
+    tuple
+        The captured region as a numpy array and the screen coordinates (left, top) of its top-left corner.
+    """
+    region_left = x - jitter_size - (width // 2)
+    region_top = y - jitter_size - (height // 2)
+
+    region = capture.grab((region_left, region_top, width + 2 * jitter_size, height + 2 * jitter_size))
+    return region, (region_left, region_top)
+
+
+def crop_jitter_sample(region, region_origin, top_left_x, top_left_y, width, height):
+    """
+    Take a jittered sample out of a region captured with `capture_jitter_region` as a numpy view (no copy).
+
+    Parameters
+    ----------
+    region : numpy.ndarray
+        The captured region.
+    region_origin : tuple
+        The screen coordinates (left, top) of the top-left corner of the region.
+    top_left_x : int
+        The screen x-coordinate of the top-left corner of the sample.
+    top_left_y : int
+        The screen y-coordinate of the top-left corner of the sample.
+    width : int
+        Width of the sample.
+    height : int
+        Height of the sample.
+
+    Returns
+    -------
+    numpy.ndarray
+        A view of the region covering the sample.
+    """
+    left = int(top_left_x - region_origin[0])
+    top = int(top_left_y - region_origin[1])
+    return region[top:top + height, left:left + width]
+
+
+def jittered_samples(x, y, width, height, jitter_size, num_samples, single_grab=True, verbose=False, region=None):
+    """
+    Generate screenshots of jittered capture areas around a position.
+
+    Parameters
+    ----------
+    x : int
+        The x-coordinate of the center point.
+    y : int
+        The y-coordinate of the center point.
+    width : int
+        Width of the capture area.
+    height : int
+        Height of the capture area.
+    jitter_size : int
+        The jitter range around the position.
+    num_samples : int
+        Number of jittered samples to take.
+    single_grab : bool
+        Whether to capture the area covering all jitter offsets once and crop every sample from it.
+    verbose : bool
+        Whether to print debug information
+    region : tuple, optional
+        A region and its origin already captured with `capture_jitter_region` to crop the samples from
+        (only used with `single_grab`).
+
+    Yields
+    ------
+    numpy.ndarray
+        The screenshot of a jittered capture area.
+    """
+    if single_grab:
+        # Capture once, every jittered sample is a view of this region
+        if region is None:
+            region = capture_jitter_region(x, y, width, height, jitter_size)
+        region, region_origin = region
+
+    for _ in range(num_samples):  # Take the specified number of samples
+        jitter_x = random.randint(-jitter_size, jitter_size)
+        jitter_y = random.randint(-jitter_size, jitter_size)
+
+        # Define the capture area around the jittered position
+        top_left_x = x + jitter_x - (width // 2)
+        top_left_y = y + jitter_y - (height // 2)
+        bottom_right_x = top_left_x + width
+        bottom_right_y = top_left_y + height
+
+        if verbose:
+            print(f"Capturing area from {top_left_x, top_left_y} to {bottom_right_x, bottom_right_y}")
+
+        # Capture the screenshot of the specified area
+        if single_grab:
+            yield crop_jitter_sample(region, region_origin, top_left_x, top_left_y, width, height)
+        else:
+            yield capture.grab((top_left_x, top_left_y, width, height))
+
+
+def most_common_result(valid_results, copy=True):
+    """
+    Determine the most frequent valid OCR result, copy it to the clipboard and print it.
+
+    Parameters
+    ----------
+    valid_results : list
+        The valid (cleaned) OCR results.
+    copy : bool
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    int or None
+        The most frequent result, None if there are no valid results.
+    """
+    if valid_results:
+        result = max(set(valid_results), key=valid_results.count)
+        if copy:
+            with span('perform_ocr.clipboard'):
+                pyperclip.copy(str(result))  # Copy to clipboard
+        print('-' * 40)
+        print(result)
+        return result
+    else:
+        print("No valid OCR results found.")
+        return None
+
+
+@timed('perform_ocr')
+def perform_ocr(position=None, width=200, height=80, jitter_size=15, min_samples=None, num_samples=5, verbose = False,
+                single_grab=True, backend='auto', parallel=False, workers=None, tiled=False, fast_path=False,
+                cache=True, adaptive=False, certainty=ADAPTIVE_CERTAINTY, preprocess=None,
+                skip_used=False, copy=True):
+    """
+    Capture a screen area around the given position, apply OCR, and return the most common valid result.
+
+    Parameters
+    ----------
+    position : tuple, optional
+        The center point for capturing the screen (default: current mouse position).
+    width : int, optional
+        Width of the capture area.
+    height : int, optional
+        Height of the capture area.
+    jitter_size : int, optional
+        The jitter range around the position.
+    min_samples : int, optional
+        Minimum number of valid samples to consider.
+    num_samples : int, optional
+        Number of jittered samples to take.
+    verbose : bool, optional
+        Whether to print debug information
+    single_grab : bool, optional
+        Whether to capture the area covering all jitter offsets once and crop every sample from it,
+        instead of taking a separate screenshot for each sample.
+    backend : str or object, optional
+        The OCR backend, either a name accepted by `get_ocr_backend` or a backend instance.
+    parallel : bool, optional
+        Whether to OCR the samples concurrently on a worker pool (see `perform_ocr_parallel`).
+    workers : int, optional
+        Number of worker threads in parallel mode (default: number of cores).
+    tiled : bool, optional
+        Whether to stack all samples into one image and read them with a single OCR pass
+        (see `perform_ocr_tiled`), `min_samples` is ignored in this mode.
+    fast_path : bool, optional
+        Whether to first read the number with the digit template reader (see `digit_reader.py`) and only run
+        Tesseract if that read is not confident. Off by default, the confidence of correct and wrong reads is not
+        yet separated well enough on the few tags measured (see benchmarks/bench_digit_reader.py).
+    cache : bool, optional
+        Whether to return the result of an earlier read of the same tag from the shared OCR cache (see `ocr_cache.py`)
+        and to store new results in it.
+    adaptive : bool, optional
+        Whether to weight every read by its confidence and stop as soon as the most likely result reaches
+        `certainty` (see `perform_ocr_adaptive`), `num_samples` is the maximum number of samples in this mode and
+        `min_samples` is ignored.
+    certainty : float, optional
+        The probability the result must reach to stop sampling in adaptive mode.
+    preprocess : bool or callable, optional
+        How every sample is cleaned up before OCR, True for the default `preprocessing.Preprocessor`, a callable
+        taking and returning an image, or None to pass the screenshots unchanged.
+    skip_used : bool, optional
+        Whether to take reads of collection numbers that were already entered (see `used_numbers.py`) as misreads
+        and replace them with the most likely similar number that was not entered yet.
+    copy : bool, optional
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    str or None
+        Most common OCR result from the sampled screenshots.
+    """
+
+    if position is None:
+        import pyautogui
+
+        # Get the current cursor position
+        position = pyautogui.position()
+
+    x, y = position
+    if verbose:
+        print(f"Capturing around position: {x}, {y}")
+
+    if min_samples is None:
+        min_samples = num_samples
+
+    region = None
+    if cache or fast_path:
+        with span('perform_ocr.capture'):
+            region = capture_jitter_region(x, y, width, height, jitter_size)
+
+    if cache:
+        # A tag that was read before (e.g. after going back to a previous specimen) is not read again
+        with span('perform_ocr.cache'):
+            result = get_ocr_cache().get(region[0])
+        if result is not None:
+            if verbose:
+                print(f"Found in the OCR cache: {result}")
+            remember_read(result, region)
+            return most_common_result([result], copy)
+
+    result = read_region(x, y, width, height, jitter_size, min_samples, num_samples, verbose, single_grab, backend,
+                         parallel, workers, tiled, fast_path, region, adaptive, certainty, preprocess,
+                         get_used_numbers() if skip_used else None, copy)
+
+    if cache and result is not None:
+        get_ocr_cache().put(region[0], result)
+    remember_read(result, region)
+    return result
+
+
+def remember_read(result, region):
+    """
+    Remember the result of the last OCR read and the perceptual hash of the tag it was read from.
+
+    Parameters
+    ----------
+    result : int or None
+        The OCR result.
+    region : tuple or None
+        The region and its origin captured with `capture_jitter_region` (None if it was not captured).
+    """
+    global _last_read
+    _last_read = (result, perceptual_hash(to_gray(region[0])) if region is not None else 0)
+
+
+def last_read():
+    """
+    Return the result of the last OCR read and the perceptual hash of the tag it was read from.
+
+    Returns
+    -------
+    tuple
+        The result (None if nothing was read) and the hash (0 if the tag was not captured as a whole).
+    """
+    return _last_read
+
+
+def read_region(x, y, width, height, jitter_size, min_samples, num_samples, verbose, single_grab, backend, parallel,
+                workers, tiled, fast_path, region, adaptive=False, certainty=ADAPTIVE_CERTAINTY,
+                preprocess=None, used_numbers=None, copy=True):
+    """
+    Read the number around a position, see `perform_ocr` for the parameters.
+
+    Parameters
+    ----------
+    region : tuple or None
+        The region and its origin captured with `capture_jitter_region`, None to capture it here.
+    used_numbers : UsedNumberIndex or None
+        The collection numbers already entered, if reads of them are to be replaced (see `clean_text`).
+    copy : bool
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    int or None
+        Most common OCR result from the sampled screenshots.
+    """
+    if fast_path:
+        if region is None:
+            with span('perform_ocr.capture'):
+                region = capture_jitter_region(x, y, width, height, jitter_size)
+        with span('perform_ocr.fast_path'):
+            text, confidence = get_digit_reader().read(region[0])
+        if verbose:
+            print(f"Digit template reader: {text} (confidence {confidence:.2f})")
+
+        cleaned_text = clean_text(text, used_numbers)
+        if cleaned_text is not None and confidence >= FAST_PATH_CONFIDENCE and len(text) in FAST_PATH_DIGITS:
+            return most_common_result([cleaned_text], copy)
+
+    samples = jittered_samples(x, y, width, height, jitter_size, num_samples, single_grab, verbose, region)
+
+    if preprocess is True:
+        preprocess = Preprocessor()
+    if preprocess:
+        samples = map(preprocess, samples)
+
+    if parallel:
+        return perform_ocr_parallel(samples, min_samples, getattr(backend, 'name', backend), workers, used_numbers,
+                                    copy)
+
+    if isinstance(backend, str):
+        backend = get_ocr_backend(backend, verbose=verbose)
+
+    if tiled:
+        return perform_ocr_tiled(samples, backend, used_numbers, copy)
+
+    if adaptive:
+        return perform_ocr_adaptive(samples, backend, certainty, used_numbers, copy)
+
+    # List to store OCR results
+    ocr_results = []
+    valid_results = []
+
+    print('-' * 40)
+
+    for screenshot in samples:
+        # Perform OCR on the captured image
+        with span('perform_ocr.tesseract'):
+            text = backend.image_to_string(screenshot)
+
+        # Clean the text
+        cleaned_text = clean_text(text, used_numbers)
+
+        # Store the cleaned OCR result
+        ocr_results.append(cleaned_text)
+
+        if cleaned_text is not None:
+            valid_results.append(cleaned_text)
+
+        print(cleaned_text)
+        if valid_results and len(valid_results) >= min_samples and len(set(valid_results)) == 1:
+            break
+
+    # Determine the most frequent valid result
+    return most_common_result(valid_results, copy)
+
+
+def perform_ocr_parallel(samples, min_samples, backend='auto', workers=None, used_numbers=None, copy=True):
+    """
+    OCR screenshots concurrently on a worker pool and stop as soon as enough valid results agree.
+
+    All samples are submitted at once. As soon as `min_samples` valid results have the same value, the samples
+    that have not started yet are cancelled and the results of the running ones are ignored.
+
+    Parameters
+    ----------
+    samples : iterable
+        The screenshots to read.
+    min_samples : int
+        Number of agreeing valid results after which the remaining samples are cancelled.
+    backend : str, optional
+        The name of the OCR backend every worker uses.
+    workers : int, optional
+        Number of worker threads (default: number of cores).
+    used_numbers : UsedNumberIndex, optional
+        The collection numbers already entered, reads of them are replaced by the best unused candidate
+        (see `clean_text`).
+    copy : bool, optional
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    int or None
+        Most common OCR result from the sampled screenshots.
+    """
+    pool = get_ocr_pool(backend, workers)
+    futures = [pool.submit(screenshot) for screenshot in samples]
+
+    valid_results = []
+
+    print('-' * 40)
+
+    for future in as_completed(futures):
+        cleaned_text = clean_text(future.result(), used_numbers)
+        print(cleaned_text)
+
+        if cleaned_text is not None:
+            valid_results.append(cleaned_text)
+            if valid_results.count(cleaned_text) >= min_samples:
+                break
+
+    for future in futures:
+        future.cancel()
+
+    return most_common_result(valid_results, copy)
+
+
+def tile_samples(samples, separator_height=TILE_SEPARATOR_HEIGHT, margin=TILE_MARGIN):
+    """
+    Stack screenshots vertically into one image, separated by bands of their background color.
+
+    The bands are filled with the median color of the screenshots rather than white, so that Tesseract does not
+    see the borders between the tag paper and the bands as text.
+
+    Parameters
+    ----------
+    samples : iterable
+        The screenshots (PIL images or numpy arrays) to stack.
+    separator_height : int, optional
+        Height of the band between two screenshots.
+    margin : int, optional
+        Width of the band left and right of the screenshots.
+
+    Returns
+    -------
+    tuple
+        The tiled RGB image as numpy array and the (top, bottom) rows of every screenshot in it.
+    """
+    tiles = []
+    for sample in samples:
+        tile = np.asarray(sample)
+        if tile.ndim == 2:
+            tile = np.stack([tile] * 3, axis=-1)
+        tiles.append(tile[:, :, :3])
+
+    background = np.median(np.concatenate([tile.reshape(-1, 3) for tile in tiles]), axis=0).astype(np.uint8)
+
+    tiled_width = max(tile.shape[1] for tile in tiles) + 2 * margin
+    tiled_height = sum(tile.shape[0] for tile in tiles) + separator_height * (len(tiles) + 1)
+    tiled = np.empty((tiled_height, tiled_width, 3), dtype=np.uint8)
+    tiled[:] = background
+
+    tile_spans = []
+    top = separator_height
+    for tile in tiles:
+        tiled[top:top + tile.shape[0], margin:margin + tile.shape[1]] = tile
+        tile_spans.append((top, top + tile.shape[0]))
+        top += tile.shape[0] + separator_height
+
+    return tiled, tile_spans
+
+
+def split_tiled_words(words, tile_spans):
+    """
+    Assign the words recognised in a tiled image to the screenshots they belong to.
+
+    Parameters
+    ----------
+    words : list
+        Tuples (text, left, top, width, height, confidence) as returned by the `image_to_words` of a backend.
+    tile_spans : list
+        The (top, bottom) rows of every screenshot in the tiled image.
+
+    Returns
+    -------
+    list
+        The text of every screenshot, words ordered from left to right.
+    """
+    tile_tops = [top for top, _ in tile_spans]
+    tile_words = [[] for _ in tile_spans]
+
+    for text, left, top, width, height, _ in words:
+        # A word belongs to the last screenshot starting above its vertical center
+        index = bisect.bisect_right(tile_tops, top + height / 2) - 1
+        tile_words[max(index, 0)].append((left, text))
+
+    return [' '.join(text for _, text in sorted(tile)) for tile in tile_words]
+
+
+def perform_ocr_tiled(samples, backend, used_numbers=None, copy=True):
+    """
+    OCR all screenshots with a single pass over one tiled image and return the most common valid result.
+
+    Parameters
+    ----------
+    samples : iterable
+        The screenshots to read.
+    backend : object
+        The OCR backend.
+    used_numbers : UsedNumberIndex, optional
+        The collection numbers already entered, reads of them are replaced by the best unused candidate
+        (see `clean_text`).
+    copy : bool, optional
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    int or None
+        Most common OCR result from the sampled screenshots.
+    """
+    tiled, tile_spans = tile_samples(samples)
+    with span('perform_ocr.tesseract'):
+        words = backend.image_to_words(tiled)
+    texts = split_tiled_words(words, tile_spans)
+
+    valid_results = []
+
+    print('-' * 40)
+
+    for text in texts:
+        cleaned_text = clean_text(text, used_numbers)
+        print(cleaned_text)
+        if cleaned_text is not None:
+            valid_results.append(cleaned_text)
+
+    return most_common_result(valid_results, copy)
+
+
+def vote_confidence(symbols):
+    """
+    Determine the confidence of an OCR read from the confidences of its characters.
+
+    Parameters
+    ----------
+    symbols : list
+        Tuples (character, confidence) as returned by the `image_to_symbols` method of the OCR backends.
+
+    Returns
+    -------
+    float
+        The confidence of the weakest digit between 0 and 1 (0 if there is no digit).
+    """
+    confidences = [conf for character, conf in symbols if character.isdigit()]
+    return min(confidences) / 100 if confidences else 0.0
+
+
+def vote_posteriors(weights):
+    """
+    Turn the accumulated vote weights of the candidate results into the probability of every candidate.
+
+    Every candidate starts at weight 0, like the possibility that the right number was not read at all, so a single
+    vote with confidence c gives its result the probability c.
+
+    Parameters
+    ----------
+    weights : dict
+        The sum of the log-odds of the votes for every candidate result.
+
+    Returns
+    -------
+    dict
+        The probability of every candidate result.
+    """
+    top = max(weights.values(), default=0.0)
+    odds = {result: math.exp(weight - top) for result, weight in weights.items()}
+    total = sum(odds.values()) + math.exp(-top)
+    return {result: value / total for result, value in odds.items()}
+
+
+def perform_ocr_adaptive(samples, backend, certainty=ADAPTIVE_CERTAINTY, used_numbers=None, copy=True):
+    """
+    OCR the screenshots one by one until the most likely result reaches the given certainty.
+
+    Every valid read votes with the log-odds of its confidence (see `vote_confidence`), so a clear tag is done after
+    one sample and only hard tags use all samples. If the certainty is not reached, the candidates are reported as
+    ambiguous and the most likely one is returned.
+
+    Parameters
+    ----------
+    samples : iterable
+        The screenshots to read, their number is the maximum number of samples.
+    backend : object
+        The OCR backend.
+    certainty : float
+        The probability the result must reach to stop sampling.
+    used_numbers : UsedNumberIndex, optional
+        The collection numbers already entered, reads of them are replaced by the best unused candidate
+        (see `clean_text`).
+    copy : bool, optional
+        Whether to copy the result to the clipboard.
+
+    Returns
+    -------
+    int or None
+        The most likely OCR result.
+    """
+    posteriors = adaptive_posteriors(samples, backend, certainty, used_numbers)
+    if not posteriors:
+        return most_common_result([], copy)
+    return most_common_result([max(posteriors, key=posteriors.get)], copy)
+
+
+def adaptive_posteriors(samples, backend, certainty=ADAPTIVE_CERTAINTY, used_numbers=None):
+    """
+    Read the screenshots one by one until the most likely result reaches the given certainty, see
+    `perform_ocr_adaptive`.
+
+    Returns
+    -------
+    dict
+        The probability of every candidate result after the last sample (empty if no read was valid).
+    """
+    weights = {}
+    posteriors = {}
+
+    print('-' * 40)
+
+    for screenshot in samples:
+        with span('perform_ocr.tesseract'):
+            symbols = backend.image_to_symbols(screenshot)
+        cleaned_text = clean_text(''.join(character for character, _ in symbols), used_numbers)
+        confidence = vote_confidence(symbols)
+        print(f"{cleaned_text} (confidence {confidence:.2f})")
+
+        if cleaned_text is None:
+            continue
+
+        # A vote below 50% confidence is no evidence against its result, it only does not count
+        confidence = min(max(confidence, 0.5), MAX_VOTE_CONFIDENCE)
+        weights[cleaned_text] = weights.get(cleaned_text, 0.0) + math.log(confidence / (1 - confidence))
+        posteriors = vote_posteriors(weights)
+        if max(posteriors.values()) >= certainty:
+            break
+    else:
+        if posteriors:
+            candidates = ', '.join(f"{result} ({probability:.0%})" for result, probability
+                                   in sorted(posteriors.items(), key=lambda item: item[1], reverse=True))
+            print(f"Ambiguous OCR result, certainty {certainty:.0%} not reached: {candidates}")
+    return posteriors
+
+
+def pinlabels_region(pinlabels, screen_size=None):
+    """
+    Determine the screen region showing the pin label image, from the position of the 'pinlabels' button.
+
+    Parameters
+    ----------
+    pinlabels : tuple
+        The coordinates of the 'pinlabels' button (ScreenAutomation.coordinates['pinlabels']).
+    screen_size : tuple, optional
+        The size (width, height) of the screen the region is clipped to (default: see capture.screen_size).
+
+    Returns
+    -------
+    tuple
+        The region (left, top, width, height).
+    """
+    if screen_size is None:
+        screen_size = capture.screen_size()
+
+    left = max(0, int(pinlabels[0]) + PINLABELS_IMAGE_REGION[0])
+    top = max(0, int(pinlabels[1]) + PINLABELS_IMAGE_REGION[1])
+    width = min(PINLABELS_IMAGE_REGION[2], screen_size[0] - left)
+    height = min(PINLABELS_IMAGE_REGION[3], screen_size[1] - top)
+    return left, top, width, height
+
+
+def locate_and_average_centers(tags_folder=DIGITS_FOLDER, confidence=0.5, verbose=True, region=None, scale=0.5):
+    """
+    Locate the collection number tag on the screen from the positions of the digit templates found in it.
+
+    Parameters
+    ----------
+    tags_folder : str, optional
+        The folder containing the digit templates.
+    confidence : float, optional
+        The confidence threshold for matching the digit templates.
+    verbose : bool, optional
+        Whether to print debug information
+    region : tuple, optional
+        The screen region (left, top, width, height) to search (default: the whole screen), see `pinlabels_region`.
+    scale : float, optional
+        The scale of the coarse matching pass (1 to match in full resolution only).
+
+    Returns
+    -------
+    tuple or None
+        The center x-coordinate of the found digits and their average y-coordinate, None if no digit was found.
+    """
+    start = time.perf_counter()
+
+    # Get all images in the tags folder (preloaded by the template bank, the disk is not searched again)
+    bank = get_template_bank()
+    tag_images = bank.names(tags_folder)
+    if verbose:
+        print(tag_images)
+
+    # Capture the region once and match all digit templates against it in a single pass
+    frame = screenshot_cv2(region=region)
+    region_left, region_top = region[:2] if region is not None else (0, 0)
+    centers = locate_best_centers(
+        frame, {image_file: bank.get(image_file, folder=tags_folder) for image_file in tag_images}, confidence, scale)
+
+    # Collect the found centers in screen coordinates
+    found_centers = []
+    for image_file, center in centers.items():
+        image_path = os.path.join(tags_folder, image_file)
+        if center is not None:
+            found_centers.append((center[0] + region_left, center[1] + region_top))
+            if verbose:
+                print(f"Found {image_path} at: {found_centers[-1]}")
+        else:
+            if verbose:
+                print(f"{image_path} not found on the screen.")
+
+    if verbose:
+        print(f"Searched for the tag in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Calculate the average of the found centers if any
+    if found_centers:
+        # Convert to numpy array for easier manipulation
+        centers_array = np.array(found_centers)
+
+        # Calculate the center x-coordinate
+        min_x = np.min(centers_array[:, 0])
+        max_x = np.max(centers_array[:, 0])
+        center_x = (min_x + max_x) / 2
+
+        # Calculate the average y-coordinate
+        average_y = np.mean(centers_array[:, 1])
+
+        return center_x, average_y  # Return as a tuple
+    else:
+        if verbose:
+            print("No tags found.")
+        return None
@@ -0,0 +1,426 @@
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Tesseract OCR configuration
+TESSERACT_CONFIG = r'--oem 3 --psm 6 outputbase digits'
+
+# Characters allowed by the 'digits' config file shipped with Tesseract
+DIGITS_WHITELIST = '0123456789-.'
+
+# One warmed-up backend (and worker pool) per name, shared for the whole session
+_backends = {}
+_pools = {}
+_backends_lock = threading.Lock()
+
+# The tesseract executable set by `set_tesseract_cmd` (None: tesseract on the PATH)
+_tesseract_cmd = None
+
+
+def set_tesseract_cmd(path):
+    """
+    Set the tesseract executable run by pytesseract and next to which the in-process engine looks for its language
+    data. pytesseract (slow to import) is only imported once a PytesseractBackend is created.
+
+    Parameters
+    ----------
+    path : str
+        The path of tesseract.exe.
+    """
+    global _tesseract_cmd
+    _tesseract_cmd = path
+    if 'pytesseract' in sys.modules:
+        sys.modules['pytesseract'].pytesseract.tesseract_cmd = path
+
+
+def to_pil_image(image):
+    """
+    Convert a screenshot (PIL image or numpy array) to a PIL image.
+
+    Parameters
+    ----------
+    image : PIL.Image.Image or numpy.ndarray
+        The image to convert.
+
+    Returns
+    -------
+    PIL.Image.Image
+        The image as PIL image.
+    """
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(np.ascontiguousarray(image))
+    return image
+
+
+class PytesseractBackend:
+    """
+    OCR backend starting a new tesseract process for every image (the original behaviour).
+    """
+    name = 'pytesseract'
+
+    def __init__(self, config: str = TESSERACT_CONFIG):
+        """
+        Parameters
+        ----------
+        config : str
+            The tesseract command line configuration.
+        """
+        import pytesseract
+
+        if _tesseract_cmd is not None:
+            pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+        self._pytesseract = pytesseract
+        self.config = config
+
+    def image_to_string(self, image) -> str:
+        """
+        Apply OCR to an image.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        str
+            The recognised text.
+        """
+        return self._pytesseract.image_to_string(image, config=self.config)
+
+    def image_to_words(self, image) -> list:
+        """
+        Apply OCR to an image and return the recognised words with their bounding boxes.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        list
+            Tuples (text, left, top, width, height, confidence) of the recognised words.
+        """
+        data = self._pytesseract.image_to_data(image, config=self.config,
+                                               output_type=self._pytesseract.Output.DICT)
+        return [
+            (text, left, top, width, height, float(conf))
+            for text, left, top, width, height, conf
+            in zip(data['text'], data['left'], data['top'], data['width'], data['height'], data['conf'])
+            if text.strip()
+        ]
+
+    def image_to_symbols(self, image) -> list:
+        """
+        Apply OCR to an image and return the recognised characters with their confidences.
+
+        The tesseract command line only reports confidences per word, so every character gets the confidence of its
+        word.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        list
+            Tuples (character, confidence) of the recognised characters, the confidence is between 0 and 100.
+        """
+        return [
+            (character, conf) for text, _, _, _, _, conf in self.image_to_words(image) for character in text.strip()
+        ]
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """
+    OCR backend keeping one Tesseract engine loaded in-process through tesserocr.
+
+    The engine is configured once with the settings of TESSERACT_CONFIG (--oem 3 --psm 6 outputbase digits), so
+    no process is started, no temporary image is written and the language data is only loaded once.
+    """
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path: str = None, lang: str = 'eng'):
+        """
+        Parameters
+        ----------
+        tessdata_path : str
+            The tessdata directory (default: next to the tesseract executable set by set_tesseract_path).
+        lang : str
+            The language to load.
+        """
+        import tesserocr
+
+        if tessdata_path is None:
+            tessdata_path = default_tessdata_path()
+
+        kwargs = {'lang': lang, 'psm': tesserocr.PSM.SINGLE_BLOCK, 'oem': tesserocr.OEM.DEFAULT}
+        if tessdata_path is not None:
+            kwargs['path'] = tessdata_path
+        self._tesserocr = tesserocr
+        self._api = tesserocr.PyTessBaseAPI(**kwargs)
+        self._api.SetVariable('tessedit_char_whitelist', DIGITS_WHITELIST)
+
+        # The engine is not thread safe, the hotkey and mouse hooks run in different threads
+        self._lock = threading.Lock()
+
+        # Warm up the engine so the first real read does not pay the initialisation cost
+        self.image_to_string(Image.new('L', (64, 32), 255))
+
+    def image_to_string(self, image) -> str:
+        """
+        Apply OCR to an image.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        str
+            The recognised text.
+        """
+        with self._lock:
+            self._api.SetImage(to_pil_image(image))
+            return self._api.GetUTF8Text()
+
+    def image_to_words(self, image) -> list:
+        """
+        Apply OCR to an image and return the recognised words with their bounding boxes.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        list
+            Tuples (text, left, top, width, height, confidence) of the recognised words.
+        """
+        level = self._tesserocr.RIL.WORD
+        words = []
+        with self._lock:
+            self._api.SetImage(to_pil_image(image))
+            self._api.Recognize()
+            iterator = self._api.GetIterator()
+            if iterator is None:
+                return words
+            for word in self._tesserocr.iterate_level(iterator, level):
+                try:
+                    text = word.GetUTF8Text(level)
+                except RuntimeError:  # Empty word
+                    continue
+                if not text.strip():
+                    continue
+                left, top, right, bottom = word.BoundingBox(level)
+                words.append((text, left, top, right - left, bottom - top, word.Confidence(level)))
+        return words
+
+    def image_to_symbols(self, image) -> list:
+        """
+        Apply OCR to an image and return the recognised characters with their confidences.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        list
+            Tuples (character, confidence) of the recognised characters, the confidence is between 0 and 100.
+        """
+        level = self._tesserocr.RIL.SYMBOL
+        symbols = []
+        with self._lock:
+            self._api.SetImage(to_pil_image(image))
+            self._api.Recognize()
+            iterator = self._api.GetIterator()
+            if iterator is None:
+                return symbols
+            for symbol in self._tesserocr.iterate_level(iterator, level):
+                try:
+                    character = symbol.GetUTF8Text(level)
+                except RuntimeError:  # Empty symbol
+                    continue
+                if character.strip():
+                    symbols.append((character.strip(), symbol.Confidence(level)))
+        return symbols
+
+    def close(self):
+        with self._lock:
+            self._api.End()
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+
+def default_tessdata_path():
+    """
+    Determine the tessdata directory belonging to the tesseract executable set by `set_tesseract_cmd`.
+
+    Returns
+    -------
+    str or None
+        The tessdata directory, or None to let tesseract use its built-in default.
+    """
+    if 'TESSDATA_PREFIX' in os.environ:
+        return None
+
+    tessdata_path = os.path.join(os.path.dirname(_tesseract_cmd or 'tesseract'), 'tessdata')
+    if os.path.isdir(tessdata_path):
+        return tessdata_path
+    return None
+
+
+def create_ocr_backend(name: str = 'auto'):
+    """
+    Create a new OCR backend.
+
+    Parameters
+    ----------
+    name : str
+        'tesserocr', 'pytesseract' or 'auto' (tesserocr if it is installed, pytesseract otherwise).
+
+    Returns
+    -------
+    PytesseractBackend or TesserocrBackend
+        The OCR backend.
+    """
+    if name == 'auto':
+        try:
+            return TesserocrBackend()
+        except (ImportError, RuntimeError) as e:
+            print(f"In-process OCR engine not available ({e}), falling back to pytesseract.")
+            return PytesseractBackend()
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    raise ValueError(f"Unknown OCR backend {name}, choose from {['auto'] + list(BACKENDS)}.")
+
+
+def get_ocr_backend(name: str = 'auto', verbose: bool = False):
+    """
+    Return the shared OCR backend with the given name, creating and warming it up on first use.
+
+    Parameters
+    ----------
+    name : str
+        'tesserocr', 'pytesseract' or 'auto' (tesserocr if it is installed, pytesseract otherwise).
+    verbose : bool
+        Whether to print which backend is used.
+
+    Returns
+    -------
+    PytesseractBackend or TesserocrBackend
+        The OCR backend.
+    """
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_ocr_backend(name)
+            if verbose:
+                print(f"Using OCR backend: {_backends[name].name}")
+        return _backends[name]
+
+
+class OCRWorkerPool:
+    """
+    Thread pool reading several images concurrently, every worker thread owns its own OCR backend.
+
+    Both backends release the GIL while Tesseract runs (pytesseract waits for a subprocess, tesserocr releases it
+    during recognition), so threads are enough to keep all cores busy. The backends of all workers are created when
+    the pool is created, so the first parallel read does not wait for them. An engine must not be used by two threads
+    at once, so every worker thread takes one of them when it reads its first image and keeps it.
+
+    Tesseract also parallelises internally with OpenMP, which only oversubscribes the cores here. OpenMP reads
+    OMP_THREAD_LIMIT when tesserocr is first imported, so it has to be set to 1 before that (as `load_ocr` in
+    paul_born_ocr.py and `init_worker` in batch_ocr.py do).
+    """
+
+    def __init__(self, backend: str = 'auto', workers: int = None):
+        """
+        Parameters
+        ----------
+        backend : str
+            The name of the OCR backend every worker creates (see `create_ocr_backend`).
+        workers : int
+            The number of worker threads (default: number of cores).
+        """
+        self.workers = workers or os.cpu_count() or 1
+
+        # 'auto' is resolved once, so a fallback is reported once and all workers use the same backend
+        first = create_ocr_backend(backend)
+        self.backend_name = first.name
+        self._free_backends = queue.SimpleQueue()
+        self._free_backends.put(first)
+        for _ in range(self.workers - 1):
+            self._free_backends.put(create_ocr_backend(self.backend_name))
+
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+
+    def _backend(self):
+        backend = getattr(self._local, 'backend', None)
+        if backend is None:
+            # The executor never starts more threads than there are backends
+            backend = self._local.backend = self._free_backends.get_nowait()
+        return backend
+
+    def _image_to_string(self, image):
+        return self._backend().image_to_string(image)
+
+    def submit(self, image):
+        """
+        Schedule OCR of an image.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The image to read.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future resolving to the recognised text.
+        """
+        return self._executor.submit(self._image_to_string, image)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_ocr_pool(backend: str = 'auto', workers: int = None):
+    """
+    Return the shared OCR worker pool for the given backend and number of workers.
+
+    Parameters
+    ----------
+    backend : str
+        The name of the OCR backend (see `create_ocr_backend`).
+    workers : int
+        The number of worker threads (default: number of cores).
+
+    Returns
+    -------
+    OCRWorkerPool
+        The worker pool.
+    """
+    with _backends_lock:
+        key = (backend, workers)
+        if key not in _pools:
+            _pools[key] = OCRWorkerPool(backend, workers)
+        return _pools[key]
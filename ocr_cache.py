@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Number of captured regions (with their OCR result) kept in memory
+OCR_CACHE_SIZE = 256
+
+# Maximum number of differing bits between the perceptual hashes of two captures of the same tag
+MAX_HASH_DISTANCE = 24
+
+# Maximum shift (in pixels) between two captures of the same tag
+MAX_SHIFT = 8
+
+# Minimum correlation of two aligned captures to consider them the same tag (a changed digit scores about 0.85)
+MIN_MATCH_SCORE = 0.97
+
+# Seconds after the last new result until the cache file is written in the background
+SAVE_DELAY = 5.0
+
+# A tag read again within these seconds after its cached result was used is read with OCR again, so clicking a
+# misread tag a second time corrects it instead of returning the same wrong number
+RETRY_INTERVAL = 5.0
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def to_gray(image):
+    """
+    Convert a captured region (PIL image or RGB numpy array) to a grayscale numpy array.
+
+    Parameters
+    ----------
+    image : PIL.Image.Image or numpy.ndarray
+        The captured region.
+
+    Returns
+    -------
+    numpy.ndarray
+        The region in grayscale.
+    """
+    image = np.asarray(image)
+    if image.ndim == 3:
+        image = cv2.cvtColor(np.ascontiguousarray(image[:, :, :3]), cv2.COLOR_RGB2GRAY)
+    return image
+
+
+def perceptual_hash(gray, hash_size=8, dct_size=32) -> int:
+    """
+    Compute the perceptual hash (pHash) of a grayscale image.
+
+    The image is reduced to dct_size x dct_size pixels and every bit of the hash tells whether one of the
+    hash_size x hash_size lowest frequencies of its discrete cosine transform is above their median, so small
+    shifts and rendering differences only flip a few bits.
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        The grayscale image.
+    hash_size : int
+        The number of frequencies per dimension (the hash has hash_size ** 2 bits).
+    dct_size : int
+        The size the image is reduced to before the transform.
+
+    Returns
+    -------
+    int
+        The hash.
+    """
+    reduced = cv2.resize(gray, (dct_size, dct_size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    frequencies = cv2.dct(reduced)[:hash_size, :hash_size].flatten()
+    bits = frequencies > np.median(frequencies[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class OCRCache:
+    """
+    Least recently used cache of OCR results, keyed by the captured tag region.
+
+    A capture is looked up by the perceptual hash of the region, which tolerates small pixel shifts. As all Paul Born
+    labels look alike, every candidate with a close hash is confirmed by aligning both captures (up to MAX_SHIFT
+    pixels) and comparing them pixel by pixel, so a tag with a different number is never mistaken for a cached one.
+
+    New results are written to the cache file in a background thread, SAVE_DELAY seconds after the last one, and by
+    `close`, so storing a result does not wait for the file. A result used again within `retry_interval` seconds is
+    removed instead, as reading the same tag twice in a row usually means the first result was wrong.
+    """
+
+    def __init__(self, max_size: int = OCR_CACHE_SIZE, path: str = None, save_delay: float = SAVE_DELAY,
+                 retry_interval: float = RETRY_INTERVAL):
+        """
+        Parameters
+        ----------
+        max_size : int
+            The maximum number of cached results, the least recently used one is evicted first.
+        path : str
+            Optional file in which the cache is stored, so it survives a restart of the script.
+        save_delay : float
+            The seconds after the last new result until the cache file is written.
+        retry_interval : float
+            The seconds after a result was stored or returned within which the same tag is read with OCR again.
+        """
+        self.max_size = max_size
+        self.path = path
+        self.save_delay = save_delay
+        self.retry_interval = retry_interval
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        self._entries = OrderedDict()  # hash -> (grayscale region, result, time.monotonic() of its last use)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _same_tag(gray, cached_gray) -> bool:
+        if gray.shape != cached_gray.shape or min(gray.shape) <= 2 * MAX_SHIFT:
+            return False
+        center = gray[MAX_SHIFT:-MAX_SHIFT, MAX_SHIFT:-MAX_SHIFT]
+        _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(cached_gray, center, cv2.TM_CCOEFF_NORMED))
+        return score >= MIN_MATCH_SCORE
+
+    def get(self, image):
+        """
+        Look up the OCR result of a captured region.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The captured region.
+
+        Returns
+        -------
+        int or None
+            The cached result, None if the region was not read before or its result was used just before.
+        """
+        gray = to_gray(image)
+        image_hash = perceptual_hash(gray)
+
+        with self._lock:
+            distances = sorted(
+                (bin(image_hash ^ cached_hash).count('1'), cached_hash) for cached_hash in self._entries
+            )
+            for distance, cached_hash in distances:
+                if distance > MAX_HASH_DISTANCE:
+                    break
+                cached_gray, result, last_used = self._entries[cached_hash]
+                if self._same_tag(gray, cached_gray):
+                    now = time.monotonic()
+                    if now - last_used < self.retry_interval:
+                        # The tag is read again right after its result was used, most likely because it was wrong
+                        del self._entries[cached_hash]
+                        self.retries += 1
+                        self._changed()
+                        break
+                    self._entries[cached_hash] = (cached_gray, result, now)
+                    self._entries.move_to_end(cached_hash)
+                    self.hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def put(self, image, result):
+        """
+        Store the OCR result of a captured region.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The captured region.
+        result : int
+            The OCR result.
+        """
+        gray = np.array(to_gray(image))  # Copy, the region may be a view of a larger capture
+        image_hash = perceptual_hash(gray)
+
+        with self._lock:
+            self._entries[image_hash] = (gray, result, time.monotonic())
+            self._entries.move_to_end(image_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._changed()
+
+    def _changed(self):
+        # Every change postpones the save, a series of reads is written once (called with the lock held)
+        if self.path is None:
+            return
+        self._dirty = True
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        self._save_timer = threading.Timer(self.save_delay, self.save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def save(self):
+        """
+        Write the cached regions and results to the cache file (in order of use), if they changed.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = list(self._entries.items())
+                self._dirty = False
+            arrays = {}
+            for i, (image_hash, (gray, result, _)) in enumerate(entries):
+                arrays[f'hash{i}'] = np.array(image_hash, dtype=np.uint64)
+                arrays[f'region{i}'] = gray
+                arrays[f'result{i}'] = np.array(result)
+            # Written next to the cache file first, so a crash while writing leaves the last complete cache
+            with open(self.path + '.tmp', 'wb') as f:
+                np.savez(f, size=np.array(len(entries)), **arrays)
+            os.replace(self.path + '.tmp', self.path)
+
+    def close(self):
+        """
+        Write the pending results to the cache file.
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        if self.path is not None:
+            self.save()
+
+    def load(self):
+        """
+        Read the cached regions and results from the cache file.
+        """
+        with self._lock, np.load(self.path) as packed:
+            for i in range(int(packed['size'])):
+                # The results of an earlier run were not used in this one
+                self._entries[int(packed[f'hash{i}'])] = (packed[f'region{i}'], int(packed[f'result{i}']),
+                                                          float('-inf'))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def summary(self) -> str:
+        return (f"OCR cache: {len(self)} tag(s), {self.hits} hit(s), {self.misses} miss(es), "
+                f"{self.retries} tag(s) read again")
+
+
+def get_ocr_cache(path: str = None) -> OCRCache:
+    """
+    Return the shared OCR result cache, creating it on first use.
+
+    Parameters
+    ----------
+    path : str
+        Optional file in which the cache is stored (only used when the cache is created).
+
+    Returns
+    -------
+    OCRCache
+        The OCR result cache.
+    """
+    global _ocr_cache
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache(path=path)
+        return _ocr_cache
@@ -1,192 +1,145 @@
-import random
-import re
-import tkinter as tk
+import time
 
-import keyboard
-import mouse
-import numpy as np
-from PIL import ImageGrab
-
-from utils import *
-
-# Tesseract OCR configuration
-set_tesseract_path(username=None)  # Set the Tesseract path, if it doesn't work automatically, specify the username
-custom_config = r'--oem 3 --psm 6 outputbase digits'
-
-# Determine screen coordinates
-SA = ScreenAutomation(add_determination=False, verbose=True)
-SA.coordinates['tag_approximate'] = (SA.coordinates['pinlabels'][0]+250, SA.coordinates['pinlabels'][1]+260)
-
-def clean_text(text):
-    # Step 1: Remove all non-numeric characters except for "("
-    cleaned_text = re.sub(r'[^0-9(]', '', text)
-
-    # Check if the cleaned text is not empty
-    if not cleaned_text:
-        return None  # Return None for invalid input
-
-    # Step 2: If the number contains 5 digits and starts with "(", convert "(" to "1"
-    if len(cleaned_text) == 5 and cleaned_text.startswith('('):
-        cleaned_text = '1' + cleaned_text[1:]
+# The time from the launch until the hotkeys, the OCR and the coordinates are ready is measured from here
+LAUNCH_TIME = time.perf_counter()
 
-    # Step 3: If the number contains 6 digits and starts with "1", remove the "1"
-    if len(cleaned_text) == 6:
-        cleaned_text = cleaned_text[1:]
+import atexit
+import os
+import threading
 
-    # Step 4: If the number contains 5 digits and starts with "8", convert "8" to "3"
-    if len(cleaned_text) == 5 and cleaned_text.startswith('8'):
-        cleaned_text = '3' + cleaned_text[1:]
-
-    # Convert to integer and ensure it is within the range 1 to 63000
+import keyboard
+import mouse
+import pyperclip
+
+import instrumentation
+from dispatcher import JOB_MACRO, JOB_NAVIGATION, JOB_OCR, HotkeyDispatcher
+
+# The heavy modules (NumPy, OpenCV, pyautogui, Tesseract, tkinter) are imported where they are first used, so the
+# hotkeys are registered right away. The OCR engine is loaded next, while the screen coordinates are determined in a
+# background thread. A middle click works as soon as the OCR is ready, the hotkeys clicking in Data Shot wait until
+# the coordinates are determined.
+
+# Time every stage of the OCR, the macros and the coordinate search (alt+s prints the summary), set TRACE_PATH to
+# also write every timed stage to a JSON lines file for later analysis
+INSTRUMENTATION = True
+TRACE_PATH = None  # e.g. 'trace.jsonl'
+if INSTRUMENTATION:
+    instrumentation.enable(TRACE_PATH)
+    atexit.register(instrumentation.disable)
+    atexit.register(instrumentation.print_summary)
+
+# OCR settings of a middle click, set skip_used=True to replace reads of already entered numbers with the most likely
+# similar number not entered yet (otherwise such a read is only reported, e.g. when correcting an entered specimen)
+CLICK_OCR_OPTIONS = dict(width=200, height=80, jitter_size=15, min_samples=3, num_samples=10, adaptive=True,
+                         preprocess=True, skip_used=False)
+
+# Read the tag of the next specimen in the background after alt+1/alt+2 (set to False to disable)
+PREFETCH = True
+
+# Set once the OCR engine and its caches are loaded, once the engines of the parallel OCR are loaded and once the
+# screen coordinates are determined
+OCR_READY = threading.Event()
+OCR_POOL_READY = threading.Event()
+COORDINATES_READY = threading.Event()
+
+# Set up by `determine_coordinates` in the background: screen automation, Paul Born macro, prefetcher and journal
+SA = None
+PAUL_BORN_MACRO = None
+PREFETCHER = None
+JOURNAL = None
+STARTUP_ERROR = None
+
+
+def report_startup(stage, message):
+    # Print and record the time since the launch
+    seconds = time.perf_counter() - LAUNCH_TIME
+    print(f"{message} {seconds:.2f} s after the launch.")
+    if instrumentation.is_enabled():
+        instrumentation.record(f'startup.{stage}', seconds)
+
+def load_ocr():
+    # Load the OCR engine once for the whole session
+    # Every engine of the parallel OCR reads one image at a time, Tesseract must not start threads of its own (OpenMP
+    # reads the limit when tesserocr is first imported)
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    from ocr_backends import get_ocr_backend, get_ocr_pool
+    from ocr_cache import get_ocr_cache
+    from utils import get_template_bank, set_tesseract_path
+
+    # Tesseract OCR configuration
+    set_tesseract_path(username=None)  # Set the Tesseract path, if it doesn't work automatically, specify the username
+    get_ocr_backend('auto', verbose=True)
+    get_template_bank(verbose=True, npz_path='templates.npz')  # Decode all template images once for the whole session
+    atexit.register(get_ocr_cache(path='ocr_cache.npz').close)  # Remember the numbers of the tags already read
+    OCR_READY.set()
+    report_startup('ocr', "Middle click OCR ready")
+
+    # One engine per core for the parallel OCR of alt+q, loaded here so its first read does not wait for them
+    get_ocr_pool('auto')
+    OCR_POOL_READY.set()
+    report_startup('ocr_pool', "Parallel OCR ready")
+
+def determine_coordinates():
+    # Open the journal and determine the screen coordinates, in a background thread
+    global SA, PAUL_BORN_MACRO, PREFETCHER, JOURNAL, STARTUP_ERROR
     try:
-        number = int(cleaned_text)
-        if 1 <= number <= 63000:
-            return number
-        else:
-            return None  # Return None for out-of-range numbers
-    except ValueError:
-        return None  # Return None for conversion failures
-
-def perform_ocr(position=None, width=200, height=80, jitter_size=15, min_samples=None, num_samples=5, verbose = False):
-    """
-    Capture a screen area around the given position, apply OCR, and return the most common valid result.
-
-    Parameters
-    ----------
-    position : tuple, optional
-        The center point for capturing the screen (default: current mouse position).
-    width : int, optional
-        Width of the capture area.
-    height : int, optional
-        Height of the capture area.
-    jitter_size : int, optional
-        The jitter range around the position.
-    min_samples : int, optional
-        Minimum number of valid samples to consider.
-    num_samples : int, optional
-        Number of jittered samples to take.
-    verbose : bool, optional
-        Whether to print debug information
-
-    Returns
-    -------
-    str or None
-        Most common OCR result from the sampled screenshots.
-    """
-
-    if position is None:
-        # Get the current cursor position
-        position = pyautogui.position()
-
-    x, y = position
-    if verbose:
-        print(f"Capturing around position: {x}, {y}")
-
-    if min_samples is None:
-        min_samples = num_samples
-
-    # List to store OCR results
-    ocr_results = []
-    valid_results = []
-
-    print('-' * 40)
-
-    for _ in range(num_samples):  # Take the specified number of samples
-        jitter_x = random.randint(-jitter_size, jitter_size)
-        jitter_y = random.randint(-jitter_size, jitter_size)
-
-        # Define the capture area around the jittered position
-        top_left_x = x + jitter_x - (width // 2)
-        top_left_y = y + jitter_y - (height // 2)
-        bottom_right_x = top_left_x + width
-        bottom_right_y = top_left_y + height
-
-        if verbose:
-            print(f"Capturing area from {top_left_x, top_left_y} to {bottom_right_x, bottom_right_y}")
-
-        # Capture the screenshot of the specified area
-        screenshot = ImageGrab.grab(bbox=(top_left_x, top_left_y, bottom_right_x, bottom_right_y))
-
-        # Perform OCR on the captured image
-        text = pytesseract.image_to_string(screenshot, config=custom_config)
-
-        # Clean the text
-        cleaned_text = clean_text(text)
-
-        # Store the cleaned OCR result
-        ocr_results.append(cleaned_text)
-
-        if cleaned_text is not None:
-            valid_results.append(cleaned_text)
-
-        print(cleaned_text)
-        if valid_results and len(valid_results) >= min_samples and len(set(valid_results)) == 1:
-            break
-
-    # Determine the most frequent valid result
-    if valid_results:
-        most_common_result = max(set(valid_results), key=valid_results.count)
-        pyperclip.copy(str(most_common_result))  # Copy to clipboard
-        print('-' * 40)
-        print(most_common_result)
-        return most_common_result
-    else:
-        print("No valid OCR results found.")
-        return None
+        from journal import get_journal
+        from macros import PAUL_BORN_STEPS, compile_macro
+        from ocr import pinlabels_region
+        from prefetch import OCRPrefetcher, tag_watch_region
+        from used_numbers import get_used_numbers
+        from utils import ScreenAutomation, get_template_bank
+
+        # Journal of all entered collection numbers, continue where the last session stopped
+        JOURNAL = get_journal('journal.bin')
+        atexit.register(JOURNAL.close)
+        last_record = JOURNAL.last()
+        if last_record is not None:
+            print(f"Last entered collection number: {last_record.number} "
+                  f"({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_record.timestamp))}, "
+                  f"{last_record.source}), {len(JOURNAL)} entries in the journal.")
+
+        # The collection numbers already entered, rebuilt from the journal (the durable record of all entries)
+        get_used_numbers().update(JOURNAL.numbers())
+
+        # Determine screen coordinates
+        get_template_bank(npz_path='templates.npz')
+        SA = ScreenAutomation(add_determination=False, verbose=True)
+        SA.coordinates['tag_approximate'] = (SA.coordinates['pinlabels'][0]+250, SA.coordinates['pinlabels'][1]+260)
+
+        # Enter the collection number on the clipboard and the collection, then save
+        PAUL_BORN_MACRO = compile_macro(SA, PAUL_BORN_STEPS, name='Paul Born')
+
+        PREFETCHER = OCRPrefetcher(tag_watch_region(SA.coordinates['tag_approximate']),
+                                   pinlabels_region(SA.coordinates['pinlabels']), copy=True, verbose=True,
+                                   clipboard=SA.clipboard, **CLICK_OCR_OPTIONS)
+    except Exception as e:
+        STARTUP_ERROR = e
+        print(f"Failed to determine the coordinates ({e!r}), only the middle click OCR works. Restart the script "
+              f"once Data Shot is shown.")
+        return
+    finally:
+        COORDINATES_READY.set()
+    report_startup('coordinates', "Coordinates determined, all hotkeys ready")
+
+def wait_for_coordinates():
+    # The hotkeys clicking in Data Shot are queued right away, but only run once the coordinates are known
+    if not COORDINATES_READY.is_set():
+        print("Waiting until the coordinates are determined...")
+        COORDINATES_READY.wait()
+    if STARTUP_ERROR is not None:
+        raise RuntimeError(f"The coordinates could not be determined: {STARTUP_ERROR!r}")
 
+def show_input_dialog():
+    import tkinter as tk
 
-def locate_and_average_centers(tags_folder='imgs/tags/digits', confidence=0.5, verbose=True):
-    # Initialize an empty list to hold the found centers
-    found_centers = []
-
-    # Get all files in the tags folder
-    tag_images = [f for f in os.listdir(tags_folder) if f.endswith(('.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG'))]
-    if verbose:
-        print(tag_images)
-
-    # Iterate over the tag images
-    for image_file in tag_images:
-        image_path = os.path.join(tags_folder, image_file)
-
-        if verbose:
-            print(f"Searching for: {image_path}")
-
-        try:
-            # Locate the center of the current tag on the screen
-            center = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
-
-            if center is not None:
-                found_centers.append(center)
-                if verbose:
-                    print(f"Found {image_path} at: {center}")
-            else:
-                if verbose:
-                    print(f"{image_path} not found on the screen.")
-
-        except pyautogui.ImageNotFoundException:
-            if verbose:
-                print(f"Image file {image_path} not found. Skipping...")
-
-    # Calculate the average of the found centers if any
-    if found_centers:
-        # Convert to numpy array for easier manipulation
-        centers_array = np.array(found_centers)
-
-        # Calculate the center x-coordinate
-        min_x = np.min(centers_array[:, 0])
-        max_x = np.max(centers_array[:, 0])
-        center_x = (min_x + max_x) / 2
+    import pyautogui
 
-        # Calculate the average y-coordinate
-        average_y = np.mean(centers_array[:, 1])
+    from journal import SOURCE_MANUAL
+    from ocr import clean_text
 
-        return center_x, average_y  # Return as a tuple
-    else:
-        if verbose:
-            print("No tags found.")
-        return None
+    wait_for_coordinates()
 
-def show_input_dialog():
     # Create a new Tkinter window
     root = tk.Tk()
     root.title("Input Box")
@@ -212,7 +165,7 @@ def show_input_dialog():
         pyperclip.copy(cleaned_user_input)  # Copy to clipboard
         print("Copied to clipboard:", cleaned_user_input)  # Optional: Print to console
         root.destroy()  # Close the window
-        perform_paul_born()
+        perform_paul_born(source=SOURCE_MANUAL)
 
     # Create and place a label
     label = tk.Label(root, text="Enter your text:", font=("Arial", 18))
@@ -235,30 +188,119 @@ def show_input_dialog():
 
     root.mainloop()
 
-def perform_paul_born():
+@instrumentation.timed('paul_born')
+def perform_paul_born(source=None):
+    from journal import SOURCE_MANUAL, SOURCE_OCR
+    from ocr import clean_text, last_read
+    from used_numbers import get_used_numbers
+
+    wait_for_coordinates()
+
     # Perform the actions for Paul Born
     number = pyperclip.paste()
-    SA.perform_numbers_more(number, "Collection Number")
-    SA.perform_collection("Born-Moser, Paul (1859-1928)")
-    SA.perform_save()
+    cleaned_number = clean_text(number)
+    if cleaned_number is not None and cleaned_number in JOURNAL:
+        previous_record = JOURNAL.find(cleaned_number)
+        print(f"Warning: collection number {cleaned_number} was already entered on "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(previous_record.timestamp))}.")
+
+    PAUL_BORN_MACRO.run(number=number)
+
+    if cleaned_number is not None:
+        with instrumentation.span('paul_born.journal'):
+            # A later read of the same number is most likely a misread of another tag
+            get_used_numbers().add(cleaned_number)
+
+            # The number came from OCR if it is the last number read (and was not typed in the input dialog)
+            read_number, crop_hash = last_read()
+            if source is None:
+                source = SOURCE_OCR if read_number == cleaned_number else SOURCE_MANUAL
+            JOURNAL.append(cleaned_number, source, crop_hash if source == SOURCE_OCR else 0)
+
+def copy_unless_cancelled(number, cancelled=None):
+    # A navigation during the OCR shows another specimen, the number read must not replace the clipboard anymore
+    if number is None:
+        return None
+    if cancelled is not None and cancelled():
+        print(f"Not copying {number}, another specimen is shown.")
+        return None
+    pyperclip.copy(str(number))
+    return number
 
-def perform_auto_locate_ocr(confidence=0.5, verbose=True):
-    center = locate_and_average_centers(confidence=confidence, verbose=verbose)
+def perform_auto_locate_ocr(confidence=0.5, verbose=True, cancelled=None):
+    from ocr import locate_and_average_centers, perform_ocr, pinlabels_region
+    from utils import get_template_bank
+
+    wait_for_coordinates()
+    OCR_POOL_READY.wait()  # The parallel OCR must not load its engines while a tag is read
+    region = pinlabels_region(SA.coordinates['pinlabels'])
+    center = locate_and_average_centers(confidence=confidence, verbose=verbose, region=region)
     if center is not None:
-        perform_ocr(center, 200, 80, 15, 3, 5)
+        number = perform_ocr(center, 200, 80, 15, 3, 5, parallel=True, preprocess=True, copy=False)
+        copy_unless_cancelled(number, cancelled)
     else:
         print("No tag found.")
+    if verbose:
+        print(get_template_bank().summary())
 
 
-# HOTKEYS
-keyboard.add_hotkey('alt+2', SA.perform_previous, args=('tag_approximate', True))
-keyboard.add_hotkey('alt+1', SA.perform_next, args=('tag_approximate', True))
-keyboard.add_hotkey('§', perform_paul_born)
-keyboard.add_hotkey('alt+§', show_input_dialog)  # New hotkey for manual number input
-keyboard.add_hotkey('alt+q', perform_auto_locate_ocr)
+def perform_navigation(direction):
+    # Go to the 'next' or 'previous' specimen
+    wait_for_coordinates()
+    action = getattr(SA, f'perform_{direction}')
+    if PREFETCH:
+        OCR_READY.wait()  # The prefetch must not load the OCR engine while the specimen changes
+        PREFETCHER.navigate(action, 'tag_approximate', True)
+    else:
+        action('tag_approximate', True)
+
+def warn_if_used(number):
+    # A read of an already entered number is either a specimen being corrected or a misread of another tag
+    from used_numbers import get_used_numbers
+
+    if number is not None and number in get_used_numbers():
+        print(f"Warning: collection number {number} was already entered, check the tag.")
+    return number
 
-mouse.on_middle_click(perform_ocr, args=(None, 200, 80, 15, 3, 5))
+def perform_click_ocr(position=None, cancelled=None):
+    # Works before the coordinates are determined, only the number read in the background needs them
+    OCR_READY.wait()
+    from ocr import perform_ocr
+
+    # Use the number read in the background if the mouse is on the prefetched tag
+    if position is None:
+        position = mouse.get_position()
+    number = None
+    if PREFETCHER is not None:
+        number = PREFETCHER.result_at(position, CLICK_OCR_OPTIONS['width'], CLICK_OCR_OPTIONS['height'])
+    if number is not None:
+        pyperclip.copy(str(number))
+        print('-' * 40)
+        print(f"{number} (prefetched)")
+        return warn_if_used(number)
+    return warn_if_used(copy_unless_cancelled(perform_ocr(position, **CLICK_OCR_OPTIONS, copy=False), cancelled))
+
+
+# HOTKEYS
+# The hotkeys only queue their action, which runs on the worker thread of the dispatcher (one action at a time)
+DISPATCHER = HotkeyDispatcher(verbose=True)
+atexit.register(DISPATCHER.close)
+keyboard.add_hotkey('alt+2', DISPATCHER.handler(JOB_NAVIGATION, perform_navigation, 'previous'))
+keyboard.add_hotkey('alt+1', DISPATCHER.handler(JOB_NAVIGATION, perform_navigation, 'next'))
+keyboard.add_hotkey('§', DISPATCHER.handler(JOB_MACRO, perform_paul_born))
+keyboard.add_hotkey('alt+§', DISPATCHER.handler(JOB_MACRO, show_input_dialog))  # New hotkey for manual number input
+keyboard.add_hotkey('alt+q', DISPATCHER.handler(JOB_OCR, perform_auto_locate_ocr))
+
+# The timing summary is printed right away, also while an action is running
+keyboard.add_hotkey('alt+s', instrumentation.print_summary)
+
+# The mouse position is taken when the mouse is clicked, not when the OCR starts
+mouse.on_middle_click(DISPATCHER.handler(JOB_OCR, perform_click_ocr, position_at_press=mouse.get_position))
+report_startup('hotkeys', "Hotkeys registered")
+
+# STARTUP
+threading.Thread(target=determine_coordinates, name='determine-coordinates', daemon=True).start()
+load_ocr()
 
 while True:
     keyboard.wait()
-
@@ -0,0 +1,156 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from clipboard import ClipboardSession
+from ocr import locate_and_average_centers, perform_ocr
+from utils import capture_settle_frame, wait_until_settled
+
+# Region (left, top, width, height) watched for the new specimen image, relative to the approximate tag position
+TAG_WATCH_REGION = (-200, -150, 400, 300)
+
+# Confidence threshold of the digit templates when locating the tag
+PREFETCH_CONFIDENCE = 0.5
+
+
+def tag_watch_region(tag_approximate):
+    """
+    Determine the screen region watched for the new specimen image around the approximate tag position.
+
+    Parameters
+    ----------
+    tag_approximate : tuple
+        The approximate tag position (ScreenAutomation.coordinates['tag_approximate']).
+
+    Returns
+    -------
+    tuple
+        The region (left, top, width, height).
+    """
+    left = max(0, int(tag_approximate[0]) + TAG_WATCH_REGION[0])
+    top = max(0, int(tag_approximate[1]) + TAG_WATCH_REGION[1])
+    return left, top, TAG_WATCH_REGION[2], TAG_WATCH_REGION[3]
+
+
+class OCRPrefetcher:
+    """
+    Reads the collection number of the next specimen in the background as soon as it is shown.
+
+    After a navigation (see `navigate`), a background thread waits until the region around the tag has changed and
+    stopped changing, locates the tag in the pin label image and reads it with `perform_ocr`. Unless a newer navigation
+    happened meanwhile, the result is copied to the clipboard (if `copy` is set) and returned by `result_at` when the
+    tag is clicked, so the OCR is done before the operator asks for it. A newer navigation cancels a prefetch that is
+    still waiting. The number is copied through the clipboard session of the macros, so it waits until a running macro
+    has pasted its texts and restored the clipboard.
+    """
+
+    def __init__(self, watch_region, search_region, copy: bool = True, verbose: bool = False,
+                 clipboard: ClipboardSession = None, **ocr_kwargs):
+        """
+        Parameters
+        ----------
+        watch_region : tuple
+            The region (left, top, width, height) watched for the new specimen image, see `tag_watch_region`.
+        search_region : tuple
+            The region (left, top, width, height) searched for the tag, see `ocr.pinlabels_region`.
+        copy : bool
+            Whether to copy the prefetched number to the clipboard.
+        verbose : bool
+            Whether to print debug information.
+        clipboard : ClipboardSession
+            The clipboard session of the macros (ScreenAutomation.clipboard), default: a session of its own.
+        **ocr_kwargs
+            Keyword arguments passed on to `perform_ocr`.
+        """
+        self.watch_region = watch_region
+        self.search_region = search_region
+        self.copy = copy
+        self.verbose = verbose
+        self.clipboard = ClipboardSession() if clipboard is None else clipboard
+        self.ocr_kwargs = ocr_kwargs
+        self._generation = 0
+        self._result = None  # (generation, tag center, number)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+
+    def navigate(self, action, *args, **kwargs):
+        """
+        Run a navigation (e.g. ScreenAutomation.perform_next) and prefetch the number of the specimen it shows.
+
+        Parameters
+        ----------
+        action : callable
+            The navigation.
+        *args, **kwargs
+            The arguments of the navigation.
+        """
+        baseline = capture_settle_frame(self.watch_region)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._result = None
+
+        action(*args, **kwargs)
+        self._executor.submit(self._prefetch, generation, baseline)
+
+    def _prefetch(self, generation, baseline):
+        # Exceptions of the background thread would otherwise be lost silently
+        try:
+            self._read_next_tag(generation, baseline)
+        except Exception as e:
+            print(f"Prefetch failed: {e!r}")
+
+    def _read_next_tag(self, generation, baseline):
+        def cancelled():
+            return generation != self._generation
+
+        if not wait_until_settled(self.watch_region, baseline, cancelled=cancelled):
+            if self.verbose and not cancelled():
+                print("Prefetch: the specimen image did not change.")
+            return
+
+        center = locate_and_average_centers(confidence=PREFETCH_CONFIDENCE, verbose=False, region=self.search_region)
+        if center is None or cancelled():
+            if self.verbose and center is None:
+                print("Prefetch: no tag found.")
+            return
+
+        center = (int(round(center[0])), int(round(center[1])))
+        number = perform_ocr(center, copy=False, **self.ocr_kwargs)
+        with self._lock:
+            # A prefetch finishing after a newer navigation must not replace the clipboard with the previous number.
+            # The macros holding the clipboard lock never take this lock, so waiting for them here cannot deadlock.
+            if generation == self._generation and number is not None:
+                self._result = (generation, center, number)
+                if self.copy:
+                    self.clipboard.put(number)
+
+    def result_at(self, position, width: int = 200, height: int = 80):
+        """
+        Return the prefetched number if the position lies on the prefetched tag.
+
+        Parameters
+        ----------
+        position : tuple
+            The screen position (e.g. of the mouse).
+        width : int
+            The width of the area around the tag center that counts as the tag.
+        height : int
+            The height of the area around the tag center that counts as the tag.
+
+        Returns
+        -------
+        int or None
+            The prefetched number, None if there is none for the current specimen or the position is elsewhere.
+        """
+        with self._lock:
+            if self._result is None or self._result[0] != self._generation:
+                return None
+            _, (center_x, center_y), number = self._result
+        if abs(position[0] - center_x) <= width / 2 and abs(position[1] - center_y) <= height / 2:
+            return number
+        return None
+
+    def close(self):
+        with self._lock:
+            self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
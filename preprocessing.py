@@ -0,0 +1,264 @@
+import cv2
+import numpy as np
+
+# Height (in pixels) of the digits Tesseract reads most reliably
+TARGET_GLYPH_HEIGHT = 32
+
+# Maximum integer factor a screenshot is upscaled by
+MAX_UPSCALE = 4
+
+# Percentiles of the gray values stretched to black and white by the contrast normalisation
+CONTRAST_PERCENTILES = (2, 98)
+
+# Size of the neighbourhood (in pixels, odd) and offset of the adaptive binarisation
+BINARIZE_BLOCK_SIZE = 101
+BINARIZE_OFFSET = 20
+
+# Skew angles (in degrees) tried by the deskew step
+DESKEW_ANGLES = np.arange(-3, 3.25, 0.25)
+
+
+def to_grayscale(image):
+    """
+    Convert a screenshot to grayscale.
+
+    Parameters
+    ----------
+    image : PIL.Image.Image or numpy.ndarray
+        The screenshot (RGB, RGBA or grayscale).
+
+    Returns
+    -------
+    numpy.ndarray
+        The screenshot in grayscale (uint8).
+    """
+    image = np.asarray(image)
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(np.ascontiguousarray(image[:, :, :3]), cv2.COLOR_RGB2GRAY)
+
+
+def normalize_contrast(gray, percentiles=CONTRAST_PERCENTILES):
+    """
+    Stretch the gray values linearly so that the given percentiles become black and white.
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        The grayscale image.
+    percentiles : tuple
+        The lower and upper percentile.
+
+    Returns
+    -------
+    numpy.ndarray
+        The image with normalised contrast (uint8).
+    """
+    low, high = np.percentile(gray, percentiles)
+    if high - low < 1:
+        return gray
+    lut = np.clip((np.arange(256, dtype=np.float32) - low) * (255 / (high - low)), 0, 255).astype(np.uint8)
+    return lut[gray]
+
+
+def binarize(gray, block_size=BINARIZE_BLOCK_SIZE, offset=BINARIZE_OFFSET):
+    """
+    Binarise an image with a threshold adapted to the mean of every pixel's neighbourhood.
+
+    Unlike a global threshold this keeps the digits readable when the tag is unevenly lit or partly shadowed.
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        The grayscale image.
+    block_size : int
+        The size of the neighbourhood (odd).
+    offset : int
+        How much darker than the neighbourhood a pixel must be to become black.
+
+    Returns
+    -------
+    numpy.ndarray
+        The binary image with black text (0) on white (255).
+    """
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block_size, offset)
+
+
+def skew_angle(gray, angles=DESKEW_ANGLES):
+    """
+    Estimate the skew of the text lines in an image.
+
+    The dark pixels are sheared by every candidate angle and the angle whose row profile is sharpest (the text lines
+    fall into the fewest rows) is the skew.
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        The grayscale or binary image with dark text.
+    angles : numpy.ndarray
+        The candidate angles in degrees.
+
+    Returns
+    -------
+    float
+        The skew angle in degrees.
+    """
+    ink = (gray < 128).astype(np.float32)
+    height, width = ink.shape
+    columns = np.arange(width, dtype=np.float32) - width / 2
+    rows, cols = np.nonzero(ink)
+    if rows.size == 0:
+        return 0.0
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in angles:
+        shifted = np.round(rows + columns[cols] * np.tan(np.radians(angle))).astype(np.int64)
+        profile = np.bincount(shifted - shifted.min())
+        score = float(np.dot(profile, profile))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def deskew(gray, angles=DESKEW_ANGLES):
+    """
+    Rotate an image so that its text lines are horizontal (only small angles are corrected).
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        The grayscale or binary image with dark text.
+    angles : numpy.ndarray
+        The candidate angles in degrees.
+
+    Returns
+    -------
+    numpy.ndarray
+        The deskewed image.
+    """
+    angle = skew_angle(gray, angles)
+    if angle == 0:
+        return gray
+    height, width = gray.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), -angle, 1.0)
+    return cv2.warpAffine(gray, rotation, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def glyph_height(binary):
+    """
+    Estimate the height of the characters in a binary image.
+
+    Parameters
+    ----------
+    binary : numpy.ndarray
+        The binary image with black text (0) on white (255).
+
+    Returns
+    -------
+    int or None
+        The height of the tallest character-sized connected components (90th percentile), None if there are none.
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(255 - binary, connectivity=8)
+    heights = stats[1:count, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:count, cv2.CC_STAT_WIDTH]
+
+    # Ignore specks and components spanning (almost) the whole image such as the border of the tag
+    glyphs = heights[(heights >= 6) & (heights < 0.8 * binary.shape[0]) & (widths < 0.5 * binary.shape[1])]
+    if glyphs.size == 0:
+        return None
+    # The digits of the collection number are the largest characters on the tag
+    return int(np.percentile(glyphs, 90))
+
+
+def upscale(image, height, target_height=TARGET_GLYPH_HEIGHT, max_factor=MAX_UPSCALE):
+    """
+    Enlarge an image by an integer factor so that its characters get close to the target height.
+
+    Parameters
+    ----------
+    image : numpy.ndarray
+        The image.
+    height : int or None
+        The current height of the characters (None leaves the image unchanged).
+    target_height : int
+        The character height to approach.
+    max_factor : int
+        The largest factor used.
+
+    Returns
+    -------
+    numpy.ndarray
+        The enlarged image (the image itself if the factor is 1).
+    """
+    if not height:
+        return image
+    factor = int(min(max(round(target_height / height), 1), max_factor))
+    if factor == 1:
+        return image
+    return cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+
+
+class Preprocessor:
+    """
+    Configurable image cleanup applied to every screenshot before it is passed to the OCR backend.
+
+    All steps work on numpy arrays (no conversion to PIL images in between) in this order: grayscale conversion,
+    contrast normalisation, deskew, adaptive binarisation and integer upscaling to TARGET_GLYPH_HEIGHT.
+    Binarisation and upscaling are off by default. Binarisation helps on samples showing only the tag but breaks the
+    digits apart when the sample also shows the background around it, and the tags in Data Shot are usually zoomed in
+    far enough that upscaling does not improve the reads (see benchmarks/bench_preprocessing.py).
+    """
+
+    def __init__(self, contrast: bool = True, deskew: bool = True, binarize: bool = False, upscale: bool = False,
+                 target_glyph_height: int = TARGET_GLYPH_HEIGHT):
+        """
+        Parameters
+        ----------
+        contrast : bool
+            Whether to normalise the contrast.
+        deskew : bool
+            Whether to correct a small skew of the text lines.
+        binarize : bool
+            Whether to binarise the image with an adaptive threshold.
+        upscale : bool
+            Whether to enlarge small characters to the target height.
+        target_glyph_height : int
+            The character height (in pixels) the upscaling approaches.
+        """
+        self.contrast = contrast
+        self.deskew = deskew
+        self.binarize = binarize
+        self.upscale = upscale
+        self.target_glyph_height = target_glyph_height
+
+    def __repr__(self):
+        steps = [step for step in ('contrast', 'deskew', 'binarize', 'upscale') if getattr(self, step)]
+        return f"Preprocessor({', '.join(['grayscale'] + steps)})"
+
+    def __call__(self, image):
+        """
+        Preprocess a screenshot.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image or numpy.ndarray
+            The screenshot.
+
+        Returns
+        -------
+        numpy.ndarray
+            The preprocessed grayscale image.
+        """
+        gray = to_grayscale(image)
+        if self.contrast:
+            gray = normalize_contrast(gray)
+        if self.deskew:
+            gray = deskew(gray)
+
+        if self.binarize or self.upscale:
+            binary = binarize(gray)
+            if self.binarize:
+                gray = binary
+            if self.upscale:
+                gray = upscale(gray, glyph_height(binary), self.target_glyph_height)
+        return gray
@@ -0,0 +1,117 @@
+import os
+import threading
+
+# Range of the Paul Born collection numbers
+MIN_COLLECTION_NUMBER = 1
+MAX_COLLECTION_NUMBER = 63000
+
+_used_numbers = None
+_used_numbers_lock = threading.Lock()
+
+
+class UsedNumberIndex:
+    """
+    Bitmap of the collection numbers that have already been entered in Data Shot.
+
+    Every number from MIN_COLLECTION_NUMBER to MAX_COLLECTION_NUMBER is one bit, so the whole index takes less than
+    8 KB and adding or looking up a number takes constant time.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Parameters
+        ----------
+        path : str
+            Optional file in which the index is stored, so it survives a restart of the script.
+        """
+        self.path = path
+        self._bits = bytearray((MAX_COLLECTION_NUMBER >> 3) + 1)
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read(len(self._bits))
+            self._bits[:len(data)] = data
+
+    def __contains__(self, number) -> bool:
+        if not MIN_COLLECTION_NUMBER <= number <= MAX_COLLECTION_NUMBER:
+            return False
+        return bool(self._bits[number >> 3] & (1 << (number & 7)))
+
+    def __len__(self):
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+    def add(self, number):
+        """
+        Mark a collection number as entered and store the index in its file.
+
+        Parameters
+        ----------
+        number : int
+            The collection number.
+        """
+        if not MIN_COLLECTION_NUMBER <= number <= MAX_COLLECTION_NUMBER:
+            raise ValueError(f"Collection number {number} is not between {MIN_COLLECTION_NUMBER} and "
+                             f"{MAX_COLLECTION_NUMBER}.")
+        with self._lock:
+            self._bits[number >> 3] |= 1 << (number & 7)
+            self._save()
+
+    def update(self, numbers):
+        """
+        Mark several collection numbers as entered (e.g. all numbers of the journal) and store the index once.
+
+        Parameters
+        ----------
+        numbers : iterable
+            The collection numbers.
+        """
+        with self._lock:
+            for number in numbers:
+                if MIN_COLLECTION_NUMBER <= number <= MAX_COLLECTION_NUMBER:
+                    self._bits[number >> 3] |= 1 << (number & 7)
+            self._save()
+
+    def discard(self, number):
+        """
+        Remove a collection number from the index (e.g. after a wrong number was entered).
+
+        Parameters
+        ----------
+        number : int
+            The collection number.
+        """
+        if not MIN_COLLECTION_NUMBER <= number <= MAX_COLLECTION_NUMBER:
+            return
+        with self._lock:
+            self._bits[number >> 3] &= ~(1 << (number & 7)) & 0xFF
+            self._save()
+
+    def _save(self):
+        # Written next to the index file first, so a crash while writing leaves the last complete index
+        if self.path is None:
+            return
+        with open(self.path + '.tmp', 'wb') as f:
+            f.write(self._bits)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def get_used_numbers(path: str = None) -> UsedNumberIndex:
+    """
+    Return the shared index of entered collection numbers, creating it on first use.
+
+    Parameters
+    ----------
+    path : str
+        Optional file in which the index is stored (only used when the index is created).
+
+    Returns
+    -------
+    UsedNumberIndex
+        The index of entered collection numbers.
+    """
+    global _used_numbers
+    with _used_numbers_lock:
+        if _used_numbers is None:
+            _used_numbers = UsedNumberIndex(path=path)
+        return _used_numbers
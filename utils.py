@@ -1,12 +1,97 @@
+import hashlib
+import json
 import os
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-import pyautogui
+import cv2
+import numpy as np
 import pyperclip
-import pytesseract
-from pyautogui import click
+
+import capture
+from clipboard import ClipboardSession
+from instrumentation import span, timed
+from ocr_backends import set_tesseract_cmd
 
 DEFAULT_CONFIDENCE = 0.9
+IMGS_FOLDER = 'imgs'
+TAGS_FOLDER = os.path.join(IMGS_FOLDER, 'tags')
+DIGITS_FOLDER = os.path.join(TAGS_FOLDER, 'digits')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Label images located by ScreenAutomation._determine_coordinates
+LABEL_IMAGES = [
+    'previous.png', 'previous_deactivated.png', 'next.png', 'next_deactivated.png', 'save.png', 'pinlabels.png',
+    'images.png', 'numbers_more_button.png', 'collector.png', 'workflow_status.png', 'collection.png',
+    'date_verbatim.png', 'date_interpreted.png', 'associated_taxon.png', 'elevation_from.png', 'elevation_to.png',
+    'notes.png', 'sex.png',
+]
+DETERMINATION_LABEL_IMAGES = ['det_add_button.png', 'det_done_button.png', 'det_species_number.png']
+
+# Coordinates found by ScreenAutomation are cached in this file and reused if the layout did not change
+LAYOUT_CACHE_PATH = 'layout_cache.json'
+
+# Labels checked to confirm a cached layout: (label image, coordinate name, x offset of the coordinate)
+ANCHOR_LABELS = [
+    ('save.png', 'save', 0),
+    ('pinlabels.png', 'pinlabels', 0),
+    ('numbers_more_button.png', 'numbers_more_button', 0),
+    ('collection.png', 'collection', 100),
+]
+ANCHOR_MARGIN = 10
+
+# Waiting for the screen to settle: seconds between two frames, mean gray value difference (0-255) below which two
+# frames are equal, number of equal frames in a row, maximum seconds to wait and factor the frames are reduced by
+SETTLE_POLL_INTERVAL = 0.05
+SETTLE_THRESHOLD = 2.0
+SETTLE_FRAMES = 2
+SETTLE_TIMEOUT = 3.0
+SETTLE_DOWNSCALE = 4
+
+# Waiting for Data Shot to react to a click or key press (instead of the fixed pyautogui.PAUSE after every action):
+# size (width, height) of the region around the clicked position that is watched, seconds between two checks and
+# maximum seconds to wait for a change
+ACTION_REGION_SIZE = (240, 40)
+ACTION_POLL_INTERVAL = 0.01
+ACTION_TIMEOUT = 0.3
+
+# Maximum seconds to wait after actions that often show no change around their target (e.g. enter or save), not
+# longer than the former fixed pyautogui.PAUSE
+QUIET_ACTION_TIMEOUT = 0.1
+
+# A change of the watched region counts as reaction if more than ACTION_CHANGE_PIXELS pixels changed by more than
+# ACTION_CHANGE_THRESHOLD gray values, so a blinking caret (about 2 x 20 pixels) is ignored
+ACTION_CHANGE_THRESHOLD = 40
+ACTION_CHANGE_PIXELS = 60
+
+# Seconds to wait after moving the mouse onto a button before the frame compared after the click is taken, so its
+# hover highlight is not taken for a reaction to the click
+HOVER_DELAY = 0.02
+
+# Coordinates of buttons, a click on them changes the screen. A click on other coordinates (an input field) only moves
+# the caret there, which changes almost nothing, so it is not awaited longer than QUIET_ACTION_TIMEOUT
+BUTTON_COORDINATES = ('previous', 'next', 'save', 'pinlabels', 'numbers_more_button', 'collector_add', 'det_button',
+                      'det_add_button', 'det_done_button')
+
+# Buttons that show another specimen image, their click is confirmed by the image and not by their own highlight
+SPECIMEN_BUTTONS = ('previous', 'next', 'pinlabels')
+
+# Region (left, top, width, height) of the specimen image watched after a click on SPECIMEN_BUTTONS, relative to the
+# 'pinlabels' button (around the approximate tag position, as prefetch.TAG_WATCH_REGION), and the maximum seconds to
+# wait for it to change (loading another specimen takes longer than other actions, the wait ends once it is shown)
+SPECIMEN_WATCH_REGION = (50, 110, 400, 300)
+SPECIMEN_TIMEOUT = 1.0
+
+# Maximum seconds to wait for a dialog to open
+DIALOG_TIMEOUT = 3.0
+
+
+class LabelNotFoundError(LookupError):
+    """
+    A label image was not found on the screen (raised without importing pyautogui, which needs a display).
+    """
 
 
 def get_current_username():
@@ -39,7 +124,10 @@ def get_current_username():
 
 def set_tesseract_path(username=None):
     """
-    Set the Tesseract path for pytesseract.
+    Set the Tesseract path for pytesseract and the in-process OCR engine.
+
+    The path is only set on Windows or if tesseract is installed there, otherwise (e.g. on Linux) tesseract is run
+    from the PATH.
 
     Parameters
     ----------
@@ -49,11 +137,537 @@ def set_tesseract_path(username=None):
     if username is None:
         username = get_current_username()
 
-    pytesseract.pytesseract.tesseract_cmd = fr'C:\Users\{username}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
+    path = fr'C:\Users\{username}\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
+    if sys.platform == 'win32' or os.path.exists(path):
+        set_tesseract_cmd(path)
+
+
+def get_screen_scaling():
+    """
+    Determine the display scaling of the primary monitor in percent (Windows only).
+
+    Returns
+    -------
+    int or None
+        The display scaling, None if it cannot be determined.
+    """
+    try:
+        import ctypes
+        return ctypes.windll.shcore.GetScaleFactorForDevice(0)
+    except (AttributeError, OSError):
+        return None
+
+
+def hash_templates(folder=IMGS_FOLDER):
+    """
+    Compute a hash of all images in the images folder (not including subfolders).
+
+    Parameters
+    ----------
+    folder : str
+        The images folder.
+
+    Returns
+    -------
+    str
+        The hex digest of the images.
+    """
+    digest = hashlib.sha1()
+    for file_name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, file_name)
+        if os.path.isfile(path):
+            digest.update(file_name.encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def template_path(image_name, folder=IMGS_FOLDER):
+    """
+    Determine the path of an image in the images folder, ignoring the case of the file name.
+
+    Parameters
+    ----------
+    image_name : str
+        The filename of the image.
+    folder : str
+        The folder containing the image.
+
+    Returns
+    -------
+    str
+        The path of the image.
+    """
+    path = os.path.join(folder, image_name)
+    if not os.path.exists(path):
+        for file_name in os.listdir(folder):
+            if file_name.lower() == image_name.lower():
+                return os.path.join(folder, file_name)
+    return path
+
+
+def load_template(image_name, grayscale=True, folder=IMGS_FOLDER):
+    """
+    Load an image from the images folder in the OpenCV format used for template matching.
+
+    Parameters
+    ----------
+    image_name : str
+        The filename of the image.
+    grayscale : bool
+        Whether to load the image in grayscale (BGR otherwise).
+    folder : str
+        The folder containing the image.
+
+    Returns
+    -------
+    numpy.ndarray
+        The loaded image.
+    """
+    path = template_path(image_name, folder)
+    template = cv2.imread(path, cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR)
+    if template is None:
+        raise IOError(f"Failed to read {path}.")
+    return template
+
+
+def screenshot_cv2(grayscale=True, region=None):
+    """
+    Capture the screen in the OpenCV format used for template matching (with the backend of `capture`).
+
+    Parameters
+    ----------
+    grayscale : bool
+        Whether to convert the screenshot to grayscale (BGR otherwise).
+    region : tuple
+        The region (left, top, width, height) to capture, default: the whole screen.
+
+    Returns
+    -------
+    numpy.ndarray
+        The screenshot.
+    """
+    if grayscale:
+        return capture.grab(region, grayscale=True)
+    return cv2.cvtColor(capture.grab(region), cv2.COLOR_RGB2BGR)
+
+
+def capture_settle_frame(region, downscale=SETTLE_DOWNSCALE):
+    """
+    Capture a reduced grayscale frame of a screen region for detecting changes.
+
+    Parameters
+    ----------
+    region : tuple
+        The region (left, top, width, height) to capture.
+    downscale : int
+        The factor the frame is reduced by (every downscale-th pixel is kept).
+
+    Returns
+    -------
+    numpy.ndarray
+        The reduced frame (int16, so frames can be subtracted).
+    """
+    return screenshot_cv2(region=region)[::downscale, ::downscale].astype(np.int16)
+
+
+def frame_difference(frame, other) -> float:
+    """
+    Compute the mean absolute gray value difference of two frames captured with `capture_settle_frame`.
+    """
+    return float(np.abs(frame - other).mean())
+
+
+def wait_until_settled(region, baseline=None, timeout=SETTLE_TIMEOUT, poll_interval=SETTLE_POLL_INTERVAL,
+                       threshold=SETTLE_THRESHOLD, settle_frames=SETTLE_FRAMES, cancelled=None) -> bool:
+    """
+    Wait until a screen region has changed from a baseline frame and stopped changing.
+
+    Parameters
+    ----------
+    region : tuple
+        The region (left, top, width, height) to watch.
+    baseline : numpy.ndarray, optional
+        A frame captured with `capture_settle_frame` before the change was triggered. If given, the region must
+        first differ from it, otherwise only stability is awaited.
+    timeout : float
+        The maximum seconds to wait.
+    poll_interval : float
+        The seconds between two frames.
+    threshold : float
+        The mean gray value difference below which two frames are equal.
+    settle_frames : int
+        The number of frames in a row that must equal their predecessor.
+    cancelled : callable, optional
+        Called on every frame, waiting stops if it returns True.
+
+    Returns
+    -------
+    bool
+        Whether the region settled (False on timeout or cancellation).
+    """
+    deadline = time.perf_counter() + timeout
+    previous = capture_settle_frame(region)
+    changed = baseline is None or frame_difference(previous, baseline) > threshold
+    equal_frames = 0
+
+    while time.perf_counter() < deadline:
+        if cancelled is not None and cancelled():
+            return False
+        time.sleep(poll_interval)
+        frame = capture_settle_frame(region)
+
+        if not changed:
+            changed = frame_difference(frame, baseline) > threshold
+        elif frame_difference(frame, previous) <= threshold:
+            equal_frames += 1
+            if equal_frames >= settle_frames:
+                return True
+        else:
+            equal_frames = 0
+        previous = frame
+
+    return False
+
+
+def region_around(point, size=ACTION_REGION_SIZE):
+    """
+    Determine the screen region of the given size centered on a point.
+
+    Parameters
+    ----------
+    point : tuple
+        The center (x, y) of the region.
+    size : tuple
+        The size (width, height) of the region.
+
+    Returns
+    -------
+    tuple
+        The region (left, top, width, height).
+    """
+    return max(0, int(point[0]) - size[0] // 2), max(0, int(point[1]) - size[1] // 2), size[0], size[1]
+
+
+def capture_action_frame(region):
+    """
+    Capture a grayscale frame of a screen region for detecting the reaction to an action.
+
+    Parameters
+    ----------
+    region : tuple
+        The region (left, top, width, height).
+
+    Returns
+    -------
+    numpy.ndarray
+        The frame (int16, so frames can be subtracted).
+    """
+    return screenshot_cv2(grayscale=True, region=region).astype(np.int16)
+
+
+def region_changed(frame, baseline, threshold=ACTION_CHANGE_THRESHOLD, min_pixels=ACTION_CHANGE_PIXELS) -> bool:
+    """
+    Determine whether enough pixels of a frame differ from a baseline frame (see `capture_action_frame`).
+    """
+    if frame.shape != baseline.shape:
+        return True
+    return np.count_nonzero(np.abs(frame - baseline) > threshold) > min_pixels
+
+
+def wait_for_change(region, baseline, timeout=ACTION_TIMEOUT, poll_interval=ACTION_POLL_INTERVAL) -> bool:
+    """
+    Wait until a screen region differs from its state before an action (the user interface reacted).
+
+    Parameters
+    ----------
+    region : tuple
+        The region (left, top, width, height) to watch.
+    baseline : numpy.ndarray
+        The `capture_action_frame` of the region before the action.
+    timeout : float
+        The maximum seconds to wait.
+    poll_interval : float
+        The seconds between two checks.
+
+    Returns
+    -------
+    bool
+        Whether the region changed within the timeout.
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        if region_changed(capture_action_frame(region), baseline):
+            return True
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+def locate_center(frame, template, confidence=DEFAULT_CONFIDENCE):
+    """
+    Locate the center of a template in a frame.
+
+    Follows pyautogui.locateCenterOnScreen: the first match (row by row) above the confidence threshold is used.
+
+    Parameters
+    ----------
+    frame : numpy.ndarray
+        The image to search in (e.g. from screenshot_cv2).
+    template : numpy.ndarray
+        The image to search for (e.g. from load_template), in the same color format as the frame.
+    confidence : float
+        The confidence threshold for image matching.
+
+    Returns
+    -------
+    tuple or None
+        The center of the template in the frame, None if it was not found.
+    """
+    if frame.shape[0] < template.shape[0] or frame.shape[1] < template.shape[1]:
+        return None
+
+    result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+    match_indices = np.flatnonzero(result > confidence)
+    if match_indices.size == 0:
+        return None
+
+    top, left = divmod(int(match_indices[0]), result.shape[1])
+    template_height, template_width = template.shape[:2]
+    return left + int(template_width / 2), top + int(template_height / 2)
+
+
+def locate_best_centers(frame, templates, confidence=DEFAULT_CONFIDENCE, scale=0.5):
+    """
+    Locate the best match of several templates in a frame, with a coarse pass on a downscaled frame first.
+
+    The frame is downscaled once and every template is matched against it. Only the surroundings of the best
+    downscaled match are then searched again in full resolution to get the exact position.
+
+    Parameters
+    ----------
+    frame : numpy.ndarray
+        The image to search in (e.g. from screenshot_cv2).
+    templates : dict
+        The images to search for by name, in the same color format as the frame.
+    confidence : float
+        The confidence threshold for image matching.
+    scale : float
+        The scale of the coarse pass, 1 to search the full resolution frame directly.
+
+    Returns
+    -------
+    dict
+        The center of the best match of every template, None for the ones that were not found.
+    """
+    if scale < 1:
+        small_frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # Matches in the downscaled frame are off by up to one downscaled pixel in full resolution
+        margin = int(np.ceil(1 / scale)) + 1
+
+    centers = {}
+    for name, template in templates.items():
+        template_height, template_width = template.shape[:2]
+        centers[name] = None
+        if frame.shape[0] < template_height or frame.shape[1] < template_width:
+            continue
+
+        left = top = 0
+        window = frame
+        if scale < 1:
+            small_template = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            result = cv2.matchTemplate(small_frame, small_template, cv2.TM_CCOEFF_NORMED)
+            _, max_value, _, (x, y) = cv2.minMaxLoc(result)
+            # Downscaling blurs the template, so the coarse pass uses a 5% lower threshold (like pyautogui's step=2)
+            if max_value <= confidence * 0.95:
+                continue
+            left = max(0, int(x / scale) - margin)
+            top = max(0, int(y / scale) - margin)
+            window = frame[top:top + template_height + 2 * margin, left:left + template_width + 2 * margin]
+            if window.shape[0] < template_height or window.shape[1] < template_width:
+                continue
+
+        result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, max_value, _, (x, y) = cv2.minMaxLoc(result)
+        if max_value > confidence:
+            centers[name] = (left + x + int(template_width / 2), top + y + int(template_height / 2))
+
+    return centers
+
+
+class TemplateBank:
+    """
+    Decodes the template images of some folders once and serves them from memory for all image matching.
+    """
+
+    def __init__(self, folders=(IMGS_FOLDER, TAGS_FOLDER, DIGITS_FOLDER), grayscale: bool = True, npz_path: str = None):
+        """
+        Parameters
+        ----------
+        folders : tuple
+            The folders whose images (not including subfolders) are preloaded.
+        grayscale : bool
+            Whether to preload the images in grayscale (BGR otherwise).
+        npz_path : str
+            Optional file in which the decoded images are packed, so later runs load a single file instead of
+            decoding every image. It is rewritten whenever the images in the folders change.
+        """
+        self.folders = folders
+        self.grayscale = grayscale
+        self.npz_path = npz_path
+        self.templates = {}
+        self._names = {}
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(image_name, grayscale, folder):
+        # np.savez stores the keys as zip member names, which always use '/', so the key must not contain os.sep
+        folder = os.path.normcase(folder).replace(os.sep, '/')
+        return f"{folder}/{image_name.lower()}|{'gray' if grayscale else 'bgr'}"
+
+    def keys(self) -> list:
+        """
+        List the keys of all images of the folders, as used by `preload` and `get`.
+
+        Returns
+        -------
+        list
+            The keys of the images.
+        """
+        return [self._key(image_name, self.grayscale, folder) for folder in self.folders
+                for image_name in self.names(folder)]
+
+    def names(self, folder) -> list:
+        """
+        List the image files of a folder (without searching the disk again once the folder was listed).
+
+        Parameters
+        ----------
+        folder : str
+            The folder.
+
+        Returns
+        -------
+        list
+            The filenames of the images in the folder.
+        """
+        with self._lock:
+            if folder not in self._names:
+                self._names[folder] = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+            return self._names[folder]
+
+    def preload(self):
+        """
+        Load all images of the folders, from the packed file if it is up to date.
+        """
+        start = time.perf_counter()
+        templates_hash = '|'.join(hash_templates(folder) for folder in self.folders)
+
+        if self.npz_path is not None and os.path.exists(self.npz_path):
+            with np.load(self.npz_path) as packed:
+                # A file packed with other keys (e.g. by an older version) would miss every template, rewrite it
+                if str(packed['__hash__']) == templates_hash and set(self.keys()) <= set(packed.files):
+                    self.templates.update({key: packed[key] for key in packed.files if key != '__hash__'})
+
+        if not self.templates:
+            for folder in self.folders:
+                for image_name in self.names(folder):
+                    self.templates[self._key(image_name, self.grayscale, folder)] = load_template(
+                        image_name, self.grayscale, folder)
+            if self.npz_path is not None:
+                np.savez(self.npz_path, __hash__=np.array(templates_hash), **self.templates)
+
+        self.load_time += time.perf_counter() - start
+
+    def get(self, image_name, grayscale=None, folder=IMGS_FOLDER) -> np.ndarray:
+        """
+        Return a template image, decoding it only if it was not loaded before.
+
+        Parameters
+        ----------
+        image_name : str
+            The filename of the image (case-insensitive).
+        grayscale : bool
+            Whether to return the image in grayscale (BGR otherwise), default: the setting of the bank.
+        folder : str
+            The folder containing the image.
+
+        Returns
+        -------
+        numpy.ndarray
+            The template image.
+        """
+        if grayscale is None:
+            grayscale = self.grayscale
+
+        key = self._key(image_name, grayscale, folder)
+        template = self.templates.get(key)
+        with self._lock:
+            if template is not None:
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        start = time.perf_counter()
+        template = self.templates[key] = load_template(image_name, grayscale, folder)
+        self.load_time += time.perf_counter() - start
+        return template
+
+    def stats(self) -> dict:
+        """
+        Return the number of loaded templates, cache hits and misses and the total load time.
+
+        Returns
+        -------
+        dict
+            The statistics of the bank.
+        """
+        return {'templates': len(self.templates), 'hits': self.hits, 'misses': self.misses,
+                'load_time': self.load_time}
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"Template bank: {stats['templates']} templates loaded in {stats['load_time'] * 1000:.1f} ms, "
+                f"{stats['hits']} hits, {stats['misses']} misses")
+
+
+_template_bank = None
+_template_bank_lock = threading.Lock()
+
+
+def get_template_bank(verbose: bool = False, npz_path: str = None) -> TemplateBank:
+    """
+    Return the shared template bank, preloading all templates on first use.
+
+    Parameters
+    ----------
+    verbose : bool
+        Whether to print how long loading the templates took.
+    npz_path : str
+        Optional file in which the decoded templates are packed (only used when the bank is created).
+
+    Returns
+    -------
+    TemplateBank
+        The template bank.
+    """
+    global _template_bank
+    with _template_bank_lock:
+        if _template_bank is None:
+            _template_bank = TemplateBank(npz_path=npz_path)
+            _template_bank.preload()
+            if verbose:
+                print(_template_bank.summary())
+        return _template_bank
 
 
 class ScreenAutomation:
-    def __init__(self, confidence: float = 0.9, add_determination: bool = False, verbose: bool = False):
+    def __init__(self, confidence: float = 0.9, add_determination: bool = False, verbose: bool = False,
+                 grayscale: bool = True, workers: int = None, cache_path: str = LAYOUT_CACHE_PATH,
+                 action_timeout: float = ACTION_TIMEOUT):
         """
         Initializes the ScreenAutomation class by determining the coordinates of various elements on the screen.
 
@@ -65,15 +679,122 @@ class ScreenAutomation:
             Whether to add the determination coordinates.
         verbose : bool
             Whether to print the found coordinates.
+        grayscale : bool
+            Whether to match the label images in grayscale (faster) instead of in color.
+        workers : int
+            Number of threads matching label images in parallel (default: number of cores).
+        cache_path : str
+            File in which the coordinates are cached between runs, None to always determine them.
+        action_timeout : float
+            The maximum seconds to wait for Data Shot to react to a click or key press. Actions do not pause for a
+            fixed time (pyautogui.PAUSE) but continue as soon as the screen around the target changed.
         """
         # Store all parameters as instance attributes
         self.confidence = confidence
         self.add_determination = add_determination
         self.verbose = verbose
+        self.grayscale = grayscale
+        self.workers = workers
+        self.cache_path = cache_path
+        self.action_timeout = action_timeout
+
+        # Region of the input field that receives the key presses, watched to confirm them
+        self._focus_region = None
+
+        # Clipboard shared by the fields of a macro, use `with SA.clipboard:` to save and restore it only once
+        self.clipboard = ClipboardSession()
+
+        # Determine coordinates (or reuse the cached ones) and store them as an instance attribute
+        self.coordinates = self._load_cached_coordinates()
+        if self.coordinates is None:
+            self.coordinates = self._determine_coordinates()
+            self._save_cached_coordinates()
+
+    def _cache_key(self) -> str:
+        """
+        Determine the key under which the coordinates of the current screen setup are cached.
+
+        Returns
+        -------
+        str
+            The cache key (screen resolution, display scaling, hash of the label images and settings).
+        """
+        width, height = capture.screen_size()
+        return (f'{width}x{height}|scaling={get_screen_scaling()}|imgs={hash_templates()}'
+                f'|determination={self.add_determination}|confidence={self.confidence}|grayscale={self.grayscale}')
 
-        # Determine coordinates and store them as an instance attribute
-        self.coordinates = self._determine_coordinates()
+    def _load_cached_coordinates(self):
+        """
+        Load the cached coordinates and confirm them by locating a few anchor labels close to their cached position.
 
+        Returns
+        -------
+        dict or None
+            The cached coordinates, None if there are none for this screen setup or the layout changed.
+        """
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read the coordinate cache {self.cache_path}: {e}")
+            return None
+
+        cached = cache.get(self._cache_key())
+        if cached is None:
+            return None
+        coordinates = {k: tuple(v) for k, v in cached.items()}
+
+        frame = screenshot_cv2(self.grayscale)
+        for image_name, coordinate_name, x_offset in ANCHOR_LABELS:
+            template = get_template_bank().get(image_name, self.grayscale)
+            template_height, template_width = template.shape[:2]
+            x = coordinates[coordinate_name][0] - x_offset
+            y = coordinates[coordinate_name][1]
+
+            # Only search a small region around the cached position of the label
+            left = max(0, x - template_width // 2 - ANCHOR_MARGIN)
+            top = max(0, y - template_height // 2 - ANCHOR_MARGIN)
+            region = frame[top:top + template_height + 2 * ANCHOR_MARGIN, left:left + template_width + 2 * ANCHOR_MARGIN]
+
+            if locate_center(region, template, self.confidence) != (x - left, y - top):
+                print(f"Cached coordinates are outdated ({image_name} moved).")
+                return None
+
+        print("Using cached coordinates.")
+        if self.verbose:
+            print("Coordinates:")
+            for k, v in coordinates.items():
+                print(f'{k}: {v}')
+            print('-' * 40)
+
+        return coordinates
+
+    def _save_cached_coordinates(self):
+        """
+        Store the coordinates in the cache file, under the key of the current screen setup.
+        """
+        if self.cache_path is None:
+            return
+
+        cache = {}
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        cache[self._cache_key()] = self.coordinates
+        try:
+            with open(self.cache_path, 'w') as f:
+                json.dump(cache, f, indent=2)
+        except OSError as e:
+            print(f"Failed to write the coordinate cache {self.cache_path}: {e}")
+
+    @timed('determine_coordinates')
     def _determine_coordinates(self) -> dict:
         """
         Determine the coordinates of various elements on the screen.
@@ -87,34 +808,38 @@ class ScreenAutomation:
 
         coordinates = {}
 
+        # Capture the screen once and locate all labels (including the alternatives) in that single screenshot
+        with span('determine_coordinates.locate_labels'):
+            labels = self.locate_labels(LABEL_IMAGES + (['det_button.png'] if self.add_determination else []))
+
         try:
-            coordinates['previous'] = self.input_field_from_label('previous.png')
-        except pyautogui.ImageNotFoundException:
-            coordinates['previous'] = self.input_field_from_label('previous_deactivated.png')
+            coordinates['previous'] = self.input_field_from_label('previous.png', labels=labels)
+        except LabelNotFoundError:
+            coordinates['previous'] = self.input_field_from_label('previous_deactivated.png', labels=labels)
         try:
-            coordinates['next'] = self.input_field_from_label('next.png')
-        except pyautogui.ImageNotFoundException:
-            coordinates['next'] = self.input_field_from_label('next_deactivated.png')
-
-        coordinates['save'] = self.input_field_from_label('save.png')
-        coordinates['pinlabels'] = self.input_field_from_label('pinlabels.png')
-        coordinates['count'] = self.input_field_from_label('images.png')
-        coordinates['numbers_more_button'] = self.input_field_from_label('numbers_more_button.png')
+            coordinates['next'] = self.input_field_from_label('next.png', labels=labels)
+        except LabelNotFoundError:
+            coordinates['next'] = self.input_field_from_label('next_deactivated.png', labels=labels)
+
+        coordinates['save'] = self.input_field_from_label('save.png', labels=labels)
+        coordinates['pinlabels'] = self.input_field_from_label('pinlabels.png', labels=labels)
+        coordinates['count'] = self.input_field_from_label('images.png', labels=labels)
+        coordinates['numbers_more_button'] = self.input_field_from_label('numbers_more_button.png', labels=labels)
         coordinates['numbers_more_number'] = (
         coordinates['numbers_more_button'][0] + 100, coordinates['numbers_more_button'][1])
         coordinates['numbers_more_type'] = (
         coordinates['numbers_more_button'][0] + 600, coordinates['numbers_more_button'][1])
-        coordinates['collector_add'] = self.input_field_from_label('collector.png')
+        coordinates['collector_add'] = self.input_field_from_label('collector.png', labels=labels)
         coordinates['collector_name'] = (coordinates['collector_add'][0] + 65, coordinates['collector_add'][1])
-        coordinates['workflow_status'] = self.input_field_from_label('workflow_status.png', 100, 0)
-        coordinates['collection'] = self.input_field_from_label('collection.png', 100, 0)
-        coordinates['date_verbatim'] = self.input_field_from_label('date_verbatim.png', 100, 0)
-        coordinates['date_interpreted'] = self.input_field_from_label('date_interpreted.png', 100, 0)
-        coordinates['taxon'] = self.input_field_from_label('associated_taxon.png', 100, 0)
-        coordinates['elevation_from'] = self.input_field_from_label('elevation_from.png', 100, 0)
-        coordinates['elevation_to'] = self.input_field_from_label('elevation_to.png', 100, 0)
-        coordinates['specimen_notes'] = self.input_field_from_label('notes.png', 100, 0)
-        coordinates['sex'] = self.input_field_from_label('sex.png', 100, 0)
+        coordinates['workflow_status'] = self.input_field_from_label('workflow_status.png', 100, 0, labels=labels)
+        coordinates['collection'] = self.input_field_from_label('collection.png', 100, 0, labels=labels)
+        coordinates['date_verbatim'] = self.input_field_from_label('date_verbatim.png', 100, 0, labels=labels)
+        coordinates['date_interpreted'] = self.input_field_from_label('date_interpreted.png', 100, 0, labels=labels)
+        coordinates['taxon'] = self.input_field_from_label('associated_taxon.png', 100, 0, labels=labels)
+        coordinates['elevation_from'] = self.input_field_from_label('elevation_from.png', 100, 0, labels=labels)
+        coordinates['elevation_to'] = self.input_field_from_label('elevation_to.png', 100, 0, labels=labels)
+        coordinates['specimen_notes'] = self.input_field_from_label('notes.png', 100, 0, labels=labels)
+        coordinates['sex'] = self.input_field_from_label('sex.png', 100, 0, labels=labels)
 
         if self.add_determination:
             print("Adding determination coordinates")
@@ -130,18 +855,19 @@ class ScreenAutomation:
                 ('det_verbatim', 10)
             ]
             column_width = 90
-            coordinates['det_button'] = self.input_field_from_label('det_button.png')
-            pyautogui.click(coordinates['det_button'])
-            time.sleep(0.5)
-            coordinates['det_add_button'] = self.input_field_from_label('det_add_button.png')
-            coordinates['det_done_button'] = self.input_field_from_label('det_done_button.png')
-            coordinates_first_column = self.input_field_from_label('det_species_number.png')
+            coordinates['det_button'] = self.input_field_from_label('det_button.png', labels=labels)
+            self.click(coordinates['det_button'])
+            with span('determine_coordinates.determination_labels'):
+                det_labels = self.wait_for_labels(DETERMINATION_LABEL_IMAGES)
+            coordinates['det_add_button'] = self.input_field_from_label('det_add_button.png', labels=det_labels)
+            coordinates['det_done_button'] = self.input_field_from_label('det_done_button.png', labels=det_labels)
+            coordinates_first_column = self.input_field_from_label('det_species_number.png', labels=det_labels)
             for column_name, column_number in column_names_numbers:
                 coordinates[column_name] = (
                     coordinates_first_column[0] + column_width * column_number,
                     coordinates_first_column[1] + 25
                 )
-            pyautogui.click(coordinates['det_done_button'])
+            self.click(coordinates['det_done_button'])
 
         print("Finished determining coordinates.")
 
@@ -153,7 +879,37 @@ class ScreenAutomation:
 
         return coordinates
 
-    def input_field_from_label(self, image_name, x_offset=0, y_offset=0, confidence=None):
+    def locate_labels(self, image_names, confidence=None) -> dict:
+        """
+        Capture the screen once and locate several label images in that screenshot, in parallel.
+
+        Parameters
+        ----------
+        image_names : list
+            The filenames of the label images.
+        confidence : float
+            The confidence threshold for image matching.
+
+        Returns
+        -------
+        dict
+            The center of every label image on the screen, None for the ones that were not found.
+        """
+        if confidence is None:
+            confidence = self.confidence
+
+        bank = get_template_bank()
+        with span('locate_labels.capture'):
+            frame = screenshot_cv2(self.grayscale)
+
+        def locate(image_name):
+            return locate_center(frame, bank.get(image_name, self.grayscale), confidence)
+
+        # OpenCV releases the GIL while matching, so the labels are matched concurrently
+        with span('locate_labels.match'), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(image_names, executor.map(locate, image_names)))
+
+    def input_field_from_label(self, image_name, x_offset=0, y_offset=0, confidence=None, labels=None):
         """
         Determine the coordinates of an input field based on the label image.
 
@@ -167,6 +923,8 @@ class ScreenAutomation:
             The y offset from the label location.
         confidence : float
             The confidence threshold for image matching.
+        labels : dict
+            Label locations found by `locate_labels`, the screen is searched for the label if not given.
 
         Returns
         -------
@@ -177,21 +935,173 @@ class ScreenAutomation:
             confidence = self.confidence
 
         # Locate the label image on screen
-        label_location = pyautogui.locateCenterOnScreen(os.path.join('imgs', image_name), confidence=confidence)
+        if labels is None:
+            labels = self.locate_labels([image_name], confidence)
+        label_location = labels[image_name]
 
         # Check if label_location is found, to prevent crashes if the image is not found
         if label_location is None:
-            raise pyautogui.ImageNotFoundException(f"Label image {image_name} not found on screen.")
+            raise LabelNotFoundError(f"Label image {image_name} not found on screen.")
 
         # Calculate the input field location based on the offsets
         input_field_location = (label_location[0] + x_offset, label_location[1] + y_offset)
         return input_field_location
 
+    def wait_for_labels(self, image_names, timeout=DIALOG_TIMEOUT) -> dict:
+        """
+        Locate label images, trying again until all of them are shown (e.g. in a dialog that is still opening).
+
+        Parameters
+        ----------
+        image_names : list
+            The label images to locate.
+        timeout : float
+            The maximum seconds to wait for all labels.
+
+        Returns
+        -------
+        dict
+            The center of every label image, None for the labels not shown before the timeout.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            labels = self.locate_labels(image_names)
+            if all(center is not None for center in labels.values()) or time.perf_counter() >= deadline:
+                return labels
+            time.sleep(ACTION_POLL_INTERVAL)
+
+    def act(self, region, action, *args, timeout=None, hover=None, **kwargs) -> bool:
+        """
+        Perform a pyautogui action without its fixed pause and wait until the region around its target changed.
+
+        Parameters
+        ----------
+        region : tuple
+            The region (left, top, width, height) expected to change, see `region_around`.
+        action : callable
+            The pyautogui function (e.g. pyautogui.click).
+        *args, **kwargs
+            The arguments of the action.
+        timeout : float
+            The maximum seconds to wait, for actions that often show no change (default: `action_timeout`, a missing
+            reaction is then reported if verbose).
+        hover : tuple
+            The position the action clicks, the mouse is moved there before the region is captured for comparison.
+
+        Returns
+        -------
+        bool
+            Whether the region changed within the timeout.
+        """
+        import pyautogui
+
+        if hover is not None and tuple(pyautogui.position()) != tuple(int(v) for v in hover):
+            pyautogui.moveTo(hover, _pause=False)
+            time.sleep(HOVER_DELAY)
+        baseline = capture_action_frame(region)
+        with span(f'action.{action.__name__}'):
+            action(*args, _pause=False, **kwargs)
+        with span('action.wait_for_change'):
+            reacted = wait_for_change(region, baseline, self.action_timeout if timeout is None else timeout)
+        if self.verbose and not reacted and timeout is None:
+            print(f"No reaction to {action.__name__}{args} within {self.action_timeout} s, continuing.")
+        return reacted
+
+    def reaction(self, coordinates):
+        """
+        Determine where and how long to wait for the reaction to a click.
+
+        Parameters
+        ----------
+        coordinates : str or tuple
+            The name of the coordinates or the position to click.
+
+        Returns
+        -------
+        tuple
+            The region expected to change and the maximum seconds to wait: the specimen image and SPECIMEN_TIMEOUT
+            for SPECIMEN_BUTTONS, otherwise around the position and `action_timeout` (None) for buttons or
+            QUIET_ACTION_TIMEOUT for input fields.
+        """
+        if not isinstance(coordinates, str):
+            return region_around(coordinates), None
+        if coordinates in SPECIMEN_BUTTONS:
+            pinlabels = self.coordinates['pinlabels']
+            region = (max(0, int(pinlabels[0]) + SPECIMEN_WATCH_REGION[0]),
+                      max(0, int(pinlabels[1]) + SPECIMEN_WATCH_REGION[1]), *SPECIMEN_WATCH_REGION[2:])
+            return region, SPECIMEN_TIMEOUT
+        return region_around(self.coordinates[coordinates]), None if coordinates in BUTTON_COORDINATES else \
+            QUIET_ACTION_TIMEOUT
+
+    def click(self, coordinates, timeout=None, **pyautogui_click_kwargs):
+        """
+        Click on a position and wait until the screen reacted (see `reaction`).
+
+        Parameters
+        ----------
+        coordinates : str or tuple
+            The name of the coordinates or the position to click.
+        timeout : float
+            The maximum seconds to wait (default: see `reaction`).
+        """
+        import pyautogui
+
+        region, default_timeout = self.reaction(coordinates)
+        if isinstance(coordinates, str):
+            coordinates = self.coordinates[coordinates]
+        self._focus_region = region_around(coordinates)
+        self.act(region, pyautogui.click, coordinates, timeout=default_timeout if timeout is None else timeout,
+                 hover=coordinates, **pyautogui_click_kwargs)
+
+    def press(self, key):
+        """
+        Press a key and wait until the input field clicked last reacted (at most QUIET_ACTION_TIMEOUT seconds, as keys
+        such as enter often change nothing around the field).
+
+        Parameters
+        ----------
+        key : str
+            The key to press.
+        """
+        import pyautogui
+
+        self.act(self._focus_region or region_around(pyautogui.position()), pyautogui.press, key,
+                 timeout=QUIET_ACTION_TIMEOUT)
+
+    def hotkey(self, *keys):
+        """
+        Press a key combination and wait until the input field clicked last reacted.
+
+        Parameters
+        ----------
+        *keys : str
+            The keys to press together.
+        """
+        import pyautogui
+
+        self.act(self._focus_region or region_around(pyautogui.position()), pyautogui.hotkey, *keys)
+
+    def typewrite(self, text):
+        """
+        Type a text and wait until the input field clicked last shows it.
+
+        Parameters
+        ----------
+        text : str
+            The text to type.
+        """
+        import pyautogui
+
+        self.act(self._focus_region or region_around(pyautogui.position()), pyautogui.typewrite, text)
+
     def write_with_clipboard(self, text_to_write, coordinates=None, **pyautogui_click_kwargs):
         """
         Save the current clipboard content, copy the text to write into the clipboard,
         paste it, and then restore the original clipboard content.
 
+        Within a clipboard session (`with self.clipboard:`) the clipboard is only saved and restored once for all
+        fields, and the text is not copied again if it is already on the clipboard.
+
         Parameters
         ----------
         text_to_write : str
@@ -205,58 +1115,53 @@ class ScreenAutomation:
 
         if coordinates is not None:
             # Click the button first
-            pyautogui.click(coordinates, **pyautogui_click_kwargs)
-
-        # Save the current clipboard content
-        temp = pyperclip.paste()
+            self.click(coordinates, **pyautogui_click_kwargs)
 
-        # Copy the text to write into the clipboard
-        pyperclip.copy(text_to_write)
-
-        # Paste the text
-        pyautogui.hotkey('ctrl', 'v')
-
-        # Restore the original clipboard content
-        pyperclip.copy(temp)
+        # Paste the text (the field changed once it is pasted, so the clipboard can be restored)
+        self.clipboard.paste_text(text_to_write, lambda: self.hotkey('ctrl', 'v'))
 
     def perform_previous(self, position_after=None, pinlabels=True):
+        import pyautogui
+
         if position_after is None:
             position_after = pyautogui.position()
         elif isinstance(position_after, str):
             position_after = self.coordinates[position_after]
-        pyautogui.click(self.coordinates['previous'])
+        self.click('previous')
         if pinlabels:
-            pyautogui.click(self.coordinates['pinlabels'])
-        pyautogui.moveTo(position_after)
+            self.click('pinlabels')
+        pyautogui.moveTo(position_after, _pause=False)
 
     def perform_next(self, position_after=None, pinlabels=True):
+        import pyautogui
+
         if position_after is None:
             position_after = pyautogui.position()
         elif isinstance(position_after, str):
             position_after = self.coordinates[position_after]
-        pyautogui.click(self.coordinates['next'])
+        self.click('next')
         if pinlabels:
-            pyautogui.click(self.coordinates['pinlabels'])
-        pyautogui.moveTo(position_after)
+            self.click('pinlabels')
+        pyautogui.moveTo(position_after, _pause=False)
 
     def perform_save(self):
-        pyautogui.click(self.coordinates['save'])
+        self.click('save', timeout=QUIET_ACTION_TIMEOUT)
 
     def perform_collection(self, collection_name):
         self.write_with_clipboard(collection_name, 'collection')
-        pyautogui.press('enter')
+        self.press('enter')
 
     def perform_collector(self, text_to_type):
-        pyautogui.click(self.coordinates['collector_add'])
+        self.click('collector_add')
         self.write_with_clipboard(text_to_type, 'collector_name')
-        pyautogui.press('enter')
+        self.press('enter')
 
     def perform_numbers_more(self, number, number_type):
-        pyautogui.click(self.coordinates['numbers_more_button'])
-        pyautogui.click(self.coordinates['numbers_more_number'])
-        pyautogui.typewrite(str(number))
+        self.click('numbers_more_button')
+        self.click('numbers_more_number')
+        self.typewrite(str(number))
         self.write_with_clipboard(number_type, 'numbers_more_type')
-        pyautogui.press('enter')
+        self.press('enter')
 
     def perform_date(self, text_to_type_verbatim, text_to_type_intrp):
         self.write_with_clipboard(text_to_type_verbatim, 'date_verbatim')
@@ -274,11 +1179,11 @@ class ScreenAutomation:
 
     def perform_sex(self, sex):
         self.write_with_clipboard(sex.capitalize(), 'sex')
-        pyautogui.press('enter')
+        self.press('enter')
 
     def perform_workflow_status(self, status):
         self.write_with_clipboard(status, 'workflow_status')
-        pyautogui.press('enter')
+        self.press('enter')
 
     def perform_determination(
         self,
@@ -292,8 +1197,14 @@ class ScreenAutomation:
         date=None,
         verbatim=None
     ):
-        pyautogui.click(self.coordinates['det_button'])
-        pyautogui.click(self.coordinates['det_add_button'])
+        with self.clipboard:
+            self._perform_determination(genus, species, subspecies, infraspecific, infrarank, author, determiner,
+                                        date, verbatim)
+
+    def _perform_determination(self, genus, species, subspecies, infraspecific, infrarank, author, determiner, date,
+                               verbatim):
+        self.click('det_button')
+        self.click('det_add_button')
 
         if genus is not None:
             self.write_with_clipboard(genus, 'det_genus', clicks=2)
@@ -322,4 +1233,4 @@ class ScreenAutomation:
         if verbatim is not None:
             self.write_with_clipboard(verbatim, 'det_verbatim', clicks=2)
 
-        pyautogui.click(self.coordinates['det_done_button'])
\ No newline at end of file
+        self.click('det_done_button')
\ No newline at end of file